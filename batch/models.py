@@ -0,0 +1,42 @@
+from typing import Literal, Optional
+
+from pydantic import BaseModel
+
+from chat.models import ChatCompletionRequest
+
+#   1. 입력 파일 (POST /v1/batches, 본문은 JSONL - 한 줄에 요청 하나)
+#   {"custom_id": "article-1", "method": "POST", "url": "/v1/chat/completions",
+#    "body": {"model": "qwen3:14b", "messages": [{"role": "user", "content": "..."}]}}
+
+#   2. 출력 파일 (GET /v1/batches/{batch_id}/output, 완료된 순서대로 한 줄씩 추가)
+#   {"id": "batch_req_...", "custom_id": "article-1",
+#    "response": {"status_code": 200, "body": {...chat.completion...}}, "error": null}
+
+BatchStatus = Literal["validating", "in_progress", "completed", "failed", "cancelling", "cancelled"]
+
+
+class BatchRequestLine(BaseModel):
+    custom_id: str
+    method: str = "POST"
+    url: str = "/v1/chat/completions"
+    body: ChatCompletionRequest
+
+
+class BatchRequestCounts(BaseModel):
+    total: int = 0
+    completed: int = 0
+    failed: int = 0
+
+
+class BatchJob(BaseModel):
+    id: str
+    object: str = "batch"
+    endpoint: str = "/v1/chat/completions"
+    status: BatchStatus
+    created_at: int
+    in_progress_at: Optional[int] = None
+    completed_at: Optional[int] = None
+    cancelled_at: Optional[int] = None
+    request_counts: BatchRequestCounts
+    output_url: str
+    error: Optional[str] = None
@@ -0,0 +1,55 @@
+from typing import List
+
+from fastapi import APIRouter, HTTPException, Request, Response
+
+from batch.models import BatchJob
+from batch.service import BatchRunner, BatchValidationError
+
+router = APIRouter(
+    prefix="/v1",
+    tags=["batch"],
+)
+
+
+def _get_runner(request: Request) -> BatchRunner:
+    return request.app.state.batchRunner
+
+
+@router.post("/batches")
+async def create_batch(request: Request) -> BatchJob:
+    """요청 본문 전체가 JSONL 입력 파일 (Content-Type: application/jsonl)"""
+    content = await request.body()
+    try:
+        return await _get_runner(request).create_batch(content)
+    except BatchValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/batches")
+async def list_batches(request: Request, limit: int = 20) -> List[BatchJob]:
+    return await _get_runner(request).list_batches(limit)
+
+
+@router.get("/batches/{batch_id}")
+async def get_batch(request: Request, batch_id: str) -> BatchJob:
+    job = await _get_runner(request).get_batch(batch_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Batch {batch_id} not found")
+    return job
+
+
+@router.get("/batches/{batch_id}/output")
+async def get_batch_output(request: Request, batch_id: str) -> Response:
+    """완료된 결과 JSONL (작업이 진행 중이면 지금까지의 부분 결과)"""
+    runner = _get_runner(request)
+    if await runner.get_batch(batch_id) is None:
+        raise HTTPException(status_code=404, detail=f"Batch {batch_id} not found")
+    return Response(content=await runner.read_output(batch_id), media_type="application/jsonl")
+
+
+@router.post("/batches/{batch_id}/cancel")
+async def cancel_batch(request: Request, batch_id: str) -> BatchJob:
+    job = await _get_runner(request).cancel_batch(batch_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Batch {batch_id} not found")
+    return job
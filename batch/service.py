@@ -0,0 +1,281 @@
+import asyncio
+import json
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from batch.models import BatchJob, BatchRequestCounts, BatchRequestLine
+from batch.store import BatchStore
+from cache.response_cache import ResponseCache
+from cache.semantic_cache import SemanticCache
+from chat.budget import ContextBudget
+from chat.coalescer import RequestCoalescer
+from chat.service import process_chat_completion
+from core.config import settings
+from core.logging import logging_manager
+from model.model_manager import ModelManager
+from model.registry import ModelNotFoundError, ModelRegistry
+from model.scheduler import BULK, AdmissionScheduler
+
+logger = logging_manager.get_logger(__name__)
+
+
+class BatchValidationError(Exception):
+    """업로드된 JSONL 입력이 잘못됨 (HTTP 400)"""
+
+
+def parse_batch_input(content: bytes, max_lines: Optional[int] = None) -> List[BatchRequestLine]:
+    lines: List[BatchRequestLine] = []
+    custom_ids: Set[str] = set()
+
+    for line_number, raw_line in enumerate(content.splitlines(), start=1):
+        if not raw_line.strip():
+            continue
+        try:
+            line = BatchRequestLine.model_validate_json(raw_line)
+        except ValidationError as e:
+            raise BatchValidationError(f"line {line_number}: {e.errors()[0]['msg']}")
+
+        if line.url != "/v1/chat/completions":
+            raise BatchValidationError(f"line {line_number}: unsupported url {line.url}")
+        if line.custom_id in custom_ids:
+            raise BatchValidationError(f"line {line_number}: duplicate custom_id {line.custom_id}")
+        custom_ids.add(line.custom_id)
+        lines.append(line)
+
+    if not lines:
+        raise BatchValidationError("batch input is empty")
+    if max_lines is not None and len(lines) > max_lines:
+        raise BatchValidationError(f"batch input has {len(lines)} lines (max {max_lines})")
+    return lines
+
+
+def order_for_throughput(lines: List[BatchRequestLine]) -> List[BatchRequestLine]:
+    """처리량이 좋은 순서로 정렬
+
+    같은 모델끼리 묶어 모델 교체를 줄이고, 같은 system 프롬프트끼리 붙여 KV prefix를
+    재사용하게 하며, 긴 요청을 먼저 시작해 마지막 한두 요청만 남는 꼬리 시간을 줄인다.
+    """
+    def sort_key(line: BatchRequestLine) -> Tuple[str, str, int]:
+        messages = line.body.messages
+        system_prompt = next((message.content for message in messages if message.role == "system"), "")
+        length = sum(len(message.content) for message in messages)
+        return (line.body.model, system_prompt, -length)
+
+    return sorted(lines, key=sort_key)
+
+
+class BatchRunner:
+    """JSONL 배치 작업을 백그라운드에서 실행
+
+    각 줄은 일반 요청과 같은 process_chat_completion 경로(bulk 우선순위)로 처리되고,
+    결과는 끝나는 즉시 출력 JSONL 파일에 한 줄씩 추가된다. 서버가 재시작되면
+    출력 파일에 이미 있는 custom_id를 건너뛰고 남은 줄부터 이어서 실행한다.
+    """
+
+    def __init__(
+        self,
+        model_manager: ModelManager,
+        scheduler: Optional[AdmissionScheduler] = None,
+        response_cache: Optional[ResponseCache] = None,
+        coalescer: Optional[RequestCoalescer] = None,
+        data_dir: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        context_budget: Optional[ContextBudget] = None,
+        model_registry: Optional[ModelRegistry] = None,
+        semantic_cache: Optional[SemanticCache] = None,
+    ):
+        self.model_manager = model_manager
+        self.model_registry = model_registry
+        self.semantic_cache = semantic_cache
+        self.scheduler = scheduler
+        self.response_cache = response_cache
+        self.coalescer = coalescer
+        self.context_budget = context_budget
+        self.store = BatchStore(Path(data_dir or settings.batch_data_dir))
+        self.concurrency = concurrency or settings.batch_concurrency
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._cancel_requested: Set[str] = set()
+
+    async def start(self) -> None:
+        """재시작 전에 끝나지 않은 작업 이어서 실행"""
+        for job in await asyncio.to_thread(self.store.list_unfinished):
+            logger.info(f"Resuming batch {job.id} ({job.request_counts.completed + job.request_counts.failed}/{job.request_counts.total} done)")
+            if job.status == "cancelling":
+                self._cancel_requested.add(job.id)
+            self._spawn(job.id)
+
+    async def close(self) -> None:
+        # 진행 중인 작업은 in_progress 상태 그대로 두고 다음 시작 때 재개
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.store.close()
+
+    async def create_batch(self, content: bytes) -> BatchJob:
+        lines = parse_batch_input(content, settings.batch_max_lines)
+        if self.model_registry:
+            # 설치되지 않은 모델이 있으면 작업을 만들기 전에 거절
+            for model in sorted({line.body.model for line in lines}):
+                try:
+                    await self.model_registry.resolve(model)
+                except ModelNotFoundError as e:
+                    raise BatchValidationError(str(e))
+
+        batch_id = f"batch_{uuid.uuid4().hex[:16]}"
+        job = BatchJob(
+            id=batch_id,
+            status="validating",
+            created_at=int(time.time()),
+            request_counts=BatchRequestCounts(total=len(lines)),
+            output_url=f"/v1/batches/{batch_id}/output",
+        )
+        await asyncio.to_thread(self.store.input_path(batch_id).write_bytes, content)
+        await asyncio.to_thread(self.store.insert, job)
+
+        self._spawn(batch_id)
+        logger.info(f"Batch {batch_id} created with {len(lines)} requests")
+        return job
+
+    async def get_batch(self, batch_id: str) -> Optional[BatchJob]:
+        return await asyncio.to_thread(self.store.get, batch_id)
+
+    async def list_batches(self, limit: int = 20) -> List[BatchJob]:
+        return await asyncio.to_thread(self.store.list, limit)
+
+    async def cancel_batch(self, batch_id: str) -> Optional[BatchJob]:
+        job = await self.get_batch(batch_id)
+        if job is None or job.status not in ("validating", "in_progress"):
+            return job
+
+        self._cancel_requested.add(batch_id)
+        await asyncio.to_thread(self.store.update, batch_id, status="cancelling")
+        task = self._tasks.get(batch_id)
+        if task is not None:
+            task.cancel()
+        return await self.get_batch(batch_id)
+
+    async def read_output(self, batch_id: str) -> bytes:
+        """지금까지 완료된 결과 (진행 중이면 부분 결과)"""
+        path = self.store.output_path(batch_id)
+        return await asyncio.to_thread(lambda: path.read_bytes() if path.exists() else b"")
+
+    def _spawn(self, batch_id: str) -> None:
+        task = asyncio.create_task(self._run(batch_id))
+        self._tasks[batch_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(batch_id, None))
+
+    async def _run(self, batch_id: str) -> None:
+        try:
+            if batch_id in self._cancel_requested:
+                raise asyncio.CancelledError()
+
+            content = await asyncio.to_thread(self.store.input_path(batch_id).read_bytes)
+            lines = parse_batch_input(content)
+            finished, completed, failed = await asyncio.to_thread(self._read_finished, batch_id)
+            pending = order_for_throughput([line for line in lines if line.custom_id not in finished])
+
+            await asyncio.to_thread(
+                self.store.update, batch_id,
+                status="in_progress", in_progress_at=int(time.time()), completed=completed, failed=failed,
+            )
+
+            counts = {"completed": completed, "failed": failed}
+            semaphore = asyncio.Semaphore(self.concurrency)
+            write_lock = asyncio.Lock()
+            output_path = self.store.output_path(batch_id)
+
+            async def run_line(line: BatchRequestLine) -> None:
+                async with semaphore:
+                    record, ok = await self._execute(line)
+                async with write_lock:
+                    await asyncio.to_thread(self._append_line, output_path, record)
+                    counts["completed" if ok else "failed"] += 1
+                    await asyncio.to_thread(self.store.update, batch_id, **counts)
+
+            await asyncio.gather(*(run_line(line) for line in pending))
+
+            await asyncio.to_thread(self.store.update, batch_id, status="completed", completed_at=int(time.time()))
+            logger.info(f"Batch {batch_id} completed ({counts['completed']} ok, {counts['failed']} failed)")
+        except asyncio.CancelledError:
+            if batch_id in self._cancel_requested:
+                self._cancel_requested.discard(batch_id)
+                await asyncio.to_thread(self.store.update, batch_id, status="cancelled", cancelled_at=int(time.time()))
+                logger.info(f"Batch {batch_id} cancelled")
+            raise
+        except Exception as e:
+            logger.error(f"Batch {batch_id} failed: {e}")
+            await asyncio.to_thread(self.store.update, batch_id, status="failed", error=str(e), completed_at=int(time.time()))
+
+    async def _execute(self, line: BatchRequestLine) -> Tuple[Dict[str, Any], bool]:
+        """한 줄 실행. 스케줄러가 429로 거절하거나 백엔드가 503이면 Retry-After 만큼 쉬었다가 재시도"""
+        request = line.body.model_copy(update={"priority": BULK, "stream": False})
+        if self.model_registry:
+            try:
+                request.model = await self.model_registry.resolve(request.model)
+            except ModelNotFoundError as e:
+                error = {"message": str(e), "type": "invalid_request_error"}
+                return self._record(line, 404, {"error": error}, error), False
+
+        for attempt in range(settings.batch_max_retries + 1):
+            try:
+                response = await process_chat_completion(
+                    model_manager=self.model_manager,
+                    chat_completion_request=request,
+                    scheduler=self.scheduler,
+                    response_cache=self.response_cache,
+                    coalescer=self.coalescer,
+                    context_budget=self.context_budget,
+                    semantic_cache=self.semantic_cache,
+                )
+                return self._record(line, 200, response), True
+            except HTTPException as e:
+                if e.status_code in (429, 503) and attempt < settings.batch_max_retries:
+                    retry_after = float((e.headers or {}).get("Retry-After", 1))
+                    await asyncio.sleep(retry_after)
+                    continue
+                error = {"message": str(e.detail), "type": "server_error"}
+                return self._record(line, e.status_code, {"error": error}, error), False
+
+    def _record(self, line: BatchRequestLine, status_code: int, body: Dict[str, Any], error: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return {
+            "id": f"batch_req_{uuid.uuid4().hex[:16]}",
+            "custom_id": line.custom_id,
+            "response": {"status_code": status_code, "body": body},
+            "error": error,
+        }
+
+    def _append_line(self, path: Path, record: Dict[str, Any]) -> None:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _read_finished(self, batch_id: str) -> Tuple[Set[str], int, int]:
+        """출력 파일에서 이미 끝난 custom_id와 성공/실패 수 집계 (재개용)"""
+        path = self.store.output_path(batch_id)
+        finished: Set[str] = set()
+        completed = failed = 0
+        if not path.exists():
+            return finished, completed, failed
+
+        content = path.read_bytes()
+        if content and not content.endswith(b"\n"):
+            # 종료 직전에 쓰다 만 마지막 줄은 잘라내고 다시 실행
+            content = content[: content.rfind(b"\n") + 1]
+            with open(path, "r+b") as f:
+                f.truncate(len(content))
+
+        for raw_line in content.splitlines():
+            if not raw_line.strip():
+                continue
+            record = json.loads(raw_line)
+            finished.add(record["custom_id"])
+            if record.get("error"):
+                failed += 1
+            else:
+                completed += 1
+        return finished, completed, failed
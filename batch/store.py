@@ -0,0 +1,95 @@
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from batch.models import BatchJob, BatchRequestCounts
+
+
+class BatchStore:
+    """배치 작업 메타데이터 SQLite 저장소 (재시작 후에도 작업을 이어가기 위함)
+
+    sqlite3 호출은 블로킹이므로 서비스 쪽에서 asyncio.to_thread로 감싸서 사용한다.
+    """
+
+    def __init__(self, data_dir: Path):
+        self.data_dir = data_dir
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.data_dir / "batches.db", check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS batches (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                created_at INTEGER NOT NULL,
+                in_progress_at INTEGER,
+                completed_at INTEGER,
+                cancelled_at INTEGER,
+                total INTEGER NOT NULL DEFAULT 0,
+                completed INTEGER NOT NULL DEFAULT 0,
+                failed INTEGER NOT NULL DEFAULT 0,
+                error TEXT
+            )
+            """
+        )
+        self._conn.commit()
+
+    def input_path(self, batch_id: str) -> Path:
+        return self.data_dir / f"{batch_id}.input.jsonl"
+
+    def output_path(self, batch_id: str) -> Path:
+        return self.data_dir / f"{batch_id}.output.jsonl"
+
+    def insert(self, job: BatchJob) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO batches (id, status, created_at, total) VALUES (?, ?, ?, ?)",
+                (job.id, job.status, job.created_at, job.request_counts.total),
+            )
+            self._conn.commit()
+
+    def update(self, batch_id: str, **fields: Any) -> None:
+        if not fields:
+            return
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE batches SET {columns} WHERE id = ?", (*fields.values(), batch_id))
+            self._conn.commit()
+
+    def get(self, batch_id: str) -> Optional[BatchJob]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM batches WHERE id = ?", (batch_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def list(self, limit: int = 20) -> List[BatchJob]:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM batches ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def list_unfinished(self) -> List[BatchJob]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM batches WHERE status IN ('validating', 'in_progress', 'cancelling') ORDER BY created_at"
+            ).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _row_to_job(self, row: sqlite3.Row) -> BatchJob:
+        data: Dict[str, Any] = dict(row)
+        return BatchJob(
+            id=data["id"],
+            status=data["status"],
+            created_at=data["created_at"],
+            in_progress_at=data["in_progress_at"],
+            completed_at=data["completed_at"],
+            cancelled_at=data["cancelled_at"],
+            request_counts=BatchRequestCounts(total=data["total"], completed=data["completed"], failed=data["failed"]),
+            output_url=f"/v1/batches/{data['id']}/output",
+            error=data["error"],
+        )
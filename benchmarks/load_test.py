@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+/v1/chat/completions 부하 생성기
+
+- closed-loop: 동시 사용자 N명이 응답을 받는 즉시 다음 요청 (최대 처리량 측정)
+- open-loop: 응답과 무관하게 초당 rate개 요청을 포아송 간격으로 발사 (대기열/429 동작 측정)
+
+결과는 p50/p95/p99 지연, TTFT(스트리밍), 처리량, 서버 오버헤드로 요약하고
+JSON으로 저장하며, 기준(baseline) 결과와 비교해 성능 회귀를 잡는다.
+
+    python -m benchmarks.load_test --mode closed --concurrency 8 --requests 200 --stream
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+# 값이 커지면 나쁜 지표 / 작아지면 나쁜 지표
+HIGHER_IS_WORSE = ("latency_p50", "latency_p95", "latency_p99", "ttft_p95", "server_overhead_ms")
+LOWER_IS_WORSE = ("throughput_rps", "tokens_per_second")
+
+
+def build_payload(index: int, prompt_chars: int, num_predict: int, stream: bool, model: str) -> Dict[str, Any]:
+    # 요청마다 프롬프트를 다르게 해서 응답 캐시/coalescing에 걸리지 않게 함
+    filler = ("lorem ipsum dolor sit amet " * (prompt_chars // 27 + 1))[:prompt_chars]
+    return {
+        "model": model,
+        "messages": [{"role": "user", "content": f"[{index}] {filler}"}],
+        "temperature": 0.7,
+        "num_predict": num_predict,
+        "stream": stream,
+    }
+
+
+async def send_request(session: aiohttp.ClientSession, url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """요청 하나 보내고 지연/TTFT/토큰 수 측정"""
+    start = time.perf_counter()
+    result: Dict[str, Any] = {"ok": False, "status": None, "latency": None, "ttft": None, "completion_tokens": 0}
+    try:
+        async with session.post(f"{url}/v1/chat/completions", json=payload) as response:
+            result["status"] = response.status
+            if response.status != 200:
+                await response.read()
+            elif payload.get("stream"):
+                async for line in response.content:
+                    if not line.startswith(b"data: ") or line.startswith(b"data: [DONE]"):
+                        continue
+                    event = json.loads(line[6:])
+                    if "error" in event:
+                        result["status"] = "stream_error"
+                        break
+                    if result["ttft"] is None and any(choice.get("delta", {}).get("content") for choice in event.get("choices", [])):
+                        result["ttft"] = time.perf_counter() - start
+                    if event.get("usage"):
+                        result["completion_tokens"] = event["usage"]["completion_tokens"]
+                else:
+                    result["ok"] = True
+            else:
+                data = await response.json()
+                result["completion_tokens"] = data["usage"]["completion_tokens"]
+                result["ok"] = True
+    except Exception as e:
+        result["status"] = type(e).__name__
+    result["latency"] = time.perf_counter() - start
+    return result
+
+
+async def run_closed_loop(url: str, concurrency: int, requests: int, payload_args: Dict[str, Any]) -> Dict[str, Any]:
+    results: List[Dict[str, Any]] = []
+    next_index = iter(range(requests))
+
+    async def worker(session: aiohttp.ClientSession) -> None:
+        for index in next_index:
+            results.append(await send_request(session, url, build_payload(index, **payload_args)))
+
+    async with _client_session(concurrency) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+        wall_time = time.perf_counter() - start
+    return {"results": results, "wall_time": wall_time}
+
+
+async def run_open_loop(url: str, rate: float, duration: float, payload_args: Dict[str, Any]) -> Dict[str, Any]:
+    tasks: List[asyncio.Task] = []
+    async with _client_session(None) as session:
+        start = time.perf_counter()
+        index = 0
+        next_at = start
+        while next_at - start < duration:
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+            tasks.append(asyncio.create_task(send_request(session, url, build_payload(index, **payload_args))))
+            index += 1
+            next_at += random.expovariate(rate)
+        results = await asyncio.gather(*tasks)
+        wall_time = time.perf_counter() - start
+    return {"results": list(results), "wall_time": wall_time}
+
+
+def _client_session(limit: Optional[int]) -> aiohttp.ClientSession:
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=limit or 0),
+        timeout=aiohttp.ClientTimeout(total=600),
+    )
+
+
+async def fetch_mock_stats(mock_url: Optional[str], reset: bool = False) -> Optional[Dict[str, Any]]:
+    if not mock_url:
+        return None
+    async with aiohttp.ClientSession() as session:
+        method = session.post if reset else session.get
+        async with method(f"{mock_url}/mock/{'reset' if reset else 'stats'}") as response:
+            return await response.json()
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(run: Dict[str, Any], mock_stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    results = run["results"]
+    wall_time = run["wall_time"]
+    ok = [r for r in results if r["ok"]]
+    latencies = [r["latency"] for r in ok]
+    ttfts = [r["ttft"] for r in ok if r["ttft"] is not None]
+    errors: Dict[str, int] = {}
+    for r in results:
+        if not r["ok"]:
+            errors[str(r["status"])] = errors.get(str(r["status"]), 0) + 1
+
+    summary: Dict[str, Any] = {
+        "requests": len(results),
+        "ok": len(ok),
+        "errors": errors,
+        "error_rate": (len(results) - len(ok)) / len(results) if results else 0.0,
+        "wall_time": wall_time,
+        "throughput_rps": len(ok) / wall_time if wall_time else 0.0,
+        "tokens_per_second": sum(r["completion_tokens"] for r in ok) / wall_time if wall_time else 0.0,
+        "latency_mean": sum(latencies) / len(latencies) if latencies else None,
+        "latency_p50": percentile(latencies, 0.50),
+        "latency_p95": percentile(latencies, 0.95),
+        "latency_p99": percentile(latencies, 0.99),
+        "ttft_p50": percentile(ttfts, 0.50),
+        "ttft_p95": percentile(ttfts, 0.95),
+        "ttft_p99": percentile(ttfts, 0.99),
+    }
+
+    # 서버 오버헤드 = 클라이언트가 본 평균 지연 - mock Ollama가 요청을 붙잡고 있던 평균 시간
+    if mock_stats and mock_stats.get("requests") and latencies:
+        upstream_mean = mock_stats["service_time_sum"] / mock_stats["requests"]
+        summary["upstream_mean"] = upstream_mean
+        summary["server_overhead_ms"] = (summary["latency_mean"] - upstream_mean) * 1000
+        summary["upstream_max_active"] = mock_stats["max_active"]
+    return summary
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """baseline보다 tolerance(비율) 이상 나빠진 지표 목록"""
+    regressions = []
+    for key in HIGHER_IS_WORSE:
+        before, after = baseline.get(key), current.get(key)
+        # 오버헤드는 ms 단위로 작아서 비율만 보면 흔들리므로 1ms 여유를 둠
+        slack = 1.0 if key == "server_overhead_ms" else 0.0
+        if before is not None and after is not None and after > before * (1 + tolerance) + slack:
+            regressions.append(f"{key}: {before:.4f} -> {after:.4f}")
+    for key in LOWER_IS_WORSE:
+        before, after = baseline.get(key), current.get(key)
+        if before and after is not None and after < before * (1 - tolerance):
+            regressions.append(f"{key}: {before:.4f} -> {after:.4f}")
+    if current.get("error_rate", 0) > baseline.get("error_rate", 0) + tolerance / 10:
+        regressions.append(f"error_rate: {baseline.get('error_rate', 0):.4f} -> {current['error_rate']:.4f}")
+    return regressions
+
+
+def print_summary(name: str, summary: Dict[str, Any]) -> None:
+    def ms(value: Optional[float]) -> str:
+        return f"{value * 1000:8.1f}ms" if value is not None else "       -  "
+
+    print(f"\n📊 {name}")
+    print(f"  requests: {summary['requests']}  ok: {summary['ok']}  errors: {summary['errors'] or '-'}")
+    print(f"  throughput: {summary['throughput_rps']:.2f} req/s  {summary['tokens_per_second']:.1f} tokens/s  (wall {summary['wall_time']:.2f}s)")
+    print(f"  latency p50 {ms(summary['latency_p50'])}  p95 {ms(summary['latency_p95'])}  p99 {ms(summary['latency_p99'])}")
+    if summary["ttft_p50"] is not None:
+        print(f"  ttft    p50 {ms(summary['ttft_p50'])}  p95 {ms(summary['ttft_p95'])}  p99 {ms(summary['ttft_p99'])}")
+    if "server_overhead_ms" in summary:
+        print(f"  server overhead: {summary['server_overhead_ms']:.1f}ms/request (upstream max active: {summary['upstream_max_active']})")
+    if summary.get("concurrency_limit") is not None:
+        print(f"  concurrency limit: {summary['concurrency_limit']}")
+
+
+def check_baseline(results: Dict[str, Dict[str, Any]], baseline_path: str, tolerance: float) -> bool:
+    """시나리오별로 baseline과 비교, 회귀가 없으면 True"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["scenarios"]
+
+    passed = True
+    for name, summary in results.items():
+        if name not in baseline:
+            continue
+        regressions = compare(summary, baseline[name], tolerance)
+        if regressions:
+            passed = False
+            print(f"❌ {name} regressed vs baseline:")
+            for regression in regressions:
+                print(f"   {regression}")
+        else:
+            print(f"✅ {name} within {tolerance * 100:.0f}% of baseline")
+    return passed
+
+
+def save_results(path: str, results: Dict[str, Dict[str, Any]], config: Dict[str, Any]) -> None:
+    report = {"timestamp": datetime.now().isoformat(), "config": config, "scenarios": results}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nResults saved to: {path}")
+
+
+async def run_scenario(args: argparse.Namespace) -> Dict[str, Any]:
+    payload_args = {
+        "prompt_chars": args.prompt_chars,
+        "num_predict": args.num_predict,
+        "stream": args.stream,
+        "model": args.model,
+    }
+    await fetch_mock_stats(args.mock_url, reset=True)
+    if args.mode == "closed":
+        run = await run_closed_loop(args.url, args.concurrency, args.requests, payload_args)
+    else:
+        run = await run_open_loop(args.url, args.rate, args.duration, payload_args)
+    return summarize(run, await fetch_mock_stats(args.mock_url))
+
+
+def add_load_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--url", default="http://localhost:8000", help="API server URL")
+    parser.add_argument("--model", default="qwen3:14b")
+    parser.add_argument("--prompt-chars", type=int, default=2000, help="Prompt length in characters")
+    parser.add_argument("--num-predict", type=int, default=64, help="Tokens to generate per request")
+    parser.add_argument("--output", "-o", default=None, help="Write results JSON here")
+    parser.add_argument("--baseline", default=None, help="Compare against this results JSON")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed regression ratio (default: 0.15)")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load generator for /v1/chat/completions")
+    add_load_arguments(parser)
+    parser.add_argument("--mode", choices=("closed", "open"), default="closed")
+    parser.add_argument("--concurrency", "-c", type=int, default=8, help="Closed-loop concurrent users")
+    parser.add_argument("--requests", "-r", type=int, default=100, help="Closed-loop total requests")
+    parser.add_argument("--rate", type=float, default=5.0, help="Open-loop arrivals per second")
+    parser.add_argument("--duration", type=float, default=20.0, help="Open-loop duration (s)")
+    parser.add_argument("--stream", action="store_true", help="Use SSE streaming (measures TTFT)")
+    parser.add_argument("--mock-url", default=None, help="Mock Ollama URL, enables server overhead reporting")
+    parser.add_argument("--name", default=None, help="Scenario name in the results file")
+    args = parser.parse_args(argv)
+
+    name = args.name or (f"closed_c{args.concurrency}" if args.mode == "closed" else f"open_r{args.rate:g}") + ("_stream" if args.stream else "")
+    summary = asyncio.run(run_scenario(args))
+    print_summary(name, summary)
+
+    results = {name: summary}
+    if args.output:
+        save_results(args.output, results, vars(args))
+    if args.baseline:
+        return 0 if check_baseline(results, args.baseline, args.tolerance) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
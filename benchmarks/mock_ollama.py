@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+GPU 없이 서버 자체의 오버헤드/동시성 동작을 측정하기 위한 가짜 Ollama 서버
+
+실제 Ollama처럼 병렬 슬롯 수만큼만 동시에 생성하고(나머지는 대기), 프롬프트 평가와
+토큰 생성 시간을 설정한 tokens/sec에 맞춰 sleep으로 흉내 낸다. 응답에는 실제와 같은
+타이밍 필드(나노초)가 들어간다.
+
+    python -m benchmarks.mock_ollama --port 11434 --parallel 4 --decode-tps 40
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Dict
+
+from aiohttp import web
+
+WORDS = ["The", " quick", " brown", " fox", " jumps", " over", " the", " lazy", " dog", "."]
+
+
+@dataclass
+class MockConfig:
+    prompt_tps: float = 2000.0      # 프롬프트 평가 속도 (tokens/sec)
+    decode_tps: float = 40.0        # 생성 속도 (tokens/sec, 요청당)
+    parallel: int = 4               # OLLAMA_NUM_PARALLEL
+    num_predict: int = 64           # options.num_predict가 없을 때 생성할 토큰 수
+    jitter: float = 0.1             # 소요 시간에 곱할 무작위 편차 (0.1 = ±10%)
+    error_rate: float = 0.0         # HTTP 500으로 실패시킬 비율
+    load_time: float = 0.0          # 첫 요청에서 한 번 흉내 낼 모델 로드 시간 (초)
+    contention: float = 0.0         # 동시 생성 1개당 토큰 시간 증가율 (0.1 = 슬롯 하나 더 돌 때마다 10% 느려짐)
+
+
+class MockOllama:
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self.slots = asyncio.Semaphore(config.parallel)
+        self.loaded = config.load_time <= 0
+        self.stats: Dict[str, Any] = {}
+        self.reset()
+
+    def reset(self) -> None:
+        self.stats = {
+            "requests": 0,
+            "errors": 0,
+            "active": 0,
+            "max_active": 0,
+            # 요청 수신 ~ 응답 완료 (슬롯 대기 포함) 합계, 서버 오버헤드 계산용
+            "service_time_sum": 0.0,
+        }
+
+    def _jitter(self, seconds: float) -> float:
+        if self.config.jitter <= 0:
+            return seconds
+        return max(0.0, seconds * random.uniform(1 - self.config.jitter, 1 + self.config.jitter))
+
+    @staticmethod
+    def _count_prompt_tokens(prompt: str) -> int:
+        # 대략 4글자 = 1토큰
+        return max(1, len(prompt) // 4)
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/api/generate", self.generate)
+        app.router.add_get("/api/version", self.version)
+        app.router.add_get("/api/tags", self.tags)
+        app.router.add_get("/api/ps", self.ps)
+        app.router.add_get("/mock/stats", self.get_stats)
+        app.router.add_post("/mock/reset", self.reset_stats)
+        return app
+
+    async def generate(self, request: web.Request) -> web.StreamResponse:
+        received_at = time.perf_counter()
+        body = await request.json()
+        self.stats["requests"] += 1
+
+        if random.random() < self.config.error_rate:
+            self.stats["errors"] += 1
+            return web.json_response({"error": "injected failure"}, status=500)
+
+        options = body.get("options") or {}
+        num_predict = options.get("num_predict") or self.config.num_predict
+        if num_predict < 0:
+            num_predict = self.config.num_predict
+        if not body.get("prompt"):
+            # 빈 프롬프트 = 모델 로드만 요청 (예열)
+            load_duration = await self._load()
+            return web.json_response(self._final(body, "", {"load_duration": int(load_duration * 1e9)}, 0.0, received_at, "load"))
+
+        prompt_tokens = self._count_prompt_tokens(body.get("prompt", ""))
+
+        async with self.slots:
+            self.stats["active"] += 1
+            self.stats["max_active"] = max(self.stats["max_active"], self.stats["active"])
+            try:
+                load_duration = await self._load()
+
+                prompt_eval_duration = self._jitter(prompt_tokens / self.config.prompt_tps)
+                await asyncio.sleep(prompt_eval_duration)
+
+                # 같은 GPU를 나눠 쓰므로 동시에 생성하는 요청이 많을수록 토큰 하나가 느려짐
+                token_time = (1.0 + self.config.contention * (self.stats["active"] - 1)) / self.config.decode_tps
+                timings = {
+                    "load_duration": int(load_duration * 1e9),
+                    "prompt_eval_count": prompt_tokens,
+                    "prompt_eval_duration": int(prompt_eval_duration * 1e9),
+                    "eval_count": num_predict,
+                }
+
+                if body.get("stream", True):
+                    response = await self._stream(request, body, num_predict, token_time, timings, received_at)
+                else:
+                    eval_duration = self._jitter(num_predict * token_time)
+                    await asyncio.sleep(eval_duration)
+                    text = "".join(WORDS[i % len(WORDS)] for i in range(num_predict))
+                    response = web.json_response(self._final(body, text, timings, eval_duration, received_at))
+            finally:
+                self.stats["active"] -= 1
+
+        self.stats["service_time_sum"] += time.perf_counter() - received_at
+        return response
+
+    async def _stream(self, request, body, num_predict, token_time, timings, received_at) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+        decode_started = time.perf_counter()
+        for i in range(num_predict):
+            await asyncio.sleep(self._jitter(token_time))
+            chunk = {"model": body["model"], "created_at": "", "response": WORDS[i % len(WORDS)], "done": False}
+            await response.write((json.dumps(chunk) + "\n").encode())
+        final = self._final(body, "", timings, time.perf_counter() - decode_started, received_at)
+        await response.write((json.dumps(final) + "\n").encode())
+        await response.write_eof()
+        return response
+
+    async def _load(self) -> float:
+        """첫 요청에서만 모델 로드 시간을 흉내 냄"""
+        if self.loaded:
+            return 0.0
+        await asyncio.sleep(self.config.load_time)
+        self.loaded = True
+        return self.config.load_time
+
+    def _final(self, body, text, timings, eval_duration, received_at, done_reason="length") -> Dict[str, Any]:
+        return {
+            "model": body["model"],
+            "created_at": "",
+            "response": text,
+            "done": True,
+            "done_reason": done_reason,
+            "total_duration": int((time.perf_counter() - received_at) * 1e9),
+            "eval_duration": int(eval_duration * 1e9),
+            **timings,
+        }
+
+    async def version(self, request: web.Request) -> web.Response:
+        return web.json_response({"version": "0.0.0-mock"})
+
+    async def tags(self, request: web.Request) -> web.Response:
+        return web.json_response({"models": [{"name": "qwen3:14b", "model": "qwen3:14b", "details": {"family": "qwen3"}}]})
+
+    async def ps(self, request: web.Request) -> web.Response:
+        models = [{"name": "qwen3:14b", "model": "qwen3:14b", "expires_at": ""}] if self.loaded else []
+        return web.json_response({"models": models})
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats)
+
+    async def reset_stats(self, request: web.Request) -> web.Response:
+        self.reset()
+        return web.json_response(self.stats)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Mock Ollama server for offline benchmarks")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--prompt-tps", type=float, default=MockConfig.prompt_tps, help="Prompt eval tokens/sec")
+    parser.add_argument("--decode-tps", type=float, default=MockConfig.decode_tps, help="Decode tokens/sec per request")
+    parser.add_argument("--parallel", type=int, default=MockConfig.parallel, help="Parallel slots (OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--num-predict", type=int, default=MockConfig.num_predict, help="Tokens to generate when num_predict is not set")
+    parser.add_argument("--jitter", type=float, default=MockConfig.jitter, help="Relative timing jitter (0.1 = ±10%%)")
+    parser.add_argument("--error-rate", type=float, default=MockConfig.error_rate, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--load-time", type=float, default=MockConfig.load_time, help="Simulated model load on the first request (s)")
+    parser.add_argument("--contention", type=float, default=MockConfig.contention, help="Per-token slowdown per extra active request")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    if args.seed is not None:
+        random.seed(args.seed)
+    config = MockConfig(
+        prompt_tps=args.prompt_tps,
+        decode_tps=args.decode_tps,
+        parallel=args.parallel,
+        num_predict=args.num_predict,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        load_time=args.load_time,
+        contention=args.contention,
+    )
+    print(f"Mock Ollama on :{args.port} ({config})")
+    web.run_app(MockOllama(config).app(), port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+응답 경로 CPU 마이크로벤치마크 (서버/Ollama 없이 실행)
+
+OLLAMA 응답 본문(bytes) → OpenAI 응답 bytes 변환에 드는 요청당 CPU 시간을 비교한다.
+
+- legacy: response.json() → ollama.GenerateResponse → Choice/Usage/ChatCompletionResponse
+          → FastAPI jsonable_encoder → json.dumps (이전 경로)
+- fast:   fastjson.loads → convert_result_to_response(dict) → FastJSONResponse.render (현재 경로)
+
+스트리밍은 청크마다 ChatCompletionChunk를 직렬화하던 이전 방식과 현재 stream_chunks_to_events를
+같은 가짜 청크 스트림으로 돌려 토큰당 CPU 시간을 비교한다.
+
+    python -m benchmarks.response_path --iterations 20000 --response-chars 1200
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, AsyncIterator, Callable, Dict, List
+
+import ollama
+from fastapi.encoders import jsonable_encoder
+
+from chat.models import (
+    ChatCompletionChunk,
+    ChatCompletionResponse,
+    Choice,
+    ChunkChoice,
+    DeltaMessage,
+    Message,
+    Usage,
+)
+from chat.service import convert_result_to_response, stream_chunks_to_events
+from core import fastjson
+from core.fastjson import FastJSONResponse
+
+
+def build_body(response_chars: int) -> bytes:
+    text = ("The quick brown fox jumps over the lazy dog. 빠른 갈색 여우가 게으른 개를 뛰어넘는다. " * (response_chars // 60 + 1))[:response_chars].strip()
+    return json.dumps({
+        "model": "qwen3:14b",
+        "created_at": "2025-01-01T00:00:00.000000Z",
+        "response": text,
+        "done": True,
+        "done_reason": "stop",
+        "total_duration": 5_000_000_000,
+        "load_duration": 20_000_000,
+        "prompt_eval_count": 850,
+        "prompt_eval_duration": 400_000_000,
+        "eval_count": 300,
+        "eval_duration": 4_500_000_000,
+    }).encode()
+
+
+def legacy_unary(body: bytes) -> bytes:
+    data = json.loads(body.decode("utf-8"))
+    result = ollama.GenerateResponse(
+        model=data.get("model", ""),
+        created_at=data.get("created_at", ""),
+        response=data.get("response", ""),
+        done=data.get("done", True),
+        context=data.get("context", []),
+        total_duration=data.get("total_duration", 0),
+        load_duration=data.get("load_duration", 0),
+        prompt_eval_count=data.get("prompt_eval_count", 0),
+        prompt_eval_duration=data.get("prompt_eval_duration", 0),
+        eval_count=data.get("eval_count", 0),
+        eval_duration=data.get("eval_duration", 0),
+    )
+    prompt_tokens = getattr(result, "prompt_eval_count", 0) or 0
+    completion_tokens = getattr(result, "eval_count", 0) or 0
+    response = ChatCompletionResponse(
+        id=f"chatcmpl-{uuid.uuid4().hex[:10]}",
+        object="chat.completion",
+        created=int(time.time()),
+        model="qwen3:14b",
+        choices=[Choice(index=0, message=Message(role="assistant", content=result.response), finish_reason="stop")],
+        usage=Usage(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, total_tokens=prompt_tokens + completion_tokens),
+    )
+    # FastAPI가 response_model 없이 pydantic 객체를 돌려받았을 때 하는 일 (JSONResponse.render)
+    return json.dumps(jsonable_encoder(response), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def fast_unary(body: bytes) -> bytes:
+    return FastJSONResponse(convert_result_to_response("qwen3:14b", fastjson.loads(body))).body
+
+
+async def fake_chunks(tokens: int) -> AsyncIterator[Dict[str, Any]]:
+    for _ in range(tokens):
+        yield {"response": " token", "done": False}
+    yield {"response": "", "done": True, "done_reason": "stop", "prompt_eval_count": 850, "eval_count": tokens}
+
+
+async def legacy_stream_events(chunks: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    """이전 stream_chunks_to_events의 이벤트 생성 부분 (청크마다 ChatCompletionChunk 직렬화)"""
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:10]}"
+    created = int(time.time())
+
+    def event(choices, usage: Usage = None) -> str:
+        chunk = ChatCompletionChunk(id=completion_id, created=created, model="qwen3:14b", choices=choices, usage=usage)
+        return f"data: {chunk.model_dump_json(exclude_none=True)}\n\n"
+
+    yield event([ChunkChoice(index=0, delta=DeltaMessage(role="assistant", content=""))])
+    async for chunk in chunks:
+        if chunk.get("response"):
+            yield event([ChunkChoice(index=0, delta=DeltaMessage(content=chunk["response"]))])
+        if chunk.get("done"):
+            prompt_tokens = chunk.get("prompt_eval_count", 0) or 0
+            completion_tokens = chunk.get("eval_count", 0) or 0
+            yield event([ChunkChoice(index=0, delta=DeltaMessage(), finish_reason="stop")])
+            yield event([], usage=Usage(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, total_tokens=prompt_tokens + completion_tokens))
+    yield "data: [DONE]\n\n"
+
+
+async def fast_stream_events(chunks: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    async for event in stream_chunks_to_events("qwen3:14b", await chunks.__anext__(), chunks):
+        yield event
+
+
+def drive_streams(make_events: Callable, streams: int, tokens: int) -> None:
+    async def consume() -> None:
+        for _ in range(streams):
+            async for _ in make_events(fake_chunks(tokens)):
+                pass
+
+    asyncio.run(consume())
+
+
+def cpu_per_call(function: Callable[[], Any], iterations: int) -> float:
+    """호출당 CPU 시간 (마이크로초)"""
+    function()
+    started = time.process_time()
+    for _ in range(iterations):
+        function()
+    return (time.process_time() - started) / iterations * 1e6
+
+
+def run(iterations: int, response_chars: int, tokens: int) -> Dict[str, float]:
+    body = build_body(response_chars)
+    assert json.loads(fast_unary(body))["choices"][0]["message"]["content"] == json.loads(legacy_unary(body))["choices"][0]["message"]["content"]
+
+    streams = max(1, iterations // tokens)
+    return {
+        "unary_legacy_us": cpu_per_call(lambda: legacy_unary(body), iterations),
+        "unary_fast_us": cpu_per_call(lambda: fast_unary(body), iterations),
+        # 스트림 전체(청크 구동 + 이벤트 직렬화)를 토큰 수로 나눈 값
+        "chunk_legacy_us": cpu_per_call(lambda: drive_streams(legacy_stream_events, streams, tokens), 1) / (streams * tokens),
+        "chunk_fast_us": cpu_per_call(lambda: drive_streams(fast_stream_events, streams, tokens), 1) / (streams * tokens),
+    }
+
+
+def print_results(results: Dict[str, float], response_chars: int) -> None:
+    unary_saved = results["unary_legacy_us"] - results["unary_fast_us"]
+    chunk_saved = results["chunk_legacy_us"] - results["chunk_fast_us"]
+    print(f"\n📊 Response path CPU per request ({response_chars} chars, JSON library: {'orjson' if fastjson.orjson else 'json'})")
+    print(f"  unary   legacy {results['unary_legacy_us']:8.1f}µs  fast {results['unary_fast_us']:8.1f}µs  saved {unary_saved:8.1f}µs ({unary_saved / results['unary_legacy_us'] * 100:.0f}%)")
+    print(f"  chunk   legacy {results['chunk_legacy_us']:8.1f}µs  fast {results['chunk_fast_us']:8.1f}µs  saved {chunk_saved:8.1f}µs per streamed token")
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Response path CPU microbenchmark")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--response-chars", type=int, default=1200, help="Length of the generated text")
+    parser.add_argument("--tokens", type=int, default=200, help="Chunks per simulated stream")
+    args = parser.parse_args(argv)
+    print_results(run(args.iterations, args.response_chars, args.tokens), args.response_chars)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+오프라인 벤치마크 스위트: mock Ollama + API 서버를 띄우고 표준 시나리오를 실행
+
+GPU 없이 어디서나 같은 조건으로 돌릴 수 있으므로, 서버 코드 변경 전후의
+오버헤드/동시성 동작 비교(회귀 검사)에 쓴다.
+
+    python -m benchmarks.suite --output bench.json                       # 실행 + 저장
+    python -m benchmarks.suite --save-baseline benchmarks/baseline.json  # 기준 저장
+    python -m benchmarks.suite --baseline benchmarks/baseline.json       # 기준과 비교 (회귀 시 exit 1)
+    python -m benchmarks.suite --adaptive --max-in-flight 32             # 적응형 상한이 어디로 수렴하는지 확인
+    python -m benchmarks.suite --workers 4                               # 워커 4개가 슬롯/캐시를 공유 (SHARED_STATE_DIR)
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import aiohttp
+
+from benchmarks.load_test import (
+    add_load_arguments,
+    check_baseline,
+    fetch_mock_stats,
+    print_summary,
+    run_closed_loop,
+    run_open_loop,
+    save_results,
+    summarize,
+)
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# (이름, 모드, 파라미터, 스트리밍)
+SCENARIOS = [
+    ("closed_c1", "closed", {"concurrency": 1, "requests": 20}, False),
+    ("closed_c8", "closed", {"concurrency": 8, "requests": 80}, False),
+    ("closed_c32_stream", "closed", {"concurrency": 32, "requests": 160}, True),
+    ("open_r4_stream", "open", {"rate": 4.0, "duration": 10.0}, True),
+]
+
+
+async def wait_until_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(url) as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not become ready within {timeout:.0f}s")
+
+
+@contextmanager
+def spawn(args: List[str], env: Dict[str, str]) -> Iterator[subprocess.Popen]:
+    process = subprocess.Popen(args, cwd=ROOT, env={**os.environ, **env}, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+async def fetch_concurrency_limit(url: str) -> Optional[int]:
+    """API 서버가 지금 쓰는 동시 실행 상한 (GET /의 scheduler.limit)"""
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{url}/") as response:
+            return (await response.json())["scheduler"].get("limit")
+
+
+async def run_suite(args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    mock_url = f"http://127.0.0.1:{args.mock_port}"
+    await wait_until_ready(f"{mock_url}/api/version")
+    await wait_until_ready(f"{args.url}/")
+
+    payload_args = {"prompt_chars": args.prompt_chars, "num_predict": args.num_predict, "model": args.model}
+    results = {}
+    for name, mode, params, stream in SCENARIOS:
+        if args.only and name not in args.only:
+            continue
+        await fetch_mock_stats(mock_url, reset=True)
+        scenario_args = {**payload_args, "stream": stream}
+        if mode == "closed":
+            run = await run_closed_loop(args.url, params["concurrency"], params["requests"], scenario_args)
+        else:
+            run = await run_open_loop(args.url, params["rate"], params["duration"], scenario_args)
+        results[name] = summarize(run, await fetch_mock_stats(mock_url))
+        results[name]["concurrency_limit"] = await fetch_concurrency_limit(args.url)
+        print_summary(name, results[name])
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmark suite (mock Ollama + API server)")
+    add_load_arguments(parser)
+    parser.add_argument("--port", type=int, default=18000, help="API server port")
+    parser.add_argument("--mock-port", type=int, default=18434, help="Mock Ollama port")
+    parser.add_argument("--parallel", type=int, default=4, help="Mock parallel slots")
+    parser.add_argument("--decode-tps", type=float, default=200.0, help="Mock decode tokens/sec")
+    parser.add_argument("--prompt-tps", type=float, default=5000.0, help="Mock prompt eval tokens/sec")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--contention", type=float, default=0.0, help="Mock per-token slowdown per extra active request")
+    parser.add_argument("--adaptive", action="store_true", help="Enable the adaptive concurrency limiter (CONCURRENCY_LIMITER=1)")
+    parser.add_argument("--max-in-flight", type=int, default=None, help="SCHEDULER_MAX_IN_FLIGHT (default: --parallel, or 32 with --adaptive)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes (>1 shares slots via SHARED_STATE_DIR)")
+    parser.add_argument("--only", nargs="*", help="Run only these scenarios")
+    parser.add_argument("--save-baseline", default=None, help="Write results as the new baseline")
+    parser.set_defaults(url=None)
+    args = parser.parse_args(argv)
+    args.url = args.url or f"http://127.0.0.1:{args.port}"
+
+    mock_command = [
+        sys.executable, "-m", "benchmarks.mock_ollama",
+        "--port", str(args.mock_port),
+        "--parallel", str(args.parallel),
+        "--decode-tps", str(args.decode_tps),
+        "--prompt-tps", str(args.prompt_tps),
+        "--jitter", str(args.jitter),
+        "--error-rate", str(args.error_rate),
+        "--contention", str(args.contention),
+        "--seed", "0",
+    ]
+    server_command = [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--port", str(args.port), "--workers", str(args.workers), "--log-level", "warning",
+    ]
+    server_env = {
+        "OLLAMA_BASE_URL": f"http://127.0.0.1:{args.mock_port}",
+        "BACKEND_PARALLEL_SLOTS": str(args.parallel),
+        # 요청마다 프롬프트가 다르지만, 캐시 조회 비용이 아닌 순수 경로를 재도록 끔
+        "CACHE_ENABLED": "0",
+        "LOG_SAMPLE_RATE": "0",
+    }
+    if args.adaptive:
+        # 상한을 넉넉히 열어 두고 limiter가 스스로 찾게 함
+        server_env["CONCURRENCY_LIMITER"] = "1"
+        server_env["SCHEDULER_MAX_IN_FLIGHT"] = str(args.max_in_flight or 32)
+    elif args.max_in_flight:
+        server_env["SCHEDULER_MAX_IN_FLIGHT"] = str(args.max_in_flight)
+
+    print(f"🚀 Mock Ollama :{args.mock_port} (parallel={args.parallel}, decode={args.decode_tps:g} tok/s) + API server :{args.port} ({args.workers} workers)")
+    with tempfile.TemporaryDirectory() as shared_dir:
+        if args.workers > 1:
+            server_env["SHARED_STATE_DIR"] = shared_dir
+        with spawn(mock_command, {}), spawn(server_command, server_env):
+            results = asyncio.run(run_suite(args))
+
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "baseline", "save_baseline")}
+    if args.output:
+        save_results(args.output, results, config)
+    if args.save_baseline:
+        save_results(args.save_baseline, results, config)
+    if args.baseline:
+        return 0 if check_baseline(results, args.baseline, args.tolerance) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from core.config import settings
+
+
+def make_cache_key(prompt: str, model: str, options: Dict[str, Any]) -> str:
+    """렌더링된 프롬프트 + 모델 + 샘플링 옵션의 정규화된 해시"""
+    canonical = json.dumps(
+        {"prompt": prompt, "model": model, "options": options},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class _DiskTier:
+    """SQLite 기반 영속 캐시 (재시작 후에도 유지). 블로킹 호출이므로 to_thread로 사용
+
+    저장할 때 만료된 행을 지우고, prune_every번 저장마다 max_entries를 넘는 행을 만료가 이른
+    (오래전에 저장된) 것부터 지워 파일이 계속 커지지 않게 한다.
+    """
+
+    def __init__(self, path: Path, max_entries: Optional[int] = None, prune_every: int = 64):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries or settings.cache_disk_max_entries
+        self.prune_every = prune_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_expires_at ON responses (expires_at)")
+        with self._lock:
+            self._prune()
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Dict[str, Any], expires_at: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), expires_at),
+            )
+            self._conn.execute("DELETE FROM responses WHERE expires_at < ?", (time.time(),))
+            self._writes += 1
+            if self._writes % self.prune_every == 0:
+                self._prune()
+            self._conn.commit()
+
+    def _prune(self) -> None:
+        self._conn.execute("DELETE FROM responses WHERE expires_at < ?", (time.time(),))
+        self._conn.execute(
+            "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """결정적(temperature=0 또는 seed 고정) 응답 캐시
+
+    1차: 메모리 LRU (TTL, 최대 개수 제한) - 히트 시 이벤트 루프에서 바로 반환
+    2차: 선택적 SQLite 디스크 계층 - 메모리에 없을 때만 조회하고, 히트하면 메모리로 승격
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl: Optional[float] = None,
+        disk_path: Optional[str] = None,
+    ):
+        self.max_entries = max_entries or settings.cache_max_entries
+        self.ttl = ttl or settings.cache_ttl
+        disk_path = disk_path if disk_path is not None else settings.cache_disk_path
+        self._disk = _DiskTier(Path(disk_path)) if disk_path else None
+
+        # key -> (value, expires_at)
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at >= time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+
+        if self._disk is not None:
+            entry = await asyncio.to_thread(self._disk.get, key)
+            if entry is not None:
+                self._put_memory(key, *entry)
+                self.disk_hits += 1
+                return entry[0]
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        expires_at = time.time() + self.ttl
+        self._put_memory(key, value, expires_at)
+        if self._disk is not None:
+            await asyncio.to_thread(self._disk.set, key, value, expires_at)
+
+    def _put_memory(self, key: str, value: Dict[str, Any], expires_at: float) -> None:
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def close(self) -> None:
+        if self._disk is not None:
+            self._disk.close()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "disk": self._disk is not None,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+        }
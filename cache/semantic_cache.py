@@ -0,0 +1,160 @@
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from cache.vector_cache import VectorCache
+from core.config import settings
+from core.logging import logging_manager
+from embeddings.service import EmbeddingBatcher, embed_texts
+from model.scheduler import INTERACTIVE
+
+try:
+    # 선택 의존성: 없으면 시맨틱 캐시를 끈다
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging_manager.get_logger(__name__)
+
+
+@dataclass
+class SemanticQuery:
+    """한 요청의 검색 키: 네임스페이스(모델/옵션/시스템 프롬프트) + 정규화한 사용자 입력 벡터"""
+    namespace: int
+    vector: Any
+
+
+@dataclass
+class SemanticHit:
+    value: Dict[str, Any]
+    similarity: float
+
+
+class SemanticCache:
+    """문구만 조금 다른 요청에 저장된 응답을 돌려주는 유사도 캐시
+
+    사용자 메시지를 임베딩해 정규화한 벡터를 float32 행렬 하나에 링 버퍼로 저장하고,
+    같은 네임스페이스의 행과 내적(코사인 유사도)해서 threshold 이상인 가장 가까운 응답을 쓴다.
+    - 크기: max_entries개가 차면 가장 오래된 행부터 덮어씀
+    - 나이: ttl초가 지난 행은 검색에서 제외
+    """
+
+    def __init__(
+        self,
+        batcher: EmbeddingBatcher,
+        vector_cache: Optional[VectorCache] = None,
+        embed_model: Optional[str] = None,
+        threshold: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        ttl: Optional[float] = None,
+    ):
+        self.batcher = batcher
+        self.vector_cache = vector_cache
+        self.embed_model = embed_model or settings.semantic_cache_embed_model
+        self.threshold = threshold if threshold is not None else settings.semantic_cache_threshold
+        self.max_entries = max_entries or settings.semantic_cache_max_entries
+        self.ttl = ttl or settings.semantic_cache_ttl
+
+        # 첫 벡터가 들어올 때 차원을 알고 할당 (행렬은 필요한 만큼 두 배씩 키움)
+        self._vectors = None
+        self._namespaces = None
+        self._created = None
+        self._values: List[Optional[Dict[str, Any]]] = []
+        self._size = 0
+        self._next = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    async def query(self, namespace: int, text: str, priority: str = INTERACTIVE) -> Optional[SemanticQuery]:
+        """text를 임베딩해 검색 키로 (임베딩 실패 시 None: 캐시 없이 진행)"""
+        try:
+            vectors, _ = await embed_texts([text], self.embed_model, self.batcher, self.vector_cache, priority=priority)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Semantic cache embedding failed ({self.embed_model}): {e}")
+            return None
+        vector = np.asarray(vectors[0], dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        if norm == 0.0:
+            return None
+        return SemanticQuery(namespace, vector / norm)
+
+    def search(self, query: SemanticQuery) -> Optional[SemanticHit]:
+        if self._size == 0 or query.vector.shape[0] != self._vectors.shape[1]:
+            self.misses += 1
+            return None
+        size = self._size
+        rows = np.flatnonzero(
+            (self._namespaces[:size] == query.namespace)
+            & (self._created[:size] >= time.time() - self.ttl)
+        )
+        if rows.size == 0:
+            self.misses += 1
+            return None
+        scores = self._vectors[rows] @ query.vector
+        best = int(np.argmax(scores))
+        similarity = float(scores[best])
+        if similarity < self.threshold:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return SemanticHit(self._values[rows[best]], similarity)
+
+    def add(self, query: SemanticQuery, value: Dict[str, Any]) -> None:
+        dimensions = query.vector.shape[0]
+        if self._vectors is None:
+            self._allocate(min(self.max_entries, 1024), dimensions)
+        elif dimensions != self._vectors.shape[1]:
+            # 임베딩 모델이 바뀌면 이전 벡터와 비교할 수 없으므로 비움
+            self._allocate(self._vectors.shape[0], dimensions)
+        elif self._next == self._vectors.shape[0] and self._next < self.max_entries:
+            self._grow(min(self.max_entries, self._next * 2))
+
+        row = self._next
+        self._vectors[row] = query.vector
+        self._namespaces[row] = query.namespace
+        self._created[row] = time.time()
+        self._values[row] = value
+        self._size = max(self._size, row + 1)
+        self._next = (row + 1) % self.max_entries
+
+    def _allocate(self, capacity: int, dimensions: int) -> None:
+        self._vectors = np.zeros((capacity, dimensions), dtype=np.float32)
+        self._namespaces = np.zeros(capacity, dtype=np.int64)
+        self._created = np.zeros(capacity, dtype=np.float64)
+        self._values = [None] * capacity
+        self._size = 0
+        self._next = 0
+
+    def _grow(self, capacity: int) -> None:
+        extra = capacity - self._vectors.shape[0]
+        self._vectors = np.vstack([self._vectors, np.zeros((extra, self._vectors.shape[1]), dtype=np.float32)])
+        self._namespaces = np.concatenate([self._namespaces, np.zeros(extra, dtype=np.int64)])
+        self._created = np.concatenate([self._created, np.zeros(extra, dtype=np.float64)])
+        self._values.extend([None] * extra)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        live = int(np.count_nonzero(self._created[:self._size] >= time.time() - self.ttl)) if self._size else 0
+        return {
+            "embed_model": self.embed_model,
+            "threshold": self.threshold,
+            "entries": live,
+            "max_entries": self.max_entries,
+            "bytes": self._vectors.nbytes if self._vectors is not None else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def create_semantic_cache(batcher: EmbeddingBatcher, vector_cache: Optional[VectorCache] = None) -> Optional[SemanticCache]:
+    """SEMANTIC_CACHE_ENABLED이고 numpy가 있을 때만 만듦"""
+    if not settings.semantic_cache_enabled:
+        return None
+    if np is None:
+        logger.warning("SEMANTIC_CACHE_ENABLED=1 but numpy is not installed (pip install .[semantic]); semantic cache disabled")
+        return None
+    return SemanticCache(batcher, vector_cache)
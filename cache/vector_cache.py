@@ -0,0 +1,108 @@
+import hashlib
+import sys
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from core.config import settings
+
+
+def make_vector_key(text: str) -> bytes:
+    """입력 텍스트의 내용 해시 (모델/차원은 저장소 단위로 구분)"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class _VectorStore:
+    """한 (모델, 차원)의 벡터를 float32 배열 하나에 행 단위로 저장
+
+    벡터마다 list[float]를 두면 원소마다 Python 객체(24바이트+)가 생기지만, 여기서는
+    값당 4바이트만 쓴다. 꽉 차면 가장 오래 안 쓴 행을 새 벡터가 덮어쓴다.
+    """
+
+    def __init__(self, dimensions: int, max_entries: int):
+        self.dimensions = dimensions
+        self.max_entries = max_entries
+        self.vectors = array("f")
+        # key -> 행 번호 (순서 = 최근 사용 순)
+        self.rows: "OrderedDict[bytes, int]" = OrderedDict()
+
+    def get(self, key: bytes) -> Optional[array]:
+        row = self.rows.get(key)
+        if row is None:
+            return None
+        self.rows.move_to_end(key)
+        start = row * self.dimensions
+        return self.vectors[start:start + self.dimensions]
+
+    def put(self, key: bytes, vector: Sequence[float]) -> None:
+        if key in self.rows:
+            self.rows.move_to_end(key)
+            return
+        if len(self.rows) < self.max_entries:
+            row = len(self.rows)
+            self.vectors.extend(vector)
+        else:
+            _, row = self.rows.popitem(last=False)
+            start = row * self.dimensions
+            self.vectors[start:start + self.dimensions] = array("f", vector)
+        self.rows[key] = row
+
+
+class VectorCache:
+    """입력 텍스트 해시 → 임베딩 벡터 (모델/차원별 float32 배열 저장소, LRU)
+
+    임베딩은 결정적이므로 같은 기사가 다시 들어오면 Ollama를 부르지 않는다.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries if max_entries is not None else settings.embed_cache_max_entries
+        self._stores: Dict[Tuple[str, Optional[int]], _VectorStore] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, model: str, dimensions: Optional[int], key: bytes) -> Optional[array]:
+        store = self._stores.get((model, dimensions))
+        vector = store.get(key) if store else None
+        if vector is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return vector
+
+    def put(self, model: str, dimensions: Optional[int], key: bytes, vector: Sequence[float]) -> None:
+        if not self.enabled:
+            return
+        store = self._stores.get((model, dimensions))
+        if store is None:
+            store = self._stores[(model, dimensions)] = _VectorStore(len(vector), self.max_entries)
+        if len(vector) == store.dimensions:
+            store.put(key, vector)
+
+    def stats(self) -> Dict[str, Any]:
+        stores: List[Dict[str, Any]] = [
+            {
+                "model": model,
+                "dimensions": store.dimensions,
+                "entries": len(store.rows),
+                "bytes": store.vectors.buffer_info()[1] * store.vectors.itemsize,
+            }
+            for (model, _), store in self._stores.items()
+        ]
+        return {
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": stores,
+        }
+
+
+def vector_to_bytes(vector: array) -> bytes:
+    """float32 little-endian 바이트 (OpenAI encoding_format=base64 형식)"""
+    if sys.byteorder != "little":
+        vector = array("f", vector)
+        vector.byteswap()
+    return vector.tobytes()
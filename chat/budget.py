@@ -0,0 +1,202 @@
+import bisect
+import time
+from typing import Dict, List, Optional, Tuple
+
+from chat.models import ChatCompletionRequest, Message
+from chat.thinking import get_thinking_budget
+from core.config import settings
+from templates.base import ChatTemplate
+
+# 메시지 하나당 턴 구분 토큰(<|im_start|>role\n ... <|im_end|>\n 등) 대략치
+MESSAGE_OVERHEAD_TOKENS = 5
+
+
+class ContextOverflowError(Exception):
+    """프롬프트 + 생성 토큰이 컨텍스트 창을 넘음 (HTTP 400)"""
+
+    def __init__(self, prompt_tokens: int, num_predict: int, limit: int):
+        super().__init__(
+            f"This model's maximum context length is {limit} tokens, but the request needs about "
+            f"{prompt_tokens + num_predict} ({prompt_tokens} in the prompt, {num_predict} to generate)"
+        )
+        self.prompt_tokens = prompt_tokens
+        self.limit = limit
+
+
+class TokenCounter:
+    """토크나이저 없이 쓰는 빠른 토큰 수 추정기
+
+    ASCII는 약 4글자, 한글 등 비ASCII는 약 1.5글자당 1토큰으로 세고, OLLAMA가 돌려준
+    실제 prompt_eval_count로 모델별 보정 계수를 학습한다. 추정식이 글자 수에 선형이라
+    메시지별 추정치를 더하면 전체 프롬프트 추정치가 된다.
+    """
+
+    def __init__(self, ascii_chars_per_token: float = 4.0, other_chars_per_token: float = 1.5):
+        self.ascii_chars_per_token = ascii_chars_per_token
+        self.other_chars_per_token = other_chars_per_token
+        self._factors: Dict[str, float] = {}
+
+    def count(self, text: str, model: Optional[str] = None) -> int:
+        chars = len(text)
+        # UTF-8에서 비ASCII 글자는 2~4바이트 (한글은 3바이트)
+        other = min(chars, (len(text.encode("utf-8")) - chars) // 2)
+        estimate = (chars - other) / self.ascii_chars_per_token + other / self.other_chars_per_token
+        return int(estimate * self._factors.get(model, 1.0)) + 1
+
+    def observe(self, model: str, estimated: int, actual: int) -> None:
+        """실제 프롬프트 토큰 수로 보정 (KV 캐시 재사용으로 일부만 평가된 응답은 제외)"""
+        if not estimated or not actual or actual < estimated * 0.5:
+            return
+        factor = self._factors.get(model, 1.0)
+        ratio = factor * actual / estimated
+        self._factors[model] = min(3.0, max(0.3, 0.9 * factor + 0.1 * ratio))
+
+    def stats(self) -> Dict[str, float]:
+        return dict(self._factors)
+
+
+def generation_tokens(chat_completion_request: ChatCompletionRequest, template: ChatTemplate) -> int:
+    """생성에 남겨 둘 토큰 수 (num_predict + 추론 예산)"""
+    return max(chat_completion_request.num_predict or 0, 0) + (get_thinking_budget(chat_completion_request, template) or 0)
+
+
+class ContextBudget:
+    """요청을 보내기 전에 컨텍스트 창 검사 + num_ctx 버킷 선택
+
+    - 프롬프트 + num_predict가 한도를 넘으면 정책에 따라 거절(400)하거나
+      오래된 메시지부터 빼고 마지막 메시지를 잘라 맞춘다
+    - num_ctx는 정해진 버킷 중 하나로 올림하고, 이미 더 큰 버킷으로 로드된 모델은
+      그 크기를 그대로 써서 컨텍스트 크기 변경 때문에 모델이 다시 로드되지 않게 한다
+    """
+
+    def __init__(
+        self,
+        buckets: Optional[List[int]] = None,
+        policy: Optional[str] = None,
+        margin: Optional[float] = None,
+        counter: Optional[TokenCounter] = None,
+        lookup_retry: float = 30.0,
+    ):
+        self.buckets = sorted(buckets if buckets is not None else settings.context_buckets)
+        self.policy = policy or settings.context_overflow_policy
+        self.margin = margin if margin is not None else settings.context_estimate_margin
+        self.counter = counter or TokenCounter()
+        self.lookup_retry = lookup_retry
+        # 모델별 학습 컨텍스트 길이 (/api/show), 모델별 현재 사용 중인 num_ctx
+        self._model_contexts: Dict[str, int] = {}
+        # 조회에 실패한 모델 -> 다시 조회할 시각 (일시적인 실패를 재시작까지 기억하지 않게)
+        self._lookup_failed: Dict[str, float] = {}
+        self._current_num_ctx: Dict[str, int] = {}
+
+        self.trimmed = 0
+        self.rejected = 0
+
+    def has_model_context(self, model: str) -> bool:
+        """조회 결과가 있거나 최근에 실패했으면 True (False면 /api/show를 다시 조회)"""
+        if model in self._model_contexts:
+            return True
+        retry_at = self._lookup_failed.get(model)
+        return retry_at is not None and time.monotonic() < retry_at
+
+    def set_model_context(self, model: str, context_length: Optional[int]) -> None:
+        """성공한 조회만 저장하고, 실패(None)는 lookup_retry초 뒤에 다시 조회"""
+        if context_length is None:
+            self._lookup_failed[model] = time.monotonic() + self.lookup_retry
+            return
+        self._lookup_failed.pop(model, None)
+        self._model_contexts[model] = context_length
+
+    def limit(self, model: str) -> Optional[int]:
+        """이 모델에 쓸 수 있는 최대 컨텍스트 (모르면 None = 검사 안 함)"""
+        model_context = self._model_contexts.get(model)
+        bucket_max = self.buckets[-1] if self.buckets else None
+        if model_context and bucket_max:
+            return min(model_context, bucket_max)
+        return model_context or bucket_max
+
+    def fit(
+        self,
+        chat_completion_request: ChatCompletionRequest,
+        template: ChatTemplate,
+        prompt: str,
+    ) -> Tuple[str, int, bool]:
+        """(프롬프트, 추정 프롬프트 토큰 수, 잘라냈는지) 반환. 맞출 수 없으면 ContextOverflowError"""
+        model = chat_completion_request.model
+        num_predict = generation_tokens(chat_completion_request, template)
+        prompt_tokens = self.counter.count(prompt, model)
+        limit = self.limit(model)
+        if limit is None or self._with_margin(prompt_tokens) + num_predict <= limit:
+            return prompt, prompt_tokens, False
+
+        policy = chat_completion_request.truncation or ("auto" if self.policy == "trim" else "disabled")
+        if policy != "auto":
+            self.rejected += 1
+            raise ContextOverflowError(self._with_margin(prompt_tokens), num_predict, limit)
+
+        budget = int((limit - num_predict) / (1 + self.margin))
+        messages = self._trim_messages(chat_completion_request.messages, model, budget)
+        if messages is None:
+            self.rejected += 1
+            raise ContextOverflowError(self._with_margin(prompt_tokens), num_predict, limit)
+
+        self.trimmed += 1
+        prompt = template.convert_messages(messages, chat_completion_request.thinking)
+        return prompt, self.counter.count(prompt, model), True
+
+    def _with_margin(self, tokens: int) -> int:
+        return int(tokens * (1 + self.margin))
+
+    def _trim_messages(self, messages: List[Message], model: str, budget: int) -> Optional[List[Message]]:
+        """system 메시지와 마지막 메시지는 남기고 오래된 대화부터 제거, 그래도 넘치면 마지막 메시지 뒷부분을 자름"""
+        costs = [self.counter.count(message.content, model) + MESSAGE_OVERHEAD_TOKENS for message in messages]
+        total = sum(costs) + MESSAGE_OVERHEAD_TOKENS
+        keep = [True] * len(messages)
+        last = len(messages) - 1
+
+        for index, message in enumerate(messages[:-1]):
+            if total <= budget:
+                break
+            if message.role != "system":
+                keep[index] = False
+                total -= costs[index]
+
+        trimmed = [message for index, message in enumerate(messages) if keep[index]]
+        if total <= budget:
+            return trimmed
+
+        # 마지막 메시지를 토큰 비율만큼 잘라냄 (기사 본문 등은 앞부분이 중요)
+        over = total - budget
+        content = messages[last].content
+        content_tokens = costs[last] - MESSAGE_OVERHEAD_TOKENS
+        if over >= content_tokens:
+            return None
+        keep_chars = int(len(content) * (content_tokens - over) / content_tokens * 0.95)
+        trimmed[-1] = Message(role=messages[last].role, content=content[:keep_chars])
+        return trimmed
+
+    def num_ctx(self, model: str, prompt_tokens: int, num_predict: Optional[int]) -> Optional[int]:
+        """보낼 num_ctx. 버킷이 없으면 None (OLLAMA 기본값 사용)"""
+        if not self.buckets:
+            return None
+        required = self._with_margin(prompt_tokens) + max(num_predict or 0, 0)
+        current = self._current_num_ctx.get(model)
+        if current is not None and required <= current:
+            return current
+
+        index = bisect.bisect_left(self.buckets, required)
+        num_ctx = self.buckets[min(index, len(self.buckets) - 1)]
+        self._current_num_ctx[model] = num_ctx
+        return num_ctx
+
+    def observe(self, model: str, estimated: int, prompt_eval_count: Optional[int]) -> None:
+        self.counter.observe(model, estimated, prompt_eval_count or 0)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "buckets": self.buckets,
+            "num_ctx": dict(self._current_num_ctx),
+            "model_contexts": dict(self._model_contexts),
+            "estimator_factors": self.counter.stats(),
+            "trimmed": self.trimmed,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,234 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from core.config import settings
+
+
+class IdempotencyConflictError(Exception):
+    """같은 Idempotency-Key를 다른 요청 본문에 다시 씀 (HTTP 422)"""
+
+
+class _Flight:
+    """진행 중인 일반(비스트리밍) 생성 하나와 그 결과를 기다리는 요청 수"""
+
+    def __init__(self, task: asyncio.Task, fingerprint: str, keep_until: Optional[float] = None):
+        self.task = task
+        self.fingerprint = fingerprint
+        # Idempotency-Key가 있으면 기다리는 요청이 모두 떠나도 이 시각(monotonic)까지 계속 생성
+        self.keep_until = keep_until
+        self.waiters = 0
+
+
+def _cancel_later(task: asyncio.Task, keep_until: Optional[float]) -> bool:
+    """keep_until이 있으면 그때 취소를 예약하고 True, 없거나 이미 지났으면 False"""
+    if keep_until is None:
+        return False
+    remaining = keep_until - time.monotonic()
+    if remaining <= 0:
+        return False
+    handle = asyncio.get_running_loop().call_later(remaining, task.cancel)
+    task.add_done_callback(lambda _: handle.cancel())
+    return True
+
+
+class _StreamFlight:
+    """진행 중인 스트리밍 생성 하나를 여러 구독자에게 중계
+
+    upstream 청크를 순서대로 모아 두므로, 중간에 합류한 구독자도 처음부터 전부 받는다.
+    모든 구독자가 떠나면 upstream 스트림을 닫아 OLLAMA 슬롯을 반환한다 (keep_until이 있으면
+    그때까지 계속 받아 두어, 같은 Idempotency-Key로 재시도한 요청이 이어 받게 함).
+    """
+
+    def __init__(self, fingerprint: str, keep_until: Optional[float] = None) -> None:
+        self.fingerprint = fingerprint
+        self.keep_until = keep_until
+        self.chunks: List[Dict[str, Any]] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def pump(self, open_stream: Callable[[], Awaitable[AsyncIterator[Dict[str, Any]]]]) -> None:
+        try:
+            chunks = await open_stream()
+            try:
+                async for chunk in chunks:
+                    self.chunks.append(chunk)
+                    self._notify()
+            finally:
+                await chunks.aclose()
+        except asyncio.CancelledError:
+            self.error = RuntimeError("Upstream stream was cancelled")
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._notify()
+
+    def subscribe(self) -> AsyncIterator[Dict[str, Any]]:
+        self.subscribers += 1
+        return self._iterate()
+
+    async def _iterate(self) -> AsyncIterator[Dict[str, Any]]:
+        index = 0
+        try:
+            while True:
+                if index < len(self.chunks):
+                    yield self.chunks[index]
+                    index += 1
+                elif self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                else:
+                    await self._changed.wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.done and self.task is not None and not _cancel_later(self.task, self.keep_until):
+                self.task.cancel()
+
+
+class RequestCoalescer:
+    """동일한 요청의 single-flight 처리 + Idempotency-Key 재사용
+
+    - 같은 키(프롬프트 해시 + 옵션)의 요청이 이미 진행 중이면 새로 생성하지 않고 결과를 공유
+      (출력이 결정적인 요청만 호출하는 쪽에서 넘김: 샘플링 요청끼리 같은 답을 받지 않게)
+    - Idempotency-Key가 있으면 완료된 결과를 TTL 동안 보관해, 재시도 요청에 원래 결과를 돌려줌.
+      요청 키를 함께 저장해 같은 Idempotency-Key에 다른 본문이 오면 IdempotencyConflictError
+    - Idempotency-Key가 있는 생성은 클라이언트가 끊거나 타임아웃돼도 취소하지 않고 요청 deadline
+      (없으면 TTL)까지 계속해, 재시도가 새로 생성하지 않고 진행 중인 생성이나 그 결과를 받음
+    """
+
+    def __init__(self, idempotency_ttl: Optional[float] = None, max_idempotent_entries: int = 1024):
+        self.idempotency_ttl = idempotency_ttl if idempotency_ttl is not None else settings.idempotency_ttl
+        self.max_idempotent_entries = max_idempotent_entries
+        self._flights: Dict[str, _Flight] = {}
+        self._streams: Dict[str, _StreamFlight] = {}
+        # Idempotency-Key -> (완료된 결과, 만료 시각, 요청 키)
+        self._idempotent: "OrderedDict[str, Tuple[Any, float, str]]" = OrderedDict()
+
+        self.coalesced = 0
+        self.idempotent_hits = 0
+
+    def _keep_until(self, idempotency_key: Optional[str], deadline: Optional[float]) -> Optional[float]:
+        if not idempotency_key:
+            return None
+        keep_until = time.monotonic() + self.idempotency_ttl
+        return min(keep_until, deadline) if deadline is not None else keep_until
+
+    async def run(
+        self,
+        key: str,
+        factory: Callable[[], Awaitable[Any]],
+        idempotency_key: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ) -> Any:
+        """factory()를 키당 한 번만 실행하고 같은 결과를 모든 호출자에게 반환"""
+        fingerprint = key
+        if idempotency_key:
+            key = f"completion:{idempotency_key}"
+            stored = self._get_idempotent(key, fingerprint)
+            if stored is not None:
+                self.idempotent_hits += 1
+                return stored
+
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.create_task(factory()), fingerprint, self._keep_until(idempotency_key, deadline))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda task: self._finish_flight(key, flight, idempotency_key is not None))
+        else:
+            self._check_fingerprint(idempotency_key, flight.fingerprint, fingerprint)
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            # 기다리던 요청이 모두 떠나면 생성 자체를 취소 (Idempotency-Key가 있으면 재시도를 위해 계속)
+            if not flight.task.done():
+                flight.waiters -= 1
+                if flight.waiters == 0 and not _cancel_later(flight.task, flight.keep_until):
+                    flight.task.cancel()
+            raise
+
+    def subscribe(
+        self,
+        key: str,
+        open_stream: Callable[[], Awaitable[AsyncIterator[Dict[str, Any]]]],
+        idempotency_key: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """같은 키의 스트림이 진행 중이면 합류하고, 없으면 open_stream()으로 새로 시작"""
+        fingerprint = key
+        if idempotency_key:
+            key = f"stream:{idempotency_key}"
+            stored = self._get_idempotent(key, fingerprint)
+            if stored is not None:
+                self.idempotent_hits += 1
+                return stored.subscribe()
+
+        stream = self._streams.get(key)
+        if stream is not None:
+            self._check_fingerprint(idempotency_key, stream.fingerprint, fingerprint)
+        if stream is None:
+            stream = _StreamFlight(fingerprint, self._keep_until(idempotency_key, deadline))
+            stream.task = asyncio.create_task(stream.pump(open_stream))
+            self._streams[key] = stream
+            stream.task.add_done_callback(lambda task: self._finish_stream(key, stream, idempotency_key is not None))
+        else:
+            self.coalesced += 1
+        return stream.subscribe()
+
+    def _finish_flight(self, key: str, flight: _Flight, idempotent: bool) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if idempotent and not flight.task.cancelled() and flight.task.exception() is None:
+            self._put_idempotent(key, flight.task.result(), flight.fingerprint)
+        elif not flight.task.cancelled():
+            # 기다리는 쪽이 없을 때 "exception was never retrieved" 경고 방지
+            flight.task.exception()
+
+    def _finish_stream(self, key: str, stream: _StreamFlight, idempotent: bool) -> None:
+        if self._streams.get(key) is stream:
+            del self._streams[key]
+        if idempotent and stream.error is None:
+            self._put_idempotent(key, stream, stream.fingerprint)
+
+    def _get_idempotent(self, key: str, fingerprint: str) -> Optional[Any]:
+        entry = self._idempotent.get(key)
+        if entry is None:
+            return None
+        value, expires_at, stored_fingerprint = entry
+        if expires_at < time.time():
+            del self._idempotent[key]
+            return None
+        self._check_fingerprint(key, stored_fingerprint, fingerprint)
+        return value
+
+    @staticmethod
+    def _check_fingerprint(idempotency_key: Optional[str], stored: str, fingerprint: str) -> None:
+        if idempotency_key and stored != fingerprint:
+            raise IdempotencyConflictError("Idempotency-Key was already used with a different request body")
+
+    def _put_idempotent(self, key: str, value: Any, fingerprint: str) -> None:
+        self._idempotent[key] = (value, time.time() + self.idempotency_ttl, fingerprint)
+        self._idempotent.move_to_end(key)
+        while len(self._idempotent) > self.max_idempotent_entries:
+            self._idempotent.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._flights),
+            "in_flight_streams": len(self._streams),
+            "coalesced": self.coalesced,
+            "idempotent_entries": len(self._idempotent),
+            "idempotent_hits": self.idempotent_hits,
+        }
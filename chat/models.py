@@ -1,6 +1,6 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Literal, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
 
 #   1. 요청 구조 (POST /v1/chat/completions)
 #   {
@@ -32,6 +32,26 @@ from pydantic import BaseModel
 class Message(BaseModel):
     role: str  # "system", "user", "assistant"
     content: str
+    reasoning_content: Optional[str] = None  # thinking=True 응답의 추론 과정 (<think> 블록 내용)
+
+
+class StreamOptions(BaseModel):
+    include_usage: Optional[bool] = True  # 마지막 청크로 usage 전송
+
+
+class JSONSchemaFormat(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    name: str
+    description: Optional[str] = None
+    # BaseModel.schema와 이름이 겹치므로 속성은 schema_ (JSON에서는 "schema")
+    schema_: Optional[Dict[str, Any]] = Field(default=None, alias="schema")
+    strict: Optional[bool] = None
+
+
+class ResponseFormat(BaseModel):
+    type: Literal["text", "json_object", "json_schema"]
+    json_schema: Optional[JSONSchemaFormat] = None  # type="json_schema"일 때 필수
 
 
 class ChatCompletionRequest(BaseModel):
@@ -42,7 +62,18 @@ class ChatCompletionRequest(BaseModel):
     temperature: Optional[float] = 0.0
     top_k: Optional[int] = 20
     top_p: Optional[float] = 1.0
-    thinking: Optional[bool] = False
+    seed: Optional[int] = None  # 고정하면 temperature > 0이어도 같은 요청은 같은 출력
+    thinking: Optional[bool] = False  # False면 추론 블록을 건너뛰고 바로 답함
+    thinking_budget: Optional[int] = None  # 추론 토큰 상한 (없으면 서버 설정, 0이면 제한 없음)
+    stream: Optional[bool] = False  # True면 SSE(chat.completion.chunk)로 응답
+    stream_options: Optional[StreamOptions] = None
+    priority: Optional[Literal["interactive", "bulk"]] = "interactive"  # 배치 작업은 "bulk"
+    cache: Optional[Literal["default", "bypass", "refresh"]] = "default"  # refresh: 캐시 무시하고 새로 생성 후 저장
+    session_id: Optional[str] = None  # 같은 세션의 다음 턴은 이전 대화 prefix(KV 캐시)를 재사용
+    truncation: Optional[Literal["auto", "disabled"]] = None  # 컨텍스트 초과 시 auto: 앞 대화부터 잘라냄, disabled: 400 (없으면 서버 설정)
+    response_format: Optional[ResponseFormat] = None  # json_object / json_schema: Ollama format으로 출력 형식을 강제하고 서버에서 검증
+    semantic_cache: Optional[bool] = False  # True면 문구만 조금 다른 이전 요청의 응답도 재사용 (서버에서 SEMANTIC_CACHE_ENABLED=1일 때)
+    timeout: Optional[float] = None  # 초. 큐 대기 + 생성이 이 안에 끝나지 않으면 취소하고 504 (스트림은 첫 청크까지, X-Request-Timeout 헤더로도 지정)
 
 
 class Choice(BaseModel):
@@ -51,10 +82,15 @@ class Choice(BaseModel):
     finish_reason: str
 
 
+class PromptTokensDetails(BaseModel):
+    cached_tokens: int = 0  # 세션 prefix 재사용으로 다시 평가하지 않은 토큰 수
+
+
 class Usage(BaseModel):
     prompt_tokens: int
     completion_tokens: int
     total_tokens: int
+    prompt_tokens_details: Optional[PromptTokensDetails] = None
 
 
 class ChatCompletionResponse(BaseModel):
@@ -64,3 +100,33 @@ class ChatCompletionResponse(BaseModel):
     model: str
     choices: List[Choice]
     usage: Usage
+
+
+#   3. 스트리밍 응답 구조 (stream: true, text/event-stream)
+#   data: {"id": "chatcmpl-123", "object": "chat.completion.chunk", "created": 1677652288,
+#          "model": "gpt-3.5-turbo", "choices": [{"index": 0, "delta": {"content": "Hello"}}]}
+#   ...
+#   data: {"id": "chatcmpl-123", "object": "chat.completion.chunk", ..., "choices": [],
+#          "usage": {"prompt_tokens": 9, "completion_tokens": 12, "total_tokens": 21}}
+#   data: [DONE]
+
+
+class DeltaMessage(BaseModel):
+    role: Optional[str] = None
+    content: Optional[str] = None
+    reasoning_content: Optional[str] = None
+
+
+class ChunkChoice(BaseModel):
+    index: int
+    delta: DeltaMessage
+    finish_reason: Optional[str] = None
+
+
+class ChatCompletionChunk(BaseModel):
+    id: str
+    object: str = "chat.completion.chunk"
+    created: int
+    model: str
+    choices: List[ChunkChoice]
+    usage: Optional[Usage] = None
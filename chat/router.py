@@ -1,10 +1,21 @@
-from typing import Optional
+from typing import Dict, Optional, Union
 
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 
+from cache.response_cache import ResponseCache
+from cache.semantic_cache import SemanticCache
+from chat.budget import ContextBudget
+from chat.coalescer import RequestCoalescer
 from chat.models import ChatCompletionRequest, ChatCompletionResponse
-from chat.service import process_chat_completion
+from chat.service import process_chat_completion, process_chat_completion_stream
+from chat.sessions import SessionStore
+from core.cancellation import ClientDisconnectedError, cancel_on_disconnect
+from core.config import settings
+from core.fastjson import FastJSONResponse
 from model.model_manager import ModelManager
+from model.registry import ModelNotFoundError, ModelRegistry
+from model.scheduler import AdmissionScheduler
 
 router = APIRouter(
     prefix="/v1",  # 모든 엔드포인트에 /v1 접두사
@@ -12,13 +23,70 @@ router = APIRouter(
 )
 
 
-@router.post("/chat/completions")
+# 응답은 서비스가 만든 dict를 그대로 직렬화하고, 스키마는 문서에만 표시
+@router.post("/chat/completions", response_model=None, responses={200: {"model": ChatCompletionResponse}})
 async def chat_completions(
     request: Request,
     chatCompletionRequest: ChatCompletionRequest,
-) -> Optional[ChatCompletionResponse]:
+) -> Union[FastJSONResponse, StreamingResponse]:
 
-    # 각 요청마다 새로운 ModelManager 생성 (병렬 처리를 위해)
-    modelManager = ModelManager()
+    # lifespan에서 만든 앱 전체 공유 ModelManager (커넥션 풀 재사용)
+    modelManager: ModelManager = request.app.state.modelManager
+    scheduler: AdmissionScheduler = request.app.state.scheduler
+    responseCache: Optional[ResponseCache] = request.app.state.responseCache
+    coalescer: RequestCoalescer = request.app.state.coalescer
+    # 재시도한 요청이 같은 Idempotency-Key를 보내면 원래 결과를 돌려받음
+    idempotencyKey = request.headers.get("Idempotency-Key")
+    sessionStore: SessionStore = request.app.state.sessionStore
+    contextBudget: ContextBudget = request.app.state.contextBudget
+    modelRegistry: ModelRegistry = request.app.state.modelRegistry
+    semanticCache: Optional[SemanticCache] = request.app.state.semanticCache
+    # 서비스가 채우는 응답 헤더 (X-Semantic-Cache)
+    responseHeaders: Dict[str, str] = {}
 
-    return await process_chat_completion(model_manager=modelManager, chat_completion_request=chatCompletionRequest)
+    # 설치되지 않은 모델은 큐에 넣기 전에 거절 ("llama3" → "llama3:latest"처럼 실제 이름으로 맞춤)
+    try:
+        chatCompletionRequest.model = await modelRegistry.resolve(chatCompletionRequest.model)
+    except ModelNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    chatCompletionRequest.timeout = get_request_timeout(request, chatCompletionRequest)
+
+    # 클라이언트가 먼저 끊으면 대기열에서 빼고 Ollama 요청도 끊어 GPU 슬롯을 비움
+    # (스트림은 헤더를 보낸 뒤부터 StreamingResponse가 끊김을 감지)
+    try:
+        if chatCompletionRequest.stream:
+            events = await cancel_on_disconnect(request, process_chat_completion_stream(model_manager=modelManager, chat_completion_request=chatCompletionRequest, scheduler=scheduler, response_cache=responseCache, coalescer=coalescer, idempotency_key=idempotencyKey, session_store=sessionStore, context_budget=contextBudget, semantic_cache=semanticCache, response_headers=responseHeaders))
+        else:
+            response = await cancel_on_disconnect(request, process_chat_completion(model_manager=modelManager, chat_completion_request=chatCompletionRequest, scheduler=scheduler, response_cache=responseCache, coalescer=coalescer, idempotency_key=idempotencyKey, session_store=sessionStore, context_budget=contextBudget, semantic_cache=semanticCache, response_headers=responseHeaders))
+    except ClientDisconnectedError as e:
+        raise HTTPException(status_code=499, detail=str(e))
+
+    if chatCompletionRequest.stream:
+        return StreamingResponse(
+            events,
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", **responseHeaders},
+        )
+    return FastJSONResponse(response, headers=responseHeaders)
+
+
+def get_request_timeout(request: Request, chatCompletionRequest: ChatCompletionRequest) -> Optional[float]:
+    """요청 본문의 timeout → X-Request-Timeout 헤더 → REQUEST_TIMEOUT 순서 (초)"""
+    if chatCompletionRequest.timeout is not None:
+        return chatCompletionRequest.timeout
+    header = request.headers.get("X-Request-Timeout")
+    if header:
+        try:
+            return float(header)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid X-Request-Timeout header: {header!r}")
+    return settings.request_timeout or None
+
+
+
+@router.delete("/sessions/{session_id}")
+async def delete_session(request: Request, session_id: str) -> dict:
+    sessionStore: SessionStore = request.app.state.sessionStore
+    if not sessionStore.delete(session_id):
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+    return {"id": session_id, "deleted": True}
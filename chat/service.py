@@ -1,56 +1,695 @@
+import asyncio
 import time
 import uuid
+from contextlib import nullcontext
+from functools import partial
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 
 from fastapi import HTTPException
-from ollama import GenerateResponse
 
-from chat.models import ChatCompletionRequest, ChatCompletionResponse, Choice, Message, Usage
+from cache.response_cache import ResponseCache, make_cache_key
+from cache.semantic_cache import SemanticCache, SemanticHit, SemanticQuery
+from chat.budget import ContextBudget, ContextOverflowError, generation_tokens
+from chat.coalescer import IdempotencyConflictError, RequestCoalescer
+from chat.models import ChatCompletionRequest
+from chat.sessions import SessionStore, effective_cached_tokens
+from chat.structured import ResponseFormatError, StructuredOutputError, get_structured_output, stream_structured_output
+from chat.thinking import (
+    ThinkingFilter,
+    generate_with_thinking_budget,
+    get_thinking_budget,
+    split_reasoning,
+    stream_with_thinking_budget,
+)
+from core import fastjson, metrics
+from core.cancellation import DeadlineExceededError, get_deadline, with_deadline
+from core.config import settings
+from core.logging import annotate_request, logging_manager
 from model.model_manager import ModelManager
+from model.resilience import BackendError, BackendUnavailableError
+from model.scheduler import AdmissionScheduler, SchedulerRejectedError
+from templates.base import ChatTemplate
 from templates.service import get_chat_template
 
-async def process_chat_completion(model_manager: ModelManager, chat_completion_request: ChatCompletionRequest) -> ChatCompletionResponse:
+logger = logging_manager.get_logger(__name__)
+
+async def process_chat_completion(
+    model_manager: ModelManager,
+    chat_completion_request: ChatCompletionRequest,
+    scheduler: Optional[AdmissionScheduler] = None,
+    response_cache: Optional[ResponseCache] = None,
+    coalescer: Optional[RequestCoalescer] = None,
+    idempotency_key: Optional[str] = None,
+    session_store: Optional[SessionStore] = None,
+    context_budget: Optional[ContextBudget] = None,
+    semantic_cache: Optional[SemanticCache] = None,
+    response_headers: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    """chat.completion 응답을 dict로 반환 (라우터가 FastJSONResponse로 한 번에 직렬화)
+
+    response_headers를 넘기면 응답에 붙일 헤더(X-Semantic-Cache)를 채운다.
+    """
+    start_time = time.monotonic()
+    # 큐 대기 + 생성 전체에 걸리는 deadline (지나면 대기열에서 빠지거나 Ollama 요청을 끊음)
+    deadline = get_deadline(chat_completion_request.timeout, start_time)
+    status = 200
     try:
             
         # Strategy + Factory Pattern 방식
         template = get_chat_template(chat_completion_request.model)
-        prompt = template.convert_messages(chat_completion_request.messages)
+        session_id = chat_completion_request.session_id if session_store else None
+        prompt, cached_tokens = render_prompt(chat_completion_request, template, session_store)
+        prompt, cached_tokens, prompt_tokens = await apply_context_budget(model_manager, context_budget, chat_completion_request, template, prompt, cached_tokens)
+        options = build_generate_options(chat_completion_request)
+        thinking_budget = get_thinking_budget(chat_completion_request, template)
+        structured_output = get_structured_output(chat_completion_request)
+        output_format = structured_output.format if structured_output else None
+        cache_key = get_cache_key(chat_completion_request, prompt, options, thinking_budget) if response_cache else None
+
+        async def generate_response() -> Dict[str, Any]:
+            # 스케줄러 슬롯을 얻은 뒤에만 OLLAMA로 보냄 (없으면 바로 전송)
+            admission = scheduler.slot(chat_completion_request.priority, chat_completion_request.model) if scheduler else nullcontext()
+            async with admission:
+                # 템플릿은 여기서 이미 적용했으므로 raw로 보냄 (OLLAMA 템플릿이 한 번 더 씌워지지 않음)
+                num_ctx_options = get_num_ctx_options(context_budget, chat_completion_request, template, prompt_tokens)
+                affinity_key = get_affinity_key(chat_completion_request, prompt)
+                if thinking_budget:
+                    result = await generate_with_thinking_budget(model_manager, template, prompt, thinking_budget, affinity_key, chat_completion_request.model, format=output_format, **options, **num_ctx_options)
+                else:
+                    result = await model_manager.generate(prompt, raw=True, affinity_key=affinity_key, model=chat_completion_request.model, format=output_format, **options, **num_ctx_options)
+
+            if result is None:
+                raise HTTPException(status_code=500, detail="Failed to generate response")
+            if structured_output:
+                # 형식에 맞지 않는 출력은 캐시하지 않고 오류로 돌려줌
+                structured_output.validate(split_reasoning(result.get("response", ""))[0], result.get("done_reason") == "length")
+            if context_budget:
+                context_budget.observe(chat_completion_request.model, prompt_tokens, result.get("prompt_eval_count"))
+
+            if cache_key:
+                await response_cache.set(cache_key, result_to_cache_value(result))
+            if semantic_query:
+                semantic_cache.add(semantic_query, result_to_cache_value(result))
+            return convert_result_to_response(model=chat_completion_request.model, result=result, thinking=chat_completion_request.thinking)
+
+        # 캐시 히트면 스케줄러/OLLAMA를 거치지 않고 바로 응답
+        response = None
+        if cache_key and chat_completion_request.cache == "default":
+            cached = await response_cache.get(cache_key)
+            if cached is not None:
+                metrics.cache_hits.inc(chat_completion_request.model)
+                response = convert_result_to_response(model=chat_completion_request.model, result=cached, thinking=chat_completion_request.thinking)
 
-        result = await model_manager.generate(prompt, chat_completion_request.thinking, num_predict=chat_completion_request.num_predict, repeat_penalty=chat_completion_request.repeat_penalty, top_k=chat_completion_request.top_k, top_p=chat_completion_request.top_p)
+        # 정확히 같은 요청이 없으면 문구만 조금 다른 이전 요청의 응답을 찾음 (요청이 허용한 경우만)
+        semantic_query = None
+        if response is None and use_semantic_cache(chat_completion_request, semantic_cache):
+            semantic_query, hit = await with_deadline(lookup_semantic_cache(semantic_cache, chat_completion_request, options, thinking_budget), deadline)
+            if hit is not None:
+                response = convert_result_to_response(model=chat_completion_request.model, result=hit.value, thinking=chat_completion_request.thinking)
+            set_semantic_cache_header(response_headers, hit)
 
-        if result is None:
-            raise HTTPException(status_code=500, detail="Failed to generate response")
+        if response is None:
+            # 같은 요청이 이미 생성 중이면 그 결과를 같이 받음 (출력이 결정적이거나 Idempotency-Key가 있을 때만)
+            if coalescer and (idempotency_key or is_deterministic(chat_completion_request)):
+                response = await with_deadline(coalescer.run(get_request_key(chat_completion_request, prompt, options, thinking_budget), generate_response, idempotency_key, deadline), deadline)
+            else:
+                response = await with_deadline(generate_response(), deadline)
+
+        if session_id:
+            response = record_session_turn(session_store, chat_completion_request, template, prompt, cached_tokens, response)
+        usage = response["usage"]
+        annotate_request(model=chat_completion_request.model, prompt_tokens=usage["prompt_tokens"], completion_tokens=usage["completion_tokens"])
+        return response
+    except HTTPException as e:
+        status = e.status_code
+        raise
+    except SchedulerRejectedError as e:
+        status = 429
+        raise rejected_to_http_exception(e)
+    except (ContextOverflowError, ResponseFormatError) as e:
+        status = 400
+        raise HTTPException(status_code=400, detail=str(e))
+    except IdempotencyConflictError as e:
+        status = 422
+        raise HTTPException(status_code=422, detail=str(e))
+    except StructuredOutputError as e:
+        status = 502
+        raise HTTPException(status_code=502, detail=str(e))
+    except DeadlineExceededError as e:
+        status = 504
+        raise HTTPException(status_code=504, detail=str(e))
+    except BackendUnavailableError as e:
+        status = 503
+        raise unavailable_to_http_exception(e)
+    except BackendError as e:
+        status = e.http_status
+        raise HTTPException(status_code=status, detail=str(e))
+    except asyncio.CancelledError:
+        # 클라이언트가 응답 전에 연결을 끊음
+        status = 499
+        raise
     except Exception as e:
+        status = 500
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        metrics.record_request(chat_completion_request.model, "unary", status, time.monotonic() - start_time)
+
+
+def render_prompt(chat_completion_request: ChatCompletionRequest, template: ChatTemplate, session_store: Optional[SessionStore]) -> Tuple[str, int]:
+    """(프롬프트, 세션에서 재사용되는 prefix 토큰 수)"""
+    if session_store and chat_completion_request.session_id:
+        return session_store.render_prompt(
+            chat_completion_request.session_id,
+            chat_completion_request.model,
+            chat_completion_request.messages,
+            template,
+            chat_completion_request.thinking,
+        )
+    return template.convert_messages(chat_completion_request.messages, chat_completion_request.thinking), 0
+
+
+async def apply_context_budget(
+    model_manager: ModelManager,
+    context_budget: Optional[ContextBudget],
+    chat_completion_request: ChatCompletionRequest,
+    template: ChatTemplate,
+    prompt: str,
+    cached_tokens: int,
+) -> Tuple[str, int, int]:
+    """컨텍스트 창 검사/자르기 후 (프롬프트, cached_tokens, 추정 프롬프트 토큰 수)"""
+    if context_budget is None:
+        return prompt, cached_tokens, 0
 
-    return convert_result_to_response(model=chat_completion_request.model, result=result)
+    model = chat_completion_request.model
+    if not context_budget.has_model_context(model):
+        context_budget.set_model_context(model, await model_manager.get_context_length(model))
 
-def create_choice(response_text: str) -> Choice:
-    return Choice(
-        index=0,
-        message=Message(role="assistant", content=response_text),
-        finish_reason="stop",
+    prompt, prompt_tokens, trimmed = context_budget.fit(chat_completion_request, template, prompt)
+    # 잘라낸 프롬프트는 세션 transcript의 연속이 아니므로 재사용 토큰 없음
+    return prompt, 0 if trimmed else cached_tokens, prompt_tokens
+
+
+def get_num_ctx_options(
+    context_budget: Optional[ContextBudget],
+    chat_completion_request: ChatCompletionRequest,
+    template: ChatTemplate,
+    prompt_tokens: int,
+) -> Dict[str, Any]:
+    if context_budget is None:
+        return {}
+    num_ctx = context_budget.num_ctx(chat_completion_request.model, prompt_tokens, generation_tokens(chat_completion_request, template))
+    return {"num_ctx": num_ctx} if num_ctx else {}
+
+
+def record_session_turn(
+    session_store: SessionStore,
+    chat_completion_request: ChatCompletionRequest,
+    template: ChatTemplate,
+    prompt: str,
+    cached_tokens: int,
+    response: Dict[str, Any],
+) -> Dict[str, Any]:
+    """세션에 이번 턴 저장 후, 재사용한 prefix 토큰을 usage에 반영한 응답 반환"""
+    usage = response["usage"]
+    message = response["choices"][0]["message"]
+    reasoning = message.get("reasoning_content")
+    cached_tokens = effective_cached_tokens(cached_tokens, usage["prompt_tokens"])
+    session_store.record(
+        chat_completion_request.session_id,
+        chat_completion_request.model,
+        chat_completion_request.messages,
+        prompt,
+        message["content"],
+        cached_tokens,
+        usage["prompt_tokens"],
+        usage["completion_tokens"],
+        # transcript는 모델이 본 그대로 이어져야 하므로 추론 블록을 되살려 붙임
+        template.format_reasoning(reasoning) + message["content"] if reasoning else None,
     )
+    # coalescing으로 공유된 응답일 수 있으므로 사본을 수정
+    return {**response, "usage": {
+        "prompt_tokens": usage["prompt_tokens"] + cached_tokens,
+        "completion_tokens": usage["completion_tokens"],
+        "total_tokens": usage["total_tokens"] + cached_tokens,
+        "prompt_tokens_details": {"cached_tokens": cached_tokens},
+    }}
+
+
+def get_affinity_key(chat_completion_request: ChatCompletionRequest, prompt: str) -> Optional[str]:
+    """같은 세션 / 같은 프롬프트 앞부분은 같은 노드로 보내 그 노드의 KV 캐시를 재사용"""
+    if not settings.backend_affinity:
+        return None
+    if chat_completion_request.session_id:
+        return f"session:{chat_completion_request.session_id}"
+    return prompt[: settings.backend_affinity_prefix_chars]
+
+
+def build_generate_options(chat_completion_request: ChatCompletionRequest) -> Dict[str, Any]:
+    """OLLAMA options로 보낼 샘플링 파라미터 (값이 없는 항목은 OLLAMA 기본값 사용)"""
+    options = {
+        "num_predict": chat_completion_request.num_predict,
+        "repeat_penalty": chat_completion_request.repeat_penalty,
+        "temperature": chat_completion_request.temperature,
+        "top_k": chat_completion_request.top_k,
+        "top_p": chat_completion_request.top_p,
+        "seed": chat_completion_request.seed,
+    }
+    return {name: value for name, value in options.items() if value is not None}
+
+
+def is_deterministic(chat_completion_request: ChatCompletionRequest) -> bool:
+    """같은 요청이 같은 출력을 내는지 (temperature=0을 명시했거나 seed 고정): 샘플링 요청은 캐시/합치기 안 함
+
+    temperature가 null이면 Ollama 기본값(0.8)으로 샘플링하므로 결정적이지 않다.
+    """
+    return chat_completion_request.temperature == 0 or chat_completion_request.seed is not None
 
-def calculate_usage(result: GenerateResponse) -> Usage:
-    prompt_tokens = getattr(result, 'prompt_eval_count', 0) or 0
-    completion_tokens = getattr(result, 'eval_count', 0) or 0
-    total_tokens = prompt_tokens + completion_tokens
 
-    return Usage(
-        prompt_tokens=prompt_tokens,
-        completion_tokens=completion_tokens,
-        total_tokens=total_tokens,
+def get_request_key(
+    chat_completion_request: ChatCompletionRequest,
+    prompt: str,
+    options: Dict[str, Any],
+    thinking_budget: Optional[int] = None,
+) -> str:
+    """프롬프트 + 모델 + 옵션이 같으면 같은 키 (coalescing / 캐시 공용)"""
+    return make_cache_key(prompt, chat_completion_request.model, get_key_options(chat_completion_request, options, thinking_budget))
+
+
+def get_key_options(
+    chat_completion_request: ChatCompletionRequest,
+    options: Dict[str, Any],
+    thinking_budget: Optional[int] = None,
+) -> Dict[str, Any]:
+    """샘플링 옵션 외에 출력을 바꾸는 설정 (추론, 출력 형식)"""
+    response_format = chat_completion_request.response_format
+    return {
+        **options,
+        "thinking": chat_completion_request.thinking,
+        "thinking_budget": thinking_budget,
+        "response_format": response_format.model_dump(by_alias=True, exclude_none=True) if response_format else None,
+    }
+
+
+def get_cache_key(
+    chat_completion_request: ChatCompletionRequest,
+    prompt: str,
+    options: Dict[str, Any],
+    thinking_budget: Optional[int] = None,
+) -> Optional[str]:
+    """결정적인 요청(is_deterministic)만 캐시 키를 만든다. bypass면 None"""
+    if chat_completion_request.cache == "bypass" or not is_deterministic(chat_completion_request):
+        return None
+    return get_request_key(chat_completion_request, prompt, options, thinking_budget)
+
+
+def use_semantic_cache(chat_completion_request: ChatCompletionRequest, semantic_cache: Optional[SemanticCache]) -> bool:
+    return bool(semantic_cache and chat_completion_request.semantic_cache and chat_completion_request.cache != "bypass")
+
+
+def get_semantic_key(
+    chat_completion_request: ChatCompletionRequest,
+    options: Dict[str, Any],
+    thinking_budget: Optional[int] = None,
+) -> Tuple[int, str]:
+    """(네임스페이스, 임베딩할 텍스트)
+
+    유사도는 사용자 메시지끼리만 비교하고, 모델/옵션/system·assistant 메시지는 정확히 같아야 한다.
+    """
+    user_text = "\n\n".join(message.content for message in chat_completion_request.messages if message.role == "user")
+    context = [[message.role, message.content] for message in chat_completion_request.messages if message.role != "user"]
+    key = make_cache_key(fastjson.dumps_str(context), chat_completion_request.model, get_key_options(chat_completion_request, options, thinking_budget))
+    return int(key[:15], 16), user_text
+
+
+async def lookup_semantic_cache(
+    semantic_cache: SemanticCache,
+    chat_completion_request: ChatCompletionRequest,
+    options: Dict[str, Any],
+    thinking_budget: Optional[int] = None,
+) -> Tuple[Optional[SemanticQuery], Optional[SemanticHit]]:
+    """(저장할 때 쓸 검색 키, 히트). refresh면 찾지 않고 새 응답만 저장"""
+    namespace, text = get_semantic_key(chat_completion_request, options, thinking_budget)
+    if not text:
+        return None, None
+    query = await semantic_cache.query(namespace, text, chat_completion_request.priority)
+    if query is None or chat_completion_request.cache != "default":
+        return query, None
+    hit = semantic_cache.search(query)
+    if hit is not None:
+        metrics.semantic_cache_hits.inc(chat_completion_request.model)
+    return query, hit
+
+
+def set_semantic_cache_header(response_headers: Optional[Dict[str, str]], hit: Optional[SemanticHit]) -> None:
+    if response_headers is None:
+        return
+    response_headers["X-Semantic-Cache"] = f"hit; similarity={hit.similarity:.4f}" if hit else "miss"
+
+
+def result_to_cache_value(result: Dict[str, Any]) -> Dict[str, Any]:
+    # context(토큰 배열)는 크고 재사용하지 않으므로 저장하지 않음
+    return {
+        "model": result.get("model"),
+        "response": result.get("response", ""),
+        "done": True,
+        "done_reason": result.get("done_reason"),
+        "prompt_eval_count": result.get("prompt_eval_count"),
+        "eval_count": result.get("eval_count"),
+    }
+
+
+def rejected_to_http_exception(error: SchedulerRejectedError) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=str(error),
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
+def unavailable_to_http_exception(error: BackendUnavailableError) -> HTTPException:
+    # 회로가 열려 있는 동안은 Ollama에 보내지 않고 바로 503
+    return HTTPException(
+        status_code=503,
+        detail=str(error),
+        headers={"Retry-After": str(error.retry_after)},
     )
 
+def get_finish_reason(done_reason: Optional[str]) -> str:
+    """OLLAMA done_reason → OpenAI finish_reason (num_predict에서 잘렸으면 "length")"""
+    return "length" if done_reason == "length" else "stop"
+
+
+def create_choice(response_text: str, thinking: bool = False, done_reason: Optional[str] = None) -> Dict[str, Any]:
+    # 추론 블록은 본문에서 떼어 내고, thinking=True일 때만 reasoning_content로 돌려줌
+    content, reasoning = split_reasoning(response_text)
+    message = {"role": "assistant", "content": content}
+    if thinking and reasoning:
+        message["reasoning_content"] = reasoning
+    return {"index": 0, "message": message, "finish_reason": get_finish_reason(done_reason)}
+
+
+def calculate_usage(result: Dict[str, Any]) -> Dict[str, Any]:
+    """OLLAMA 응답(또는 스트림 마지막 청크)의 토큰 수로 usage 구성"""
+    prompt_tokens = result.get("prompt_eval_count", 0) or 0
+    completion_tokens = result.get("eval_count", 0) or 0
+    cached_tokens = result.get("cached_tokens")
+
+    usage = {
+        "prompt_tokens": prompt_tokens + (cached_tokens or 0),
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens + (cached_tokens or 0),
+    }
+    if cached_tokens is not None:
+        usage["prompt_tokens_details"] = {"cached_tokens": cached_tokens}
+    return usage
+
 
 def convert_result_to_response(
-    model: str, result: GenerateResponse
-) -> ChatCompletionResponse:
-    return ChatCompletionResponse(
-        id=f"chatcmpl-{uuid.uuid4().hex[:10]}",
-        object="chat.completion",
-        created=int(time.time()),
-        model=model,
-        choices=[create_choice(response_text=result.response)],
-        usage=calculate_usage(result=result),
+    model: str, result: Dict[str, Any], thinking: bool = False
+) -> Dict[str, Any]:
+    """OLLAMA 응답 dict에서 chat.completion 응답을 바로 만듦 (중간 pydantic 모델 없이, 형태는 ChatCompletionResponse)"""
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:10]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [create_choice(result.get("response", ""), thinking, result.get("done_reason"))],
+        "usage": calculate_usage(result),
+    }
+
+
+async def process_chat_completion_stream(
+    model_manager: ModelManager,
+    chat_completion_request: ChatCompletionRequest,
+    scheduler: Optional[AdmissionScheduler] = None,
+    response_cache: Optional[ResponseCache] = None,
+    coalescer: Optional[RequestCoalescer] = None,
+    idempotency_key: Optional[str] = None,
+    session_store: Optional[SessionStore] = None,
+    context_budget: Optional[ContextBudget] = None,
+    semantic_cache: Optional[SemanticCache] = None,
+    response_headers: Optional[Dict[str, str]] = None,
+) -> AsyncIterator[str]:
+    """stream=True 요청 처리: SSE 이벤트 이터레이터 반환
+
+    첫 청크까지는 여기서 기다리므로, OLLAMA 연결/상태 오류는 응답 헤더가 나가기 전에
+    일반 요청과 같은 HTTPException(500)으로 보고된다. deadline은 첫 청크까지 적용된다.
+    """
+    start_time = time.monotonic()
+    deadline = get_deadline(chat_completion_request.timeout, start_time)
+    try:
+        template = get_chat_template(chat_completion_request.model)
+        session_id = chat_completion_request.session_id if session_store else None
+        prompt, cached_tokens = render_prompt(chat_completion_request, template, session_store)
+        prompt, cached_tokens, prompt_tokens = await apply_context_budget(model_manager, context_budget, chat_completion_request, template, prompt, cached_tokens)
+        options = build_generate_options(chat_completion_request)
+        thinking_budget = get_thinking_budget(chat_completion_request, template)
+        structured_output = get_structured_output(chat_completion_request)
+        output_format = structured_output.format if structured_output else None
+
+        cache_key = get_cache_key(chat_completion_request, prompt, options, thinking_budget) if response_cache else None
+        cached = None
+        if cache_key and chat_completion_request.cache == "default":
+            cached = await response_cache.get(cache_key)
+        semantic_query, hit = None, None
+        if cached is None and use_semantic_cache(chat_completion_request, semantic_cache):
+            semantic_query, hit = await with_deadline(lookup_semantic_cache(semantic_cache, chat_completion_request, options, thinking_budget), deadline)
+            set_semantic_cache_header(response_headers, hit)
+
+        async def open_stream() -> AsyncIterator[Dict[str, Any]]:
+            num_ctx_options = get_num_ctx_options(context_budget, chat_completion_request, template, prompt_tokens)
+            affinity_key = get_affinity_key(chat_completion_request, prompt)
+            if thinking_budget:
+                stream = stream_with_thinking_budget(model_manager, template, prompt, thinking_budget, affinity_key, chat_completion_request.model, format=output_format, **options, **num_ctx_options)
+            else:
+                stream = model_manager.generate_stream(prompt, raw=True, affinity_key=affinity_key, model=chat_completion_request.model, format=output_format, **options, **num_ctx_options)
+            if structured_output:
+                # JSON이 닫히면 바로 끊고, 검증에 실패한 출력은 캐시에 남지 않음
+                stream = stream_structured_output(stream, structured_output, prompt_tokens)
+            if context_budget:
+                stream = observe_streamed_prompt_tokens(stream, context_budget, chat_completion_request.model, prompt_tokens)
+            if scheduler:
+                # 첫 청크를 읽을 때 슬롯을 얻고, 스트림이 끝나거나 클라이언트가 끊길 때 반납
+                stream = scheduler.hold(chat_completion_request.priority, stream, chat_completion_request.model)
+            if cache_key:
+                stream = store_streamed_chunks(stream, partial(response_cache.set, cache_key))
+            if semantic_query:
+                stream = store_streamed_chunks(stream, partial(add_to_semantic_cache, semantic_cache, semantic_query))
+            return stream
+
+        if cached is not None:
+            metrics.cache_hits.inc(chat_completion_request.model)
+            chunks = replay_cached_chunks(cached)
+        elif hit is not None:
+            chunks = replay_cached_chunks(hit.value)
+        elif coalescer and (idempotency_key or is_deterministic(chat_completion_request)):
+            # 같은 스트림이 진행 중이면 중간에 합류 (앞부분은 버퍼에서 재생)
+            chunks = coalescer.subscribe(get_request_key(chat_completion_request, prompt, options, thinking_budget), open_stream, idempotency_key, deadline)
+        else:
+            chunks = await with_deadline(open_stream(), deadline)
+
+        if session_id:
+            chunks = record_streamed_session(chunks, session_store, chat_completion_request, prompt, cached_tokens)
+        try:
+            first_chunk = await with_deadline(chunks.__anext__(), deadline)
+        except BaseException:
+            # 첫 청크 전에 실패/deadline/취소: 스케줄러 슬롯과 Ollama 연결을 바로 정리
+            await chunks.aclose()
+            raise
+    except StopAsyncIteration:
+        metrics.record_request(chat_completion_request.model, "stream", 500, time.monotonic() - start_time)
+        raise HTTPException(status_code=500, detail="Failed to generate response")
+    except SchedulerRejectedError as e:
+        metrics.record_request(chat_completion_request.model, "stream", 429, time.monotonic() - start_time)
+        raise rejected_to_http_exception(e)
+    except (ContextOverflowError, ResponseFormatError) as e:
+        metrics.record_request(chat_completion_request.model, "stream", 400, time.monotonic() - start_time)
+        raise HTTPException(status_code=400, detail=str(e))
+    except IdempotencyConflictError as e:
+        metrics.record_request(chat_completion_request.model, "stream", 422, time.monotonic() - start_time)
+        raise HTTPException(status_code=422, detail=str(e))
+    except StructuredOutputError as e:
+        metrics.record_request(chat_completion_request.model, "stream", 502, time.monotonic() - start_time)
+        raise HTTPException(status_code=502, detail=str(e))
+    except DeadlineExceededError as e:
+        metrics.record_request(chat_completion_request.model, "stream", 504, time.monotonic() - start_time)
+        raise HTTPException(status_code=504, detail=str(e))
+    except BackendUnavailableError as e:
+        metrics.record_request(chat_completion_request.model, "stream", 503, time.monotonic() - start_time)
+        raise unavailable_to_http_exception(e)
+    except BackendError as e:
+        metrics.record_request(chat_completion_request.model, "stream", e.http_status, time.monotonic() - start_time)
+        raise HTTPException(status_code=e.http_status, detail=str(e))
+    except asyncio.CancelledError:
+        metrics.record_request(chat_completion_request.model, "stream", 499, time.monotonic() - start_time)
+        raise
+    except Exception as e:
+        metrics.record_request(chat_completion_request.model, "stream", 500, time.monotonic() - start_time)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    include_usage = chat_completion_request.stream_options is None or chat_completion_request.stream_options.include_usage
+    return stream_chunks_to_events(
+        model=chat_completion_request.model,
+        first_chunk=first_chunk,
+        chunks=chunks,
+        include_usage=include_usage,
+        start_time=start_time,
+        thinking=chat_completion_request.thinking,
     )
+
+
+async def stream_chunks_to_events(
+    model: str,
+    first_chunk: Dict[str, Any],
+    chunks: AsyncIterator[Dict[str, Any]],
+    include_usage: bool = True,
+    start_time: Optional[float] = None,
+    thinking: bool = False,
+) -> AsyncIterator[str]:
+    """OLLAMA 청크를 chat.completion.chunk SSE 이벤트로 하나씩 변환 (전체 응답을 모으지 않음)
+
+    <think> 블록은 청크 단위로 걸러 내고, thinking=True면 reasoning_content 델타로 보낸다.
+    """
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:10]}"
+    created = int(time.time())
+    start_time = start_time if start_time is not None else time.monotonic()
+    first_token_time = None
+    thinking_filter = ThinkingFilter()
+    # 헤더(200)는 이미 나갔으므로 지표에는 중간 오류/끊김을 별도 상태로 남김
+    status = 499
+
+    # 청크마다 같은 앞부분(id, created, model)은 한 번만 직렬화 (형태는 ChatCompletionChunk)
+    head = f'data: {{"id":"{completion_id}","object":"chat.completion.chunk","created":{created},"model":{fastjson.dumps_str(model)},"choices":'
+
+    def event(choices: List[Dict[str, Any]], usage: Optional[Dict[str, Any]] = None) -> str:
+        if usage is None:
+            return f"{head}{fastjson.dumps_str(choices)}}}\n\n"
+        return f'{head}{fastjson.dumps_str(choices)},"usage":{fastjson.dumps_str(usage)}}}\n\n'
+
+    try:
+        yield event([{"index": 0, "delta": {"role": "assistant", "content": ""}}])
+
+        chunk = first_chunk
+        while True:
+            if chunk.get("response") or chunk.get("done"):
+                content, reasoning = thinking_filter.feed(chunk.get("response", ""))
+                if chunk.get("done"):
+                    rest, _ = thinking_filter.flush()
+                    content += rest
+                if reasoning and thinking:
+                    if first_token_time is None:
+                        first_token_time = time.monotonic() - start_time
+                    yield event([{"index": 0, "delta": {"reasoning_content": reasoning}}])
+                if content:
+                    if first_token_time is None:
+                        first_token_time = time.monotonic() - start_time
+                    yield event([{"index": 0, "delta": {"content": content}}])
+
+            if chunk.get("done"):
+                status = 200
+                usage = calculate_usage(chunk)
+                annotate_request(model=model, prompt_tokens=usage["prompt_tokens"], completion_tokens=usage["completion_tokens"])
+                yield event([{"index": 0, "delta": {}, "finish_reason": get_finish_reason(chunk.get("done_reason"))}])
+                if include_usage:
+                    yield event([], usage=usage)
+                break
+
+            chunk = await chunks.__anext__()
+    except StopAsyncIteration:
+        status = 200
+    except Exception as e:
+        # 헤더는 이미 나갔으므로 상태 코드 대신 error 이벤트로 알림
+        status = 500
+        logger.error(f"Streaming error: {e}")
+        yield f"data: {fastjson.dumps_str({'error': {'message': str(e), 'type': 'server_error'}})}\n\n"
+    finally:
+        # 클라이언트가 끊긴 경우에도 upstream 연결을 닫아 OLLAMA 슬롯을 반환
+        await chunks.aclose()
+        metrics.record_request(model, "stream", status, time.monotonic() - start_time, first_token_time)
+
+    yield "data: [DONE]\n\n"
+
+
+async def replay_cached_chunks(cached: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    """캐시된 응답을 OLLAMA 스트림 청크 형태로 재생"""
+    yield {"response": cached["response"], "done": False}
+    yield {**cached, "response": "", "done": True}
+
+
+async def add_to_semantic_cache(semantic_cache: SemanticCache, query: SemanticQuery, value: Dict[str, Any]) -> None:
+    semantic_cache.add(query, value)
+
+
+async def store_streamed_chunks(
+    chunks: AsyncIterator[Dict[str, Any]],
+    store: Callable[[Dict[str, Any]], Awaitable[None]],
+) -> AsyncIterator[Dict[str, Any]]:
+    """청크를 그대로 흘려보내면서 텍스트만 모아, 정상 완료되면 store(캐시 값)로 저장
+
+    추론 블록도 생성된 그대로 저장하고, 재생할 때 응답 변환에서 걸러 낸다.
+    """
+    pieces = []
+    try:
+        async for chunk in chunks:
+            pieces.append(chunk.get("response", ""))
+            if chunk.get("done"):
+                await store({
+                    "model": chunk.get("model"),
+                    "response": "".join(pieces),
+                    "done": True,
+                    "done_reason": chunk.get("done_reason"),
+                    "prompt_eval_count": chunk.get("prompt_eval_count"),
+                    "eval_count": chunk.get("eval_count"),
+                })
+            yield chunk
+    finally:
+        await chunks.aclose()
+
+
+async def observe_streamed_prompt_tokens(
+    chunks: AsyncIterator[Dict[str, Any]],
+    context_budget: ContextBudget,
+    model: str,
+    prompt_tokens: int,
+) -> AsyncIterator[Dict[str, Any]]:
+    """마지막 청크의 prompt_eval_count로 토큰 추정기 보정"""
+    try:
+        async for chunk in chunks:
+            if chunk.get("done"):
+                context_budget.observe(model, prompt_tokens, chunk.get("prompt_eval_count"))
+            yield chunk
+    finally:
+        await chunks.aclose()
+
+
+async def record_streamed_session(
+    chunks: AsyncIterator[Dict[str, Any]],
+    session_store: SessionStore,
+    chat_completion_request: ChatCompletionRequest,
+    prompt: str,
+    cached_tokens: int,
+) -> AsyncIterator[Dict[str, Any]]:
+    """스트림 텍스트를 모아 완료 시 세션에 저장하고, 마지막 청크에 cached_tokens를 붙임"""
+    pieces = []
+    try:
+        async for chunk in chunks:
+            pieces.append(chunk.get("response", ""))
+            if chunk.get("done"):
+                generated_text = "".join(pieces)
+                response_text, _ = split_reasoning(generated_text)
+                prompt_eval_count = chunk.get("prompt_eval_count", 0) or 0
+                turn_cached_tokens = effective_cached_tokens(cached_tokens, prompt_eval_count)
+                session_store.record(
+                    chat_completion_request.session_id,
+                    chat_completion_request.model,
+                    chat_completion_request.messages,
+                    prompt,
+                    response_text,
+                    turn_cached_tokens,
+                    prompt_eval_count,
+                    chunk.get("eval_count", 0) or 0,
+                    generated_text,
+                )
+                chunk = {**chunk, "cached_tokens": turn_cached_tokens}
+            yield chunk
+    finally:
+        await chunks.aclose()
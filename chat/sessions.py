@@ -0,0 +1,149 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from chat.models import Message
+from core.config import settings
+from templates.base import ChatTemplate
+
+
+@dataclass
+class Session:
+    model: str
+    # 클라이언트가 보는 대화 (role, content) - 다음 요청의 messages 앞부분과 비교
+    messages: List[Tuple[str, str]]
+    # OLLAMA에 실제로 보낸 프롬프트 + 생성된 응답 그대로 (다음 턴 프롬프트의 prefix)
+    transcript: str
+    # transcript의 토큰 수 (다음 턴에서 재평가하지 않아도 되는 토큰)
+    tokens: int
+    last_used: float
+
+    @property
+    def size(self) -> int:
+        return len(self.transcript) + sum(len(content) for _, content in self.messages)
+
+
+class SessionStore:
+    """대화 세션 저장소 (LRU + TTL + 메모리 상한)
+
+    매 턴마다 전체 대화를 다시 렌더링하면, 클라이언트가 되돌려 보낸 assistant 메시지가
+    실제 생성 텍스트와 조금만 달라도 prefix가 어긋나 이전 턴 전체를 다시 prompt-eval 한다.
+    세션은 실제로 보낸 텍스트(transcript)를 기억해 두고 새 턴만 그 뒤에 이어 붙이므로
+    OLLAMA 러너의 KV prefix 캐시가 그대로 재사용된다.
+    """
+
+    def __init__(
+        self,
+        max_sessions: Optional[int] = None,
+        ttl: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        self.max_sessions = max_sessions or settings.session_max_sessions
+        self.ttl = ttl or settings.session_ttl
+        self.max_bytes = max_bytes or settings.session_max_bytes
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._total_bytes = 0
+
+        self.reused_turns = 0
+        self.tokens_saved = 0
+
+    def get(self, session_id: str) -> Optional[Session]:
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        if session.last_used + self.ttl < time.time():
+            self.delete(session_id)
+            return None
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def delete(self, session_id: str) -> bool:
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        self._total_bytes -= session.size
+        return True
+
+    def render_prompt(
+        self,
+        session_id: Optional[str],
+        model: str,
+        messages: List[Message],
+        template: ChatTemplate,
+        thinking: bool = True,
+    ) -> Tuple[str, int]:
+        """(프롬프트, 재사용되는 prefix 토큰 수) 반환
+
+        저장된 대화가 이번 요청 messages의 앞부분과 정확히 같으면 transcript 뒤에
+        새 메시지만 렌더링해 붙이고, 아니면 전체를 새로 렌더링한다.
+        """
+        session = self.get(session_id) if session_id else None
+        if session is not None and session.model == model and len(messages) > len(session.messages):
+            history = [(message.role, message.content) for message in messages[: len(session.messages)]]
+            if history == session.messages:
+                new_messages = messages[len(session.messages):]
+                return session.transcript + template.end_of_turn + template.convert_messages(new_messages, thinking), session.tokens
+
+        return template.convert_messages(messages, thinking), 0
+
+    def record(
+        self,
+        session_id: str,
+        model: str,
+        messages: List[Message],
+        prompt: str,
+        response_text: str,
+        cached_tokens: int,
+        prompt_eval_count: int,
+        eval_count: int,
+        generated_text: Optional[str] = None,
+    ) -> None:
+        """이번 턴 결과를 세션에 저장 (다음 턴 prefix)
+
+        response_text는 클라이언트가 받은 본문, generated_text는 추론 블록까지 포함해
+        모델이 실제로 생성한 텍스트 (없으면 response_text와 같음)
+        """
+        if cached_tokens:
+            self.reused_turns += 1
+            self.tokens_saved += cached_tokens
+
+        self.delete(session_id)
+        session = Session(
+            model=model,
+            messages=[(message.role, message.content) for message in messages] + [("assistant", response_text)],
+            transcript=prompt + (response_text if generated_text is None else generated_text),
+            tokens=cached_tokens + prompt_eval_count + eval_count,
+            last_used=time.time(),
+        )
+        self._sessions[session_id] = session
+        self._total_bytes += session.size
+        self._evict()
+
+    def _evict(self) -> None:
+        now = time.time()
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            expired = session.last_used + self.ttl < now
+            if not expired and len(self._sessions) <= self.max_sessions and self._total_bytes <= self.max_bytes:
+                break
+            self.delete(session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._sessions),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "reused_turns": self.reused_turns,
+            "prompt_tokens_saved": self.tokens_saved,
+        }
+
+
+def effective_cached_tokens(cached_tokens: int, prompt_eval_count: int) -> int:
+    """OLLAMA가 prefix를 재사용했으면 prompt_eval_count는 새 토큰만 센다.
+
+    러너 슬롯이 비워져 전체를 다시 평가했다면(prompt_eval_count >= prefix) 절약분은 0
+    """
+    if cached_tokens and prompt_eval_count < cached_tokens:
+        return cached_tokens
+    return 0
@@ -0,0 +1,353 @@
+import json
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Union
+
+from chat.models import ChatCompletionRequest
+from chat.thinking import ThinkingFilter
+from core import fastjson
+from model.model_manager import close_completed_stream
+
+# (값, 경로) → 오류 메시지 (통과하면 None)
+Check = Callable[[Any, str], Optional[str]]
+
+
+class ResponseFormatError(Exception):
+    """response_format이 잘못됐거나 지원하지 않는 스키마 (HTTP 400)"""
+
+
+class StructuredOutputError(Exception):
+    """모델 출력이 JSON이 아니거나 스키마에 맞지 않음 (HTTP 502)"""
+
+
+@dataclass
+class StructuredOutput:
+    format: Union[str, Dict[str, Any]]  # Ollama format 필드 ("json" 또는 JSON schema)
+    check: Check
+
+    def validate(self, text: str, truncated: bool = False) -> Any:
+        """본문(추론 블록 제외)을 파싱/검증해 값 반환 (실패하면 StructuredOutputError)"""
+        try:
+            value = fastjson.loads(text)
+        except ValueError as e:
+            cut = " (output was cut off at num_predict)" if truncated else ""
+            raise StructuredOutputError(f"Model output is not valid JSON{cut}: {e}") from None
+        error = self.check(value, "$")
+        if error:
+            raise StructuredOutputError(f"Model output does not match response_format: {error}")
+        return value
+
+
+def get_structured_output(chat_completion_request: ChatCompletionRequest) -> Optional[StructuredOutput]:
+    """response_format → Ollama format + 검증기 (text거나 없으면 None)"""
+    response_format = chat_completion_request.response_format
+    if response_format is None or response_format.type == "text":
+        return None
+    if response_format.type == "json_object":
+        return StructuredOutput("json", _check_object)
+    if response_format.json_schema is None or response_format.json_schema.schema_ is None:
+        raise ResponseFormatError("response_format.json_schema.schema is required for type 'json_schema'")
+    schema = response_format.json_schema.schema_
+    return StructuredOutput(schema, get_validator(schema))
+
+
+def _check_object(value: Any, path: str) -> Optional[str]:
+    return None if isinstance(value, dict) else f"{path}: expected a JSON object"
+
+
+def get_validator(schema: Dict[str, Any]) -> Check:
+    """스키마를 검사 함수로 컴파일 (같은 스키마는 캐시된 함수를 재사용)"""
+    return _compile_cached(json.dumps(schema, sort_keys=True, separators=(",", ":")))
+
+
+@lru_cache(maxsize=256)
+def _compile_cached(canonical: str) -> Check:
+    schema = json.loads(canonical)
+    return _SchemaCompiler(schema).compile(schema)
+
+
+_TYPES: Dict[str, Callable[[Any], bool]] = {
+    "object": lambda value: isinstance(value, dict),
+    "array": lambda value: isinstance(value, list),
+    "string": lambda value: isinstance(value, str),
+    "integer": lambda value: (isinstance(value, int) and not isinstance(value, bool)) or (isinstance(value, float) and value.is_integer()),
+    "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    "boolean": lambda value: isinstance(value, bool),
+    "null": lambda value: value is None,
+}
+
+
+def _accept(value: Any, path: str) -> Optional[str]:
+    return None
+
+
+class _SchemaCompiler:
+    """JSON Schema를 클로저로 한 번만 해석해 두고, 요청마다 스키마 dict를 다시 읽지 않게 함
+
+    Ollama 문법 제약이 다루는 범위(type, properties, required, items, enum 등)와 로컬 $ref만
+    지원한다. 모르는 키워드는 JSON Schema 규칙대로 무시한다.
+    """
+
+    def __init__(self, root: Dict[str, Any]):
+        self.root = root
+        self.refs: Dict[str, Check] = {}
+
+    def compile(self, schema: Any) -> Check:
+        if schema is True or schema == {}:
+            return _accept
+        if schema is False:
+            return lambda value, path: f"{path}: no value is allowed here"
+        if not isinstance(schema, dict):
+            raise ResponseFormatError(f"Invalid schema: {schema!r}")
+
+        checks: List[Check] = []
+        if "$ref" in schema:
+            checks.append(self._ref(schema["$ref"]))
+        if "type" in schema:
+            checks.append(self._type(schema["type"]))
+        if "enum" in schema:
+            allowed = schema["enum"]
+            checks.append(lambda value, path: None if value in allowed else f"{path}: must be one of {allowed}")
+        if "const" in schema:
+            const = schema["const"]
+            checks.append(lambda value, path: None if value == const else f"{path}: must be {const!r}")
+        if any(key in schema for key in ("properties", "required", "additionalProperties")):
+            checks.append(self._object(schema))
+        if "items" in schema or "minItems" in schema or "maxItems" in schema:
+            checks.append(self._array(schema))
+        if any(key in schema for key in ("minLength", "maxLength", "pattern")):
+            checks.append(self._string(schema))
+        if "minimum" in schema or "maximum" in schema:
+            checks.append(self._number(schema))
+        for keyword in ("anyOf", "oneOf", "allOf"):
+            if keyword in schema:
+                checks.append(self._combination(keyword, [self.compile(option) for option in schema[keyword]]))
+
+        if not checks:
+            return _accept
+        if len(checks) == 1:
+            return checks[0]
+
+        def check(value: Any, path: str) -> Optional[str]:
+            for each in checks:
+                error = each(value, path)
+                if error:
+                    return error
+            return None
+        return check
+
+    def _ref(self, ref: str) -> Check:
+        if not isinstance(ref, str) or not ref.startswith("#"):
+            raise ResponseFormatError(f"Unsupported $ref {ref!r} (only local references like '#/$defs/Name')")
+        if ref not in self.refs:
+            # 재귀 스키마: 컴파일이 끝나기 전에 자기 자신을 참조할 수 있으므로 자리부터 잡음
+            self.refs[ref] = _accept
+            self.refs[ref] = self.compile(self._resolve(ref))
+        refs = self.refs
+        return lambda value, path: refs[ref](value, path)
+
+    def _resolve(self, ref: str) -> Any:
+        target: Any = self.root
+        for part in ref[1:].split("/"):
+            if not part:
+                continue
+            part = part.replace("~1", "/").replace("~0", "~")
+            if not isinstance(target, dict) or part not in target:
+                raise ResponseFormatError(f"Unresolvable $ref {ref!r}")
+            target = target[part]
+        return target
+
+    @staticmethod
+    def _type(type_: Union[str, List[str]]) -> Check:
+        names = type_ if isinstance(type_, list) else [type_]
+        unknown = [name for name in names if name not in _TYPES]
+        if unknown:
+            raise ResponseFormatError(f"Unknown schema type {unknown[0]!r}")
+        predicates = [_TYPES[name] for name in names]
+        expected = " or ".join(names)
+        return lambda value, path: None if any(predicate(value) for predicate in predicates) else f"{path}: expected {expected}"
+
+    def _object(self, schema: Dict[str, Any]) -> Check:
+        properties = {name: self.compile(sub) for name, sub in (schema.get("properties") or {}).items()}
+        required = list(schema.get("required") or [])
+        additional = schema.get("additionalProperties", True)
+        additional_check = self.compile(additional) if isinstance(additional, dict) else None
+
+        def check(value: Any, path: str) -> Optional[str]:
+            if not isinstance(value, dict):
+                return None
+            for name in required:
+                if name not in value:
+                    return f"{path}: missing required property {name!r}"
+            for name, item in value.items():
+                each = properties.get(name)
+                if each is None:
+                    if additional is False:
+                        return f"{path}: unexpected property {name!r}"
+                    if additional_check is None:
+                        continue
+                    each = additional_check
+                error = each(item, f"{path}.{name}")
+                if error:
+                    return error
+            return None
+        return check
+
+    def _array(self, schema: Dict[str, Any]) -> Check:
+        items = self.compile(schema["items"]) if "items" in schema else _accept
+        min_items = schema.get("minItems")
+        max_items = schema.get("maxItems")
+
+        def check(value: Any, path: str) -> Optional[str]:
+            if not isinstance(value, list):
+                return None
+            if min_items is not None and len(value) < min_items:
+                return f"{path}: expected at least {min_items} items"
+            if max_items is not None and len(value) > max_items:
+                return f"{path}: expected at most {max_items} items"
+            for index, item in enumerate(value):
+                error = items(item, f"{path}[{index}]")
+                if error:
+                    return error
+            return None
+        return check
+
+    @staticmethod
+    def _string(schema: Dict[str, Any]) -> Check:
+        min_length = schema.get("minLength")
+        max_length = schema.get("maxLength")
+        try:
+            pattern = re.compile(schema["pattern"]) if "pattern" in schema else None
+        except re.error as e:
+            raise ResponseFormatError(f"Invalid schema pattern {schema['pattern']!r}: {e}") from None
+
+        def check(value: Any, path: str) -> Optional[str]:
+            if not isinstance(value, str):
+                return None
+            if min_length is not None and len(value) < min_length:
+                return f"{path}: shorter than {min_length} characters"
+            if max_length is not None and len(value) > max_length:
+                return f"{path}: longer than {max_length} characters"
+            if pattern is not None and not pattern.search(value):
+                return f"{path}: does not match pattern {pattern.pattern!r}"
+            return None
+        return check
+
+    @staticmethod
+    def _number(schema: Dict[str, Any]) -> Check:
+        minimum = schema.get("minimum")
+        maximum = schema.get("maximum")
+
+        def check(value: Any, path: str) -> Optional[str]:
+            if not _TYPES["number"](value):
+                return None
+            if minimum is not None and value < minimum:
+                return f"{path}: less than minimum {minimum}"
+            if maximum is not None and value > maximum:
+                return f"{path}: greater than maximum {maximum}"
+            return None
+        return check
+
+    @staticmethod
+    def _combination(keyword: str, options: List[Check]) -> Check:
+        def check(value: Any, path: str) -> Optional[str]:
+            errors = [option(value, path) for option in options]
+            passed = sum(error is None for error in errors)
+            if keyword == "allOf":
+                return next((error for error in errors if error), None)
+            if keyword == "oneOf" and passed > 1:
+                return f"{path}: matches more than one schema in oneOf"
+            return None if passed else f"{path}: does not match any schema in {keyword} ({errors[0]})"
+        return check
+
+
+class JSONEndScanner:
+    """스트림으로 오는 JSON 텍스트에서 최상위 객체/배열이 닫히는 곳을 찾음
+
+    괄호 깊이와 문자열/이스케이프 상태만 따라가므로 조각마다 새로 파싱하지 않는다.
+    최상위 값이 객체나 배열이 아니면 끝을 판단하지 않는다.
+    """
+
+    _TOKENS = re.compile(r'["\\{}\[\]]')
+
+    def __init__(self) -> None:
+        self.depth = 0
+        self.in_string = False
+        self.done = False
+        # 이스케이프된 문자의 위치 (다음 조각의 첫 글자면 0)
+        self._escaped_at: Optional[int] = None
+
+    def feed(self, text: str) -> int:
+        """text에서 최상위 값이 끝난 다음 위치 (아직이면 -1)"""
+        if self.done:
+            return 0
+        for match in self._TOKENS.finditer(text):
+            if self._escaped_at is not None:
+                escaped_at, self._escaped_at = self._escaped_at, None
+                if match.start() == escaped_at:
+                    continue
+            char = match.group()
+            if self.in_string:
+                if char == "\\":
+                    self._escaped_at = match.end()
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "{[":
+                self.depth += 1
+            elif self.depth > 0:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.done = True
+                    return match.end()
+        # 조각이 백슬래시로 끝났으면 다음 조각의 첫 글자가 이스케이프됨
+        self._escaped_at = 0 if self._escaped_at == len(text) else None
+        return -1
+
+
+async def stream_structured_output(
+    chunks: AsyncIterator[Dict[str, Any]],
+    structured_output: StructuredOutput,
+    prompt_tokens: int = 0,
+) -> AsyncIterator[Dict[str, Any]]:
+    """본문 JSON이 닫히는 즉시 Ollama 스트림을 끊고 done 청크로 끝냄
+
+    JSON 모드는 객체를 닫은 뒤에도 num_predict까지 공백을 생성할 수 있으므로, 나머지를
+    기다리지 않고 GPU를 돌려준다. 끝난 본문이 검증에 실패하면 StructuredOutputError
+    (헤더가 이미 나갔으면 error 이벤트로 전달됨). 일찍 끊으면 Ollama가 토큰 수를 주지 않으므로
+    completion 토큰은 받은 청크 수, 프롬프트 토큰은 추정치로 채운다.
+    """
+    thinking_filter = ThinkingFilter()
+    scanner = JSONEndScanner()
+    content = []
+    received = 0
+    try:
+        async for chunk in chunks:
+            text, _ = thinking_filter.feed(chunk.get("response", ""))
+            content.append(text)
+            if chunk.get("done"):
+                rest, _ = thinking_filter.flush()
+                content.append(rest)
+                structured_output.validate("".join(content), chunk.get("done_reason") == "length")
+                yield chunk
+                return
+            received += 1
+            if scanner.feed(text) >= 0:
+                structured_output.validate("".join(content))
+                # 나머지는 공백뿐이므로 바로 닫아 GPU를 돌려줌 (취소가 아닌 완료)
+                await close_completed_stream(chunks)
+                yield chunk
+                yield {
+                    "model": chunk.get("model"),
+                    "response": "",
+                    "done": True,
+                    "done_reason": "stop",
+                    "prompt_eval_count": prompt_tokens or None,
+                    "eval_count": received,
+                }
+                return
+            yield chunk
+    finally:
+        await chunks.aclose()
@@ -0,0 +1,212 @@
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Optional, Tuple, Union
+
+from chat.models import ChatCompletionRequest
+from core.config import settings
+from model.model_manager import ModelManager
+from templates.base import ChatTemplate
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+
+
+class ThinkingFilter:
+    """생성 텍스트를 조각 단위로 받아 본문과 추론(<think> ... </think>)으로 나누는 상태 기계
+
+    태그가 두 청크에 걸쳐 잘려 와도 되도록 태그의 앞부분일 수 있는 끝 조각은 다음 청크까지
+    보류하므로, 전체 응답을 모으지 않고 스트리밍 중에 그대로 쓸 수 있다.
+    """
+
+    def __init__(self) -> None:
+        self.in_reasoning = False
+        self._pending = ""
+        # 응답 시작 / 태그 직후의 공백(<think>\n, </think>\n\n)은 버림
+        self._strip_leading = True
+
+    def feed(self, text: str) -> Tuple[str, str]:
+        """(본문, 추론) 조각 반환"""
+        text = self._pending + text
+        self._pending = ""
+        content = []
+        reasoning = []
+        while text:
+            tag = THINK_CLOSE if self.in_reasoning else THINK_OPEN
+            index = text.find(tag)
+            if index < 0:
+                hold = _partial_tag_length(text, tag)
+                if self.in_reasoning:
+                    # 추론 끝의 줄바꿈은 닫는 태그 앞에서 버려지도록 함께 보류
+                    hold = len(text) - len(text[: len(text) - hold].rstrip())
+                self._emit(text[: len(text) - hold], content, reasoning)
+                self._pending = text[len(text) - hold:]
+                break
+            self._emit(text[:index].rstrip() if self.in_reasoning else text[:index], content, reasoning)
+            text = text[index + len(tag):]
+            self.in_reasoning = not self.in_reasoning
+            self._strip_leading = True
+        return "".join(content), "".join(reasoning)
+
+    def flush(self) -> Tuple[str, str]:
+        """스트림 끝: 보류한 조각을 내보냄 (닫히지 않은 태그 조각은 텍스트로 취급)"""
+        content = []
+        reasoning = []
+        if not self.in_reasoning:
+            self._emit(self._pending, content, reasoning)
+        self._pending = ""
+        return "".join(content), "".join(reasoning)
+
+    def _emit(self, text: str, content: list, reasoning: list) -> None:
+        if self._strip_leading:
+            text = text.lstrip()
+            if not text:
+                return
+            self._strip_leading = False
+        (reasoning if self.in_reasoning else content).append(text)
+
+
+def _partial_tag_length(text: str, tag: str) -> int:
+    """text 끝이 tag의 앞부분과 겹치는 길이"""
+    start = text.rfind("<", max(0, len(text) - len(tag) + 1))
+    if start < 0 or not tag.startswith(text[start:]):
+        return 0
+    return len(text) - start
+
+
+def split_reasoning(text: str) -> Tuple[str, str]:
+    """완성된 응답 텍스트를 (본문, 추론)으로"""
+    thinking_filter = ThinkingFilter()
+    content, reasoning = thinking_filter.feed(text)
+    rest, _ = thinking_filter.flush()
+    return (content + rest).rstrip(), reasoning
+
+
+def get_thinking_budget(chat_completion_request: ChatCompletionRequest, template: ChatTemplate) -> Optional[int]:
+    """추론 토큰 상한 (추론을 켠 요청 + 추론 블록이 있는 템플릿만, 0/None이면 제한 없음)
+
+    response_format이 있으면 format 문법이 추론 블록까지 막지 않도록 제한이 없어도 두 단계로
+    나눠 답변 단계에만 format을 건다 (-1 = num_predict 무제한).
+    """
+    if not chat_completion_request.thinking or not template.supports_thinking:
+        return None
+    budget = chat_completion_request.thinking_budget
+    if budget is None:
+        budget = settings.thinking_budget
+    if budget > 0:
+        return budget
+    response_format = chat_completion_request.response_format
+    return -1 if response_format is not None and response_format.type != "text" else None
+
+
+@dataclass
+class Reasoning:
+    block: str  # 프롬프트 뒤에 이어 붙일 닫힌 추론 블록
+    prompt_eval_count: int
+    eval_count: int
+
+
+def reasoning_options(options: Dict[str, Any], budget: int) -> Dict[str, Any]:
+    """1단계 옵션: budget 토큰에서 끊고, 모델이 추론을 닫으면 그 자리에서 멈춤"""
+    return {**options, "num_predict": budget, "stop": [THINK_CLOSE]}
+
+
+async def generate_reasoning(
+    model_manager: ModelManager,
+    template: ChatTemplate,
+    prompt: str,
+    budget: int,
+    affinity_key: Optional[str] = None,
+    model: Optional[str] = None,
+    **options,
+) -> Reasoning:
+    """1단계: 추론 블록만 budget 토큰까지 생성하고, 다 못 끝냈으면 강제로 닫음
+
+    모델이 스스로 추론을 끝내면 닫는 태그에서 멈춘다(stop). 2단계 답변은 이 블록을 이어
+    붙인 프롬프트로 생성하므로 같은 노드의 KV prefix가 그대로 재사용된다.
+    """
+    result = await model_manager.generate(
+        prompt + template.think_open,
+        raw=True,
+        affinity_key=affinity_key,
+        model=model,
+        **reasoning_options(options, budget),
+    )
+    return Reasoning(
+        block=template.format_reasoning(result.get("response", "").strip()),
+        prompt_eval_count=result.get("prompt_eval_count") or 0,
+        eval_count=result.get("eval_count") or 0,
+    )
+
+
+async def generate_with_thinking_budget(
+    model_manager: ModelManager,
+    template: ChatTemplate,
+    prompt: str,
+    budget: int,
+    affinity_key: Optional[str] = None,
+    model: Optional[str] = None,
+    format: Optional[Union[str, Dict[str, Any]]] = None,
+    **options,
+) -> Dict[str, Any]:
+    """추론(budget 토큰 이하) → 답변 두 단계로 생성해 하나의 응답으로 합침 (format은 답변 단계에만)"""
+    reasoning = await generate_reasoning(model_manager, template, prompt, budget, affinity_key, model, **options)
+    result = await model_manager.generate(prompt + reasoning.block, raw=True, affinity_key=affinity_key, model=model, format=format, **options)
+    # 2단계에서 다시 평가한 추론 블록은 이미 completion 토큰으로 셌으므로 프롬프트 토큰은 1단계 기준
+    return {
+        **result,
+        "response": reasoning.block + result.get("response", ""),
+        "prompt_eval_count": reasoning.prompt_eval_count,
+        "eval_count": reasoning.eval_count + (result.get("eval_count") or 0),
+    }
+
+
+async def stream_with_thinking_budget(
+    model_manager: ModelManager,
+    template: ChatTemplate,
+    prompt: str,
+    budget: int,
+    affinity_key: Optional[str] = None,
+    model: Optional[str] = None,
+    format: Optional[Union[str, Dict[str, Any]]] = None,
+    **options,
+) -> AsyncIterator[Dict[str, Any]]:
+    """generate_with_thinking_budget의 스트림 버전
+
+    1단계 추론도 스트리밍으로 생성해 토큰이 나오는 대로 내보내므로(첫 바이트가 추론이 끝날 때까지
+    밀리지 않음), budget에서 끊기거나 모델이 추론을 닫으면 닫는 태그를 보내고 답변을 이어서 스트리밍한다.
+    여는 태그는 Ollama의 첫 청크와 함께 보낸다: 첫 청크를 기다리는 호출자가 백엔드 오류(404/503)를
+    응답 헤더 전에 받고, deadline이 Ollama 호출까지 적용되게
+    """
+    parts = []
+    prompt_eval_count = 0
+    reasoning_eval_count = 0
+    opened = False
+    chunks = model_manager.generate_stream(prompt + template.think_open, raw=True, affinity_key=affinity_key, model=model, **reasoning_options(options, budget))
+    try:
+        async for chunk in chunks:
+            if chunk.get("done"):
+                prompt_eval_count = chunk.get("prompt_eval_count") or 0
+                reasoning_eval_count = chunk.get("eval_count") or 0
+                break
+            text = chunk.get("response", "")
+            if text:
+                parts.append(text)
+                yield {"response": text if opened else template.think_open + text, "done": False}
+                opened = True
+    finally:
+        await chunks.aclose()
+    yield {"response": template.think_close if opened else template.think_open + template.think_close, "done": False}
+
+    block = template.format_reasoning("".join(parts).strip())
+    chunks = model_manager.generate_stream(prompt + block, raw=True, affinity_key=affinity_key, model=model, format=format, **options)
+    try:
+        async for chunk in chunks:
+            if chunk.get("done"):
+                # 2단계에서 다시 평가한 추론 블록은 이미 completion 토큰으로 셌으므로 프롬프트 토큰은 1단계 기준
+                chunk = {
+                    **chunk,
+                    "prompt_eval_count": prompt_eval_count,
+                    "eval_count": reasoning_eval_count + (chunk.get("eval_count") or 0),
+                }
+            yield chunk
+    finally:
+        await chunks.aclose()
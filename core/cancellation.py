@@ -0,0 +1,76 @@
+import asyncio
+import time
+from typing import Awaitable, Optional, TypeVar
+
+from fastapi import Request
+
+T = TypeVar("T")
+
+
+class DeadlineExceededError(Exception):
+    """요청 deadline 안에 끝나지 못함 (HTTP 504)"""
+
+
+class ClientDisconnectedError(Exception):
+    """응답을 기다리던 클라이언트가 연결을 끊음 (HTTP 499)"""
+
+
+def get_deadline(timeout: Optional[float], start_time: Optional[float] = None) -> Optional[float]:
+    """timeout(초) → time.monotonic() 기준 deadline (없거나 0 이하면 None)"""
+    if not timeout or timeout <= 0:
+        return None
+    return (start_time if start_time is not None else time.monotonic()) + timeout
+
+
+async def with_deadline(awaitable: Awaitable[T], deadline: Optional[float]) -> T:
+    """deadline까지 awaitable을 기다리고, 지나면 취소한 뒤 DeadlineExceededError
+
+    취소는 스케줄러 대기열에서 빠지거나 Ollama 요청 연결을 닫는 것으로 전파되므로,
+    deadline이 지난 요청은 GPU에 닿기 전에 버려지고 이미 생성 중이면 중단된다.
+    """
+    if deadline is None:
+        return await awaitable
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        # 시작하지 않은 코루틴 / async generator의 __anext__()를 닫아 "never awaited" 경고와 자원 누수 방지
+        close = getattr(awaitable, "close", None)
+        if close is not None:
+            close()
+        raise DeadlineExceededError("Request deadline exceeded")
+    try:
+        return await asyncio.wait_for(awaitable, remaining)
+    except asyncio.TimeoutError:
+        # aiohttp 소켓 타임아웃도 TimeoutError이므로 deadline이 실제로 지났을 때만 변환
+        if time.monotonic() < deadline:
+            raise
+        raise DeadlineExceededError(f"Request deadline exceeded ({remaining:.1f}s)") from None
+
+
+async def cancel_on_disconnect(request: Request, awaitable: Awaitable[T]) -> T:
+    """클라이언트가 연결을 끊으면 awaitable을 취소하고 ClientDisconnectedError
+
+    일반 응답은 본문을 다 보낼 때까지 연결 상태를 보지 않으므로, 아무도 읽지 않을 답을
+    GPU가 끝까지 생성하지 않게 http.disconnect 메시지를 따로 기다린다.
+    """
+    task = asyncio.ensure_future(awaitable)
+    watcher = asyncio.create_task(_wait_for_disconnect(request))
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    finally:
+        watcher.cancel()
+
+    if not task.done():
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        raise ClientDisconnectedError("Client closed request")
+    return task.result()
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
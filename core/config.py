@@ -0,0 +1,166 @@
+import os
+
+
+def _env_str(name: str, default: str) -> str:
+    return os.getenv(name, default)
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+class Settings:
+    """환경 변수 기반 서버 설정 (기본값은 로컬 단일 Ollama 기준)"""
+
+    def __init__(self) -> None:
+        # Ollama 백엔드
+        self.ollama_base_url = _env_str("OLLAMA_BASE_URL", "http://localhost:11434").rstrip("/")
+        # 여러 노드를 쓸 때: OLLAMA_BACKENDS=http://gpu1:11434,http://gpu2:11434
+        self.ollama_backends = [
+            url.strip().rstrip("/") for url in _env_str("OLLAMA_BACKENDS", self.ollama_base_url).split(",") if url.strip()
+        ]
+        # 노드당 병렬 슬롯 수 (각 노드의 OLLAMA_NUM_PARALLEL)
+        self.backend_parallel_slots = _env_int("BACKEND_PARALLEL_SLOTS", 4)
+        self.default_model = _env_str("DEFAULT_MODEL", "qwen3:14b")
+
+        # 백엔드 커넥션 풀 (keep-alive)
+        self.backend_pool_size = _env_int("BACKEND_POOL_SIZE", 32)
+        self.backend_keepalive_timeout = _env_float("BACKEND_KEEPALIVE_TIMEOUT", 60.0)
+        self.backend_connect_timeout = _env_float("BACKEND_CONNECT_TIMEOUT", 10.0)
+        self.backend_request_timeout = _env_float("BACKEND_REQUEST_TIMEOUT", 120.0)
+
+        # 멀티 노드 라우팅
+        self.backend_health_interval = _env_float("BACKEND_HEALTH_INTERVAL", 10.0)
+        self.backend_affinity = _env_str("BACKEND_AFFINITY", "1") == "1"
+        self.backend_affinity_prefix_chars = _env_int("BACKEND_AFFINITY_PREFIX_CHARS", 512)
+        self.backend_affinity_slack = _env_int("BACKEND_AFFINITY_SLACK", 2)
+
+        # 일시적 백엔드 오류(연결 실패, 429/5xx) 재시도: 지터를 준 지수 백오프
+        self.backend_max_retries = _env_int("BACKEND_MAX_RETRIES", 2)
+        self.backend_retry_base_delay = _env_float("BACKEND_RETRY_BASE_DELAY", 0.25)
+        self.backend_retry_max_delay = _env_float("BACKEND_RETRY_MAX_DELAY", 4.0)
+        # 최근 10초 요청 수 대비 허용할 재시도 비율
+        self.backend_retry_budget = _env_float("BACKEND_RETRY_BUDGET", 0.2)
+        # 노드별 circuit breaker: 연속 실패 N번이면 열고, reset_timeout초 뒤 요청 하나로 시험
+        self.circuit_failure_threshold = _env_int("CIRCUIT_FAILURE_THRESHOLD", 5)
+        self.circuit_reset_timeout = _env_float("CIRCUIT_RESET_TIMEOUT", 10.0)
+
+        # 모델 예열: 요청마다 보내는 keep_alive (Ollama 형식: "30m", "1h", 초 단위 숫자, -1 = 계속 유지. 비우면 Ollama 기본값)
+        self.model_keep_alive = _env_str("MODEL_KEEP_ALIVE", "1h")
+        # 시작할 때 / 주기적으로 메모리에 올려 둘 모델
+        self.warm_models = [
+            model.strip() for model in _env_str("WARM_MODELS", self.default_model).split(",") if model.strip()
+        ]
+        self.warm_on_startup = _env_str("WARM_ON_STARTUP", "1") == "1"
+        # 예열 핑 간격 (초, 0 = 끔)
+        self.warm_interval = _env_float("WARM_INTERVAL", 0.0)
+        # 배치 시작 시각(HH:MM, 로컬 시간) 목록. 각 시각 WARM_LEAD초 전에 예열
+        self.warm_schedule = [entry.strip() for entry in _env_str("WARM_SCHEDULE", "").split(",") if entry.strip()]
+        self.warm_lead = _env_float("WARM_LEAD", 120.0)
+        # 응답의 load_duration이 이 값(초) 이상이면 콜드 스타트로 경고
+        self.cold_start_warn_seconds = _env_float("COLD_START_WARN_SECONDS", 1.0)
+
+        # 입장 제어 스케줄러 (max_in_flight 기본값은 전체 노드의 병렬 슬롯 합)
+        self.scheduler_max_in_flight = _env_int("SCHEDULER_MAX_IN_FLIGHT", self.backend_parallel_slots * len(self.ollama_backends))
+        # uvicorn --workers N: 워커들이 실행 슬롯(SCHEDULER_MAX_IN_FLIGHT)과 디스크 응답 캐시를 공유할 디렉터리 (비면 워커별)
+        self.shared_state_dir = _env_str("SHARED_STATE_DIR", "")
+        # 다른 워커가 슬롯을 놓았는지 다시 확인하는 간격 (초)
+        self.shared_slot_poll_interval = _env_float("SHARED_SLOT_POLL_INTERVAL", 0.02)
+        self.scheduler_max_queue_interactive = _env_int("SCHEDULER_MAX_QUEUE_INTERACTIVE", 32)
+        self.scheduler_max_queue_bulk = _env_int("SCHEDULER_MAX_QUEUE_BULK", 512)
+        self.scheduler_reserved_interactive = _env_int("SCHEDULER_RESERVED_INTERACTIVE", 1)
+        self.scheduler_queue_timeout = _env_float("SCHEDULER_QUEUE_TIMEOUT", 60.0)
+        # 요청 deadline 기본값 (초, 0 = 없음). 요청의 timeout / X-Request-Timeout 헤더가 우선
+        self.request_timeout = _env_float("REQUEST_TIMEOUT", 0.0)
+        # 동시에 실행할 모델 종류 수 (노드별 OLLAMA_MAX_LOADED_MODELS의 합, 0 = 제한 없음. 기본은 노드당 1개)
+        self.scheduler_max_loaded_models = _env_int("SCHEDULER_MAX_LOADED_MODELS", len(self.ollama_backends))
+        # 다른 모델 요청이 이 시간(초) 이상 기다리면 실행 중인 모델의 새 요청을 멈추고 교체
+        self.scheduler_model_switch_wait = _env_float("SCHEDULER_MODEL_SWITCH_WAIT", 5.0)
+        # 모델별 동시 실행 상한: MODEL_MAX_IN_FLIGHT=qwen3:14b=2,qwen3:1.7b=8
+        self.model_max_in_flight = {
+            name.strip(): int(limit)
+            for name, _, limit in (entry.rpartition("=") for entry in _env_str("MODEL_MAX_IN_FLIGHT", "").split(",") if entry.strip())
+        }
+        # 적응형 동시 실행 상한: 지연 시간을 보며 1(LIMITER_MIN_LIMIT) ~ SCHEDULER_MAX_IN_FLIGHT 사이에서 자동 조정
+        self.concurrency_limiter = _env_str("CONCURRENCY_LIMITER", "0") == "1"
+        self.limiter_initial_limit = _env_int("LIMITER_INITIAL_LIMIT", self.backend_parallel_slots * len(self.ollama_backends))
+        self.limiter_min_limit = _env_int("LIMITER_MIN_LIMIT", 1)
+        # 최근 지연이 기준(최소) 지연의 이 배수를 넘으면 상한을 줄임
+        self.limiter_tolerance = _env_float("LIMITER_TOLERANCE", 1.5)
+        # 기준 지연을 구하는 최근 샘플 수
+        self.limiter_window = _env_int("LIMITER_WINDOW", 200)
+
+        # 모델 목록 (/v1/models, 요청 model 검증) 캐시 시간 (초)
+        self.model_list_ttl = _env_float("MODEL_LIST_TTL", 60.0)
+        # 목록에 없는 model을 404로 거절 (0이면 그대로 Ollama에 전달)
+        self.model_validation = _env_str("MODEL_VALIDATION", "1") == "1"
+
+        # 컨텍스트 예산: num_ctx는 이 버킷 중 하나로 올림 (비우면 num_ctx를 보내지 않음)
+        self.context_buckets = [int(size) for size in _env_str("CONTEXT_BUCKETS", "4096,8192,16384,32768").split(",") if size.strip()]
+        # 컨텍스트 초과 시 reject(400) 또는 trim(오래된 메시지부터 잘라냄)
+        self.context_overflow_policy = _env_str("CONTEXT_OVERFLOW_POLICY", "reject")
+        # 토큰 추정 오차 여유 (비율)
+        self.context_estimate_margin = _env_float("CONTEXT_ESTIMATE_MARGIN", 0.1)
+
+        # thinking=True 요청의 기본 추론 토큰 상한 (0 = 제한 없음, 요청의 thinking_budget이 우선)
+        self.thinking_budget = _env_int("THINKING_BUDGET", 0)
+
+        # 긴 문서 map-reduce 요약 (/v1/summarize)
+        self.summarize_chunk_tokens = _env_int("SUMMARIZE_CHUNK_TOKENS", 3000)
+        self.summarize_overlap_tokens = _env_int("SUMMARIZE_OVERLAP_TOKENS", 150)
+        self.summarize_max_concurrency = _env_int("SUMMARIZE_MAX_CONCURRENCY", self.scheduler_max_in_flight)
+        self.summarize_max_chunks = _env_int("SUMMARIZE_MAX_CHUNKS", 64)
+
+        # 응답 캐시 (temperature=0 또는 seed 고정 요청만). CACHE_DISK_PATH가 비어 있으면 메모리만 사용 (SHARED_STATE_DIR이 있으면 그 안에 만들어 워커끼리 공유)
+        self.cache_enabled = _env_str("CACHE_ENABLED", "1") == "1"
+        self.cache_max_entries = _env_int("CACHE_MAX_ENTRIES", 1024)
+        self.cache_ttl = _env_float("CACHE_TTL", 3600.0)
+        self.cache_disk_path = _env_str(
+            "CACHE_DISK_PATH", os.path.join(self.shared_state_dir, "response_cache.sqlite") if self.shared_state_dir else ""
+        )
+        self.cache_disk_max_entries = _env_int("CACHE_DISK_MAX_ENTRIES", 100000)
+
+        # 임베딩 (/v1/embeddings): 동시에 들어온 입력을 EMBED_BATCH_WAIT초 동안 모아 최대 EMBED_MAX_BATCH개씩 한 번에 보냄
+        self.embed_max_batch = _env_int("EMBED_MAX_BATCH", 256)
+        self.embed_batch_wait = _env_float("EMBED_BATCH_WAIT", 0.01)
+        self.embed_max_inputs = _env_int("EMBED_MAX_INPUTS", 2048)
+        # 벡터 캐시 (모델별 최대 개수, 0 = 끔)
+        self.embed_cache_max_entries = _env_int("EMBED_CACHE_MAX_ENTRIES", 50000)
+
+        # 시맨틱 캐시 (요청의 semantic_cache=true일 때만): 사용자 메시지 임베딩의 코사인 유사도가 threshold 이상이면 저장된 응답 재사용
+        self.semantic_cache_enabled = _env_str("SEMANTIC_CACHE_ENABLED", "0") == "1"
+        self.semantic_cache_embed_model = _env_str("SEMANTIC_CACHE_EMBED_MODEL", "nomic-embed-text")
+        self.semantic_cache_threshold = _env_float("SEMANTIC_CACHE_THRESHOLD", 0.95)
+        self.semantic_cache_max_entries = _env_int("SEMANTIC_CACHE_MAX_ENTRIES", 10000)
+        self.semantic_cache_ttl = _env_float("SEMANTIC_CACHE_TTL", 86400.0)
+
+        # 동일 요청 coalescing / Idempotency-Key 결과 보관 시간 (초)
+        self.idempotency_ttl = _env_float("IDEMPOTENCY_TTL", 600.0)
+
+        # 대화 세션 (session_id) - 오래 안 쓴 세션부터 제거
+        self.session_max_sessions = _env_int("SESSION_MAX_SESSIONS", 1000)
+        self.session_ttl = _env_float("SESSION_TTL", 1800.0)
+        self.session_max_bytes = _env_int("SESSION_MAX_BYTES", 64 * 1024 * 1024)
+
+        # 배치 작업 (/v1/batches)
+        self.batch_data_dir = _env_str("BATCH_DATA_DIR", "data/batches")
+        self.batch_concurrency = _env_int("BATCH_CONCURRENCY", 4)
+        self.batch_max_lines = _env_int("BATCH_MAX_LINES", 10000)
+        self.batch_max_retries = _env_int("BATCH_MAX_RETRIES", 5)
+
+        # 로깅: 큐가 가득 차면 버림. 호출이 많은 경로는 접근 로그를 일부만 남김 (오류/느린 요청은 항상 기록)
+        self.log_queue_size = _env_int("LOG_QUEUE_SIZE", 10000)
+        self.log_sample_rate = _env_float("LOG_SAMPLE_RATE", 1.0)
+        self.log_sample_paths = [
+            path.strip() for path in _env_str("LOG_SAMPLE_PATHS", "/v1/chat/completions,/metrics").split(",") if path.strip()
+        ]
+        self.log_slow_request = _env_float("LOG_SLOW_REQUEST", 30.0)
+
+
+settings = Settings()
@@ -0,0 +1,39 @@
+import json
+from typing import Any, Union
+
+from fastapi.responses import Response
+
+try:
+    # 선택 의존성: 있으면 요청당 JSON 파싱/직렬화 CPU가 크게 줄어든다
+    import orjson
+except ImportError:
+    # 없으면 표준 json 사용
+    orjson = None
+
+
+def loads(data: Union[bytes, bytearray, str]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(value: Any) -> bytes:
+    """공백 없는 UTF-8 JSON 바이트 (비ASCII 문자는 이스케이프하지 않음)"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_str(value: Any) -> str:
+    return dumps(value).decode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """이미 dict로 만든 응답을 한 번에 직렬화 (FastAPI의 jsonable_encoder 단계를 건너뜀)"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
@@ -1,14 +1,83 @@
+import atexit
+import contextvars
+import copy
+import json
 import logging
 import logging.handlers
+import queue
 import sys
 from pathlib import Path
+from typing import Any, Dict, Optional
+
+from core.config import settings
+
+# 현재 요청의 id와 로그에 덧붙일 필드 (미들웨어가 설정, 서비스가 토큰 수 등을 채움)
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+request_fields_var: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("request_fields", default=None)
+
+
+def annotate_request(**fields: Any) -> None:
+    """현재 요청의 접근 로그에 필드 추가 (요청 밖에서 부르면 무시)"""
+    request_fields = request_fields_var.get()
+    if request_fields is not None:
+        request_fields.update(fields)
+
+
+class _RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """한 줄에 JSON 하나 (extra={"fields": {...}}로 넘긴 값은 최상위 키로 펼침)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """큐가 가득 차면 기다리지 않고 버림 (이벤트 루프가 로그 때문에 멈추지 않도록)"""
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]"):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """메시지 인자만 미리 합침 (기본 prepare는 traceback을 message에 섞고 exc_info를 지우므로,
+        예외는 그대로 두어 JsonFormatter가 "exc" 필드로 따로 쓰게 함)"""
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
 
 
 class LoggerManager:
+    """로그 기록은 큐에 넣기만 하고, 파일/콘솔 쓰기는 QueueListener 스레드가 처리"""
+
     def __init__(self, log_dir: str = "logs", level: int = logging.INFO) -> None:
         self.is_configured = False
         self.log_dir = Path(log_dir)
         self.level = level
+        self.queue_handler: Optional[_DroppingQueueHandler] = None
+        self.listener: Optional[logging.handlers.QueueListener] = None
         self._setup_directories()
         self._setup_logging()
 
@@ -19,9 +88,8 @@ class LoggerManager:
         self.log_dir.mkdir(exist_ok=True)
 
     def _setup_logging(self):
-        # 싱글톤 패턴을 넣는거 같은데..
         if not self.is_configured:
-            # 날짜별 + 크기 기반 핸들러 생성
+            # 날짜별 + 크기 기반 핸들러 생성 (JSON Lines)
             file_handler = logging.handlers.TimedRotatingFileHandler(
                 filename=self.log_dir / "app.log",
                 when="midnight",  # 매일 자정에 새 파일
@@ -29,23 +97,34 @@ class LoggerManager:
                 backupCount=30,  # 30일간 보관
                 encoding="utf-8",
             )
+            file_handler.setFormatter(JsonFormatter())
 
-            # 콘솔 핸들러
+            # 콘솔 핸들러 (사람이 읽기 쉬운 형식)
             console_handler = logging.StreamHandler(sys.stdout)
-
-            # 포맷터 설정
-            formatter = logging.Formatter(
+            console_handler.setFormatter(logging.Formatter(
                 "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-            )
+            ))
 
-            file_handler.setFormatter(formatter)
-            console_handler.setFormatter(formatter)
+            self.queue_handler = _DroppingQueueHandler(queue.Queue(maxsize=settings.log_queue_size))
+            self.queue_handler.addFilter(_RequestIdFilter())
+            # 큐에는 레코드를 그대로 넣고 형식은 각 핸들러가 적용 (prepare 참고)
+            self.listener = logging.handlers.QueueListener(
+                self.queue_handler.queue, file_handler, console_handler, respect_handler_level=True
+            )
+            self.listener.start()
+            atexit.register(self.shutdown)
 
             logging.basicConfig(
                 level=self.level,
-                handlers=[file_handler, console_handler],
+                handlers=[self.queue_handler],
             )
             self.is_configured = True
 
+    def shutdown(self) -> None:
+        """남은 로그를 모두 쓰고 리스너 스레드 종료"""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
 
 logging_manager = LoggerManager()
@@ -0,0 +1,201 @@
+import bisect
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# 모든 기록은 이벤트 루프 스레드 하나에서만 일어나므로 락 없이 dict/list만 갱신한다.
+# 라벨 조합마다 한 번만 시리즈를 만들고, 이후에는 숫자만 더한다.
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+TOKENS_PER_SECOND_BUCKETS = (1.0, 5.0, 10.0, 20.0, 40.0, 80.0, 160.0, 320.0, 640.0, 1280.0, 2560.0, 5120.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._render_samples()
+
+    def _render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def _render_samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) - amount
+
+    def _render_samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 라벨 조합 -> [버킷별 개수..., +Inf 개수, 합계]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        # 누적은 렌더링할 때 계산하고, 여기서는 해당 버킷 하나만 증가
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def _render_samples(self) -> List[str]:
+        lines = []
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series):
+                cumulative += count
+                bucket_label = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, bucket_label)} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Prometheus 텍스트 형식(0.0.4)으로 내보낼 지표 모음"""
+
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> Any:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+requests_total = registry.register(Counter(
+    "llm_requests_total", "Chat completion requests by model, mode and HTTP status", ("model", "mode", "status")))
+request_duration = registry.register(Histogram(
+    "llm_request_duration_seconds", "End-to-end request latency", ("model", "mode", "status")))
+queue_wait = registry.register(Histogram(
+    "llm_queue_wait_seconds", "Time spent waiting for a scheduler slot", ("priority",)))
+time_to_first_token = registry.register(Histogram(
+    "llm_time_to_first_token_seconds", "Time from request start to the first generated token", ("model", "mode")))
+prompt_tokens_per_second = registry.register(Histogram(
+    "llm_prompt_eval_tokens_per_second", "Prompt evaluation speed reported by Ollama", ("model",), TOKENS_PER_SECOND_BUCKETS))
+decode_tokens_per_second = registry.register(Histogram(
+    "llm_decode_tokens_per_second", "Generation speed reported by Ollama", ("model",), TOKENS_PER_SECOND_BUCKETS))
+model_load_duration = registry.register(Histogram(
+    "llm_model_load_seconds", "Model load time reported by Ollama (near zero when already loaded)", ("model",)))
+cold_starts = registry.register(Counter(
+    "llm_cold_starts_total", "Requests that waited for the model to load (load_duration >= COLD_START_WARN_SECONDS)", ("model",)))
+concurrency_limit = registry.register(Gauge(
+    "llm_concurrency_limit", "Current adaptive limit on concurrent Ollama requests"))
+shared_in_flight = registry.register(Gauge(
+    "llm_shared_in_flight_requests", "Ollama requests in flight across all worker processes (SHARED_STATE_DIR)"))
+concurrency_limit_changes = registry.register(Counter(
+    "llm_concurrency_limit_changes_total", "Adaptive limit changes by reason (headroom = raised, latency / overload = lowered)", ("reason",)))
+upstream_cancelled = registry.register(Counter(
+    "llm_upstream_cancelled_total", "Ollama requests aborted before completion (client disconnect, deadline or finished structured output)", ("model",)))
+prompt_tokens = registry.register(Counter(
+    "llm_prompt_tokens_total", "Prompt tokens evaluated by Ollama", ("model",)))
+completion_tokens = registry.register(Counter(
+    "llm_completion_tokens_total", "Tokens generated by Ollama", ("model",)))
+in_flight = registry.register(Gauge(
+    "llm_in_flight_requests", "Requests currently holding a scheduler slot", ("priority",)))
+queued = registry.register(Gauge(
+    "llm_queued_requests", "Requests waiting for a scheduler slot", ("priority",)))
+backend_outstanding = registry.register(Gauge(
+    "llm_backend_outstanding_requests", "In-flight requests per Ollama node", ("backend",)))
+backend_healthy = registry.register(Gauge(
+    "llm_backend_healthy", "1 if the Ollama node passes health checks", ("backend",)))
+backend_retries = registry.register(Counter(
+    "llm_backend_retries_total", "Ollama requests retried after a transient error", ("backend", "error")))
+backend_circuit_open = registry.register(Gauge(
+    "llm_backend_circuit_open", "1 while the backend's circuit breaker is open or half-open", ("backend",)))
+embedding_inputs = registry.register(Counter(
+    "llm_embedding_inputs_total", "Embedding inputs by source (cache = no upstream call)", ("model", "source")))
+cache_hits = registry.register(Counter(
+    "llm_cache_hits_total", "Requests answered from the response cache", ("model",)))
+semantic_cache_hits = registry.register(Counter(
+    "llm_semantic_cache_hits_total", "Requests answered from a similar earlier request", ("model",)))
+
+
+def record_generation(model: str, data: Dict[str, Any]) -> None:
+    """Ollama 응답(또는 스트림의 마지막 청크)의 타이밍 필드 기록 (duration은 나노초)"""
+    prompt_eval_count = data.get("prompt_eval_count") or 0
+    prompt_eval_duration = data.get("prompt_eval_duration") or 0
+    eval_count = data.get("eval_count") or 0
+    eval_duration = data.get("eval_duration") or 0
+    load_duration = data.get("load_duration")
+
+    prompt_tokens.inc(model, amount=prompt_eval_count)
+    completion_tokens.inc(model, amount=eval_count)
+    if prompt_eval_count and prompt_eval_duration:
+        prompt_tokens_per_second.observe(prompt_eval_count / (prompt_eval_duration / 1e9), model)
+    if eval_count and eval_duration:
+        decode_tokens_per_second.observe(eval_count / (eval_duration / 1e9), model)
+    if load_duration is not None:
+        model_load_duration.observe(load_duration / 1e9, model)
+
+
+def record_request(model: str, mode: str, status: int, duration: float, first_token_time: Optional[float] = None) -> None:
+    status_text = str(status)
+    requests_total.inc(model, mode, status_text)
+    request_duration.observe(duration, model, mode, status_text)
+    if first_token_time is not None:
+        time_to_first_token.observe(first_token_time, model, mode)
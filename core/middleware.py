@@ -1,29 +1,83 @@
+import random
 import time
+import uuid
+from typing import List, Optional
 
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from core.logging import logging_manager
+from core.config import settings
+from core.logging import logging_manager, request_fields_var, request_id_var
 
 logger = logging_manager.get_logger("middleware")
 
 
-class LoggingMiddleWare(BaseHTTPMiddleware):
-    async def dispatch(
-        self, request: Request, call_next: RequestResponseEndpoint
-    ) -> Response:
-        start_time = time.time()
+class LoggingMiddleWare:
+    """요청마다 JSON 접근 로그 한 줄 (pure ASGI)
 
-        # 요청 정보 로깅
-        logger.info(f"{request.method} {request.url.path} started")
+    BaseHTTPMiddleware와 달리 응답 본문을 감싸지 않으므로 스트리밍 응답이 그대로 흘러가고,
+    로그는 응답이 끝까지 전송된 뒤(스트림이면 마지막 청크 후) 한 번만 남긴다.
+    X-Request-ID 헤더가 있으면 그 값을, 없으면 새 id를 만들어 응답 헤더로 돌려준다.
+    """
 
-        # 실제 API 처리
-        response = await call_next(request)
+    def __init__(
+        self,
+        app: ASGIApp,
+        sample_rate: Optional[float] = None,
+        sampled_paths: Optional[List[str]] = None,
+        slow_request: Optional[float] = None,
+    ) -> None:
+        self.app = app
+        self.sample_rate = sample_rate if sample_rate is not None else settings.log_sample_rate
+        self.sampled_paths = set(sampled_paths if sampled_paths is not None else settings.log_sample_paths)
+        self.slow_request = slow_request if slow_request is not None else settings.log_slow_request
 
-        # 처리 시간 계산 및 응답 로깅
-        process_time = time.time() - start_time
-        logger.info(
-            f"{request.method} {request.url.path} completed "
-            f"in {process_time:.2f}s (status: {response.status_code})"
-        )
-        return response
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        request_id = self._get_request_id(scope)
+        fields = {}
+        id_token = request_id_var.set(request_id)
+        fields_token = request_fields_var.set(fields)
+        status = 500
+
+        async def send_with_request_id(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            duration = time.perf_counter() - start_time
+            if self._should_log(scope["path"], status, duration):
+                logger.info(
+                    f"{scope['method']} {scope['path']} {status} {duration * 1000:.0f}ms",
+                    extra={"fields": {
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "status": status,
+                        "latency_ms": round(duration * 1000, 1),
+                        **fields,
+                    }},
+                )
+            request_fields_var.reset(fields_token)
+            request_id_var.reset(id_token)
+
+    def _should_log(self, path: str, status: int, duration: float) -> bool:
+        if status >= 400 or duration >= self.slow_request:
+            return True
+        if path in self.sampled_paths and self.sample_rate < 1.0:
+            return random.random() < self.sample_rate
+        return True
+
+    @staticmethod
+    def _get_request_id(scope: Scope) -> str:
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                return value.decode("latin-1")[:128]
+        return uuid.uuid4().hex
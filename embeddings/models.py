@@ -0,0 +1,38 @@
+from typing import List, Literal, Optional, Union
+
+from pydantic import BaseModel
+
+#   요청 (POST /v1/embeddings, OpenAI 형식)
+#   {"model": "bge-m3", "input": ["기사 1 본문", "기사 2 본문"], "encoding_format": "float"}
+#
+#   응답
+#   {"object": "list", "model": "bge-m3",
+#    "data": [{"object": "embedding", "index": 0, "embedding": [0.01, ...]}, ...],
+#    "usage": {"prompt_tokens": 812, "total_tokens": 812}}
+#   encoding_format="base64"이면 embedding은 float32 little-endian 바이트의 base64 문자열
+
+
+class EmbeddingRequest(BaseModel):
+    model: str
+    input: Union[str, List[str]]
+    encoding_format: Optional[Literal["float", "base64"]] = "float"
+    dimensions: Optional[int] = None  # 지원하는 모델에서 벡터 차원 축소
+    priority: Optional[Literal["interactive", "bulk"]] = "interactive"
+
+
+class Embedding(BaseModel):
+    object: str = "embedding"
+    index: int
+    embedding: Union[List[float], str]
+
+
+class EmbeddingUsage(BaseModel):
+    prompt_tokens: int  # 캐시에서 찾은 입력은 0
+    total_tokens: int
+
+
+class EmbeddingResponse(BaseModel):
+    object: str = "list"
+    model: str
+    data: List[Embedding]
+    usage: EmbeddingUsage
@@ -0,0 +1,43 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request
+
+from cache.vector_cache import VectorCache
+from chat.service import rejected_to_http_exception, unavailable_to_http_exception
+from core.cancellation import ClientDisconnectedError, cancel_on_disconnect
+from core.fastjson import FastJSONResponse
+from embeddings.models import EmbeddingRequest, EmbeddingResponse
+from embeddings.service import EmbeddingBatcher, EmbeddingValidationError, create_embeddings
+from model.registry import ModelNotFoundError, ModelRegistry
+from model.resilience import BackendError, BackendUnavailableError
+from model.scheduler import SchedulerRejectedError
+
+router = APIRouter(
+    prefix="/v1",
+    tags=["embeddings"],
+)
+
+
+@router.post("/embeddings", response_model=None, responses={200: {"model": EmbeddingResponse}})
+async def embeddings(request: Request, embeddingRequest: EmbeddingRequest) -> FastJSONResponse:
+    """OpenAI 호환 임베딩 (동시 요청은 묶어서 /api/embed로, 같은 입력은 벡터 캐시에서)"""
+    modelRegistry: ModelRegistry = request.app.state.modelRegistry
+    embeddingBatcher: EmbeddingBatcher = request.app.state.embeddingBatcher
+    vectorCache: Optional[VectorCache] = request.app.state.vectorCache
+
+    try:
+        embeddingRequest.model = await modelRegistry.resolve(embeddingRequest.model)
+        response = await cancel_on_disconnect(request, create_embeddings(embeddingRequest, embeddingBatcher, vectorCache))
+    except ModelNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except EmbeddingValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except SchedulerRejectedError as e:
+        raise rejected_to_http_exception(e)
+    except BackendUnavailableError as e:
+        raise unavailable_to_http_exception(e)
+    except BackendError as e:
+        raise HTTPException(status_code=e.http_status, detail=str(e))
+    except ClientDisconnectedError as e:
+        raise HTTPException(status_code=499, detail=str(e))
+    return FastJSONResponse(response)
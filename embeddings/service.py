@@ -0,0 +1,203 @@
+import asyncio
+import base64
+from array import array
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from cache.vector_cache import VectorCache, make_vector_key, vector_to_bytes
+from core import metrics
+from core.config import settings
+from embeddings.models import EmbeddingRequest
+from model.model_manager import ModelManager
+from model.scheduler import INTERACTIVE, AdmissionScheduler
+
+
+class EmbeddingValidationError(Exception):
+    """입력이 비었거나 개수 제한을 넘음 (HTTP 400)"""
+
+
+@dataclass
+class _Item:
+    text: str
+    future: asyncio.Future
+    priority: str
+
+
+@dataclass
+class _Pending:
+    items: List[_Item] = field(default_factory=list)
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class EmbeddingBatcher:
+    """동시에 들어온 임베딩 요청을 모아 /api/embed 호출 몇 번으로 처리 (micro-batching)
+
+    입력은 (모델, 차원)별 대기열에 쌓였다가 max_wait초가 지나거나 max_batch개가 차면
+    한 번에 보낸다. 호출마다 스케줄러 슬롯 하나를 쓰므로 채팅 요청과 같은 입장 제어를 받는다.
+    """
+
+    def __init__(
+        self,
+        model_manager: ModelManager,
+        scheduler: Optional[AdmissionScheduler] = None,
+        max_batch: Optional[int] = None,
+        max_wait: Optional[float] = None,
+    ):
+        self.model_manager = model_manager
+        self.scheduler = scheduler
+        self.max_batch = max_batch or settings.embed_max_batch
+        self.max_wait = max_wait if max_wait is not None else settings.embed_batch_wait
+        self._pending: Dict[Tuple[str, Optional[int]], _Pending] = {}
+        self._tasks: set = set()
+        self.upstream_calls = 0
+        self.upstream_inputs = 0
+
+    async def embed(
+        self,
+        model: str,
+        texts: List[str],
+        dimensions: Optional[int] = None,
+        priority: str = INTERACTIVE,
+    ) -> List[Tuple[List[float], int]]:
+        """texts 순서대로 (벡터, 입력 토큰 수)"""
+        loop = asyncio.get_running_loop()
+        key = (model, dimensions)
+        pending = self._pending.setdefault(key, _Pending())
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            pending.items.append(_Item(text, future, priority))
+            futures.append(future)
+            if len(pending.items) >= self.max_batch:
+                self._flush(key)
+                pending = self._pending.setdefault(key, _Pending())
+        if pending.items and pending.timer is None:
+            pending.timer = loop.call_later(self.max_wait, self._flush, key)
+        return list(await asyncio.gather(*futures))
+
+    def _flush(self, key: Tuple[str, Optional[int]]) -> None:
+        pending = self._pending.pop(key, None)
+        if pending is None:
+            return
+        if pending.timer is not None:
+            pending.timer.cancel()
+        task = asyncio.create_task(self._run(key, pending.items))
+        # 끝날 때까지 참조를 유지 (GC로 취소되지 않게)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, key: Tuple[str, Optional[int]], items: List[_Item]) -> None:
+        model, dimensions = key
+        # 기다리던 호출자가 모두 떠났으면 보내지 않음
+        items = [item for item in items if not item.future.done()]
+        if not items:
+            return
+        # 같은 배치 안의 중복 입력은 한 번만 보냄
+        texts = list(dict.fromkeys(item.text for item in items))
+        priority = INTERACTIVE if any(item.priority == INTERACTIVE for item in items) else items[0].priority
+
+        try:
+            admission = self.scheduler.slot(priority, model) if self.scheduler else nullcontext()
+            async with admission:
+                data = await self.model_manager.embed(texts, model=model, dimensions=dimensions)
+            embeddings = data.get("embeddings") or []
+            if len(embeddings) != len(texts):
+                raise RuntimeError(f"Ollama returned {len(embeddings)} embeddings for {len(texts)} inputs")
+        except BaseException as e:
+            for item in items:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return
+
+        self.upstream_calls += 1
+        self.upstream_inputs += len(texts)
+        # Ollama는 배치 전체 토큰 수만 주므로 입력 길이 비율로 나눔
+        total_tokens = data.get("prompt_eval_count") or 0
+        total_chars = sum(len(text) for text in texts) or 1
+        results = {
+            text: (vector, round(total_tokens * len(text) / total_chars))
+            for text, vector in zip(texts, embeddings)
+        }
+        for item in items:
+            if not item.future.done():
+                item.future.set_result(results[item.text])
+
+    async def close(self) -> None:
+        for key in list(self._pending):
+            self._flush(key)
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_batch": self.max_batch,
+            "max_wait": self.max_wait,
+            "upstream_calls": self.upstream_calls,
+            "upstream_inputs": self.upstream_inputs,
+            "pending": sum(len(pending.items) for pending in self._pending.values()),
+        }
+
+
+async def embed_texts(
+    texts: List[str],
+    model: str,
+    batcher: EmbeddingBatcher,
+    vector_cache: Optional[VectorCache] = None,
+    dimensions: Optional[int] = None,
+    priority: str = INTERACTIVE,
+) -> Tuple[List[array], int]:
+    """(texts 순서의 float32 벡터, 새로 계산한 입력의 토큰 수). 캐시에 없는 입력만 배처로 보냄"""
+    vectors: List[Optional[array]] = [None] * len(texts)
+    if vector_cache is not None and vector_cache.enabled:
+        for index, text in enumerate(texts):
+            vectors[index] = vector_cache.get(model, dimensions, make_vector_key(text))
+
+    misses = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+    prompt_tokens = 0
+    if misses:
+        results = await batcher.embed(model, misses, dimensions, priority)
+        computed = {}
+        for text, (vector, tokens) in zip(misses, results):
+            computed[text] = array("f", vector)
+            prompt_tokens += tokens
+            if vector_cache is not None:
+                vector_cache.put(model, dimensions, make_vector_key(text), vector)
+        for index, text in enumerate(texts):
+            if vectors[index] is None:
+                vectors[index] = computed[text]
+    metrics.embedding_inputs.inc(model, "cache", amount=len(texts) - len(misses))
+    metrics.embedding_inputs.inc(model, "upstream", amount=len(misses))
+    return vectors, prompt_tokens
+
+
+async def create_embeddings(
+    request: EmbeddingRequest,
+    batcher: EmbeddingBatcher,
+    vector_cache: Optional[VectorCache] = None,
+) -> Dict[str, Any]:
+    """OpenAI embeddings 응답 dict (캐시에 있는 입력은 Ollama를 부르지 않음)"""
+    texts = [request.input] if isinstance(request.input, str) else request.input
+    if not texts:
+        raise EmbeddingValidationError("input must not be empty")
+    if len(texts) > settings.embed_max_inputs:
+        raise EmbeddingValidationError(f"input has {len(texts)} items (max {settings.embed_max_inputs})")
+    if any(not text for text in texts):
+        raise EmbeddingValidationError("input must not contain empty strings")
+
+    vectors, prompt_tokens = await embed_texts(texts, request.model, batcher, vector_cache, request.dimensions, request.priority)
+
+    data = []
+    for index, vector in enumerate(vectors):
+        if request.encoding_format == "base64":
+            embedding: Any = base64.b64encode(vector_to_bytes(vector)).decode("ascii")
+        else:
+            embedding = vector.tolist()
+        data.append({"object": "embedding", "index": index, "embedding": embedding})
+    return {
+        "object": "list",
+        "model": request.model,
+        "data": data,
+        "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+    }
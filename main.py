@@ -1,11 +1,31 @@
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 
+from batch.router import router as batch_router
+from batch.service import BatchRunner
+from cache.response_cache import ResponseCache
+from cache.semantic_cache import create_semantic_cache
+from cache.vector_cache import VectorCache
+from chat.budget import ContextBudget
+from chat.coalescer import RequestCoalescer
 from chat.router import router as chat_router
+from chat.sessions import SessionStore
+from core import metrics
+from core.config import settings
 from core.logging import logging_manager
 from core.middleware import LoggingMiddleWare
+from embeddings.router import router as embeddings_router
+from embeddings.service import EmbeddingBatcher
+from model.limiter import ConcurrencyLimiter
 from model.model_manager import ModelManager
+from model.registry import ModelRegistry
+from model.router import router as model_router
+from model.scheduler import AdmissionScheduler
+from model.shared_slots import create_shared_slots
+from model.warmup import ModelWarmer
+from summarize.router import router as summarize_router
 
 logger = logging_manager.get_logger(__name__)
 
@@ -14,15 +34,50 @@ logger = logging_manager.get_logger(__name__)
 async def lifespan(app: FastAPI):
     # Startup logic
     try:
-        app.state.modelManager = ModelManager()
-    
+        # 지연 시간을 보고 Ollama 동시 요청 상한을 자동 조정 (CONCURRENCY_LIMITER=1일 때만)
+        app.state.concurrencyLimiter = ConcurrencyLimiter() if settings.concurrency_limiter else None
+        app.state.modelManager = ModelManager(limiter=app.state.concurrencyLimiter)
+        await app.state.modelManager.start()
+        logger.info(f"Ollama backends: {', '.join(backend.url for backend in app.state.modelManager.pool.backends)}")
+        # 설치된 모델 목록 (요청 model 검증, /v1/models, 모델 계열(details.family)로 템플릿 선택)
+        app.state.modelRegistry = ModelRegistry(app.state.modelManager)
+        if not await app.state.modelRegistry.refresh():
+            logger.warning("Could not load model metadata, choosing templates by model name")
+        # 설정한 모델을 미리 올려 두고 주기적으로 keep_alive 연장 (백그라운드)
+        app.state.modelWarmer = ModelWarmer(app.state.modelManager)
+        await app.state.modelWarmer.start()
+        # uvicorn --workers N일 때 워커들이 함께 쓰는 실행 슬롯 (SHARED_STATE_DIR이 있을 때만)
+        app.state.sharedSlots = create_shared_slots()
+        app.state.scheduler = AdmissionScheduler(limiter=app.state.concurrencyLimiter, shared_slots=app.state.sharedSlots)
+        app.state.responseCache = ResponseCache() if settings.cache_enabled else None
+        app.state.coalescer = RequestCoalescer()
+        app.state.sessionStore = SessionStore()
+        app.state.contextBudget = ContextBudget()
+        app.state.vectorCache = VectorCache() if settings.embed_cache_max_entries > 0 else None
+        app.state.embeddingBatcher = EmbeddingBatcher(app.state.modelManager, app.state.scheduler)
+        # 요청이 semantic_cache=true일 때만 쓰는 유사도 캐시 (SEMANTIC_CACHE_ENABLED=1 + numpy 필요)
+        app.state.semanticCache = create_semantic_cache(app.state.embeddingBatcher, app.state.vectorCache)
+        app.state.batchRunner = BatchRunner(app.state.modelManager, app.state.scheduler, app.state.responseCache, app.state.coalescer, context_budget=app.state.contextBudget, model_registry=app.state.modelRegistry, semantic_cache=app.state.semanticCache)
+        await app.state.batchRunner.start()
+
         # 여기서 FastAPI 앱이 실행됨
         yield
     except Exception as e:
-        logger.error(f"Startup error: {e}")
+        # 시작에 실패하면 서버가 뜨지 않도록 그대로 올림 (uvicorn이 종료 코드로 알려 줌)
+        logger.exception(f"Startup error: {e}")
+        raise
     finally:
-        # Shutdown logic
-        del app.state.modelManager
+        # Shutdown logic (시작 도중 실패했으면 만들어진 것만 닫음)
+        for name in ("batchRunner", "embeddingBatcher", "modelWarmer", "modelManager"):
+            component = getattr(app.state, name, None)
+            if component is not None:
+                await component.close()
+        for name in ("responseCache", "sharedSlots"):
+            component = getattr(app.state, name, None)
+            if component is not None:
+                component.close()
+        if hasattr(app.state, "modelManager"):
+            del app.state.modelManager
 
 
 app = FastAPI(
@@ -37,8 +92,47 @@ app.add_middleware(LoggingMiddleWare)
 
 # 라우터 등록
 app.include_router(chat_router)
+app.include_router(model_router)
+app.include_router(batch_router)
+app.include_router(summarize_router)
+app.include_router(embeddings_router)
 
 
 @app.get("/")
 async def root():
-    return {"message": "Local LLM API Server is running!"}
+    return {
+        "message": "Local LLM API Server is running!",
+        "backend": app.state.modelManager.stats(),
+        "models": app.state.modelRegistry.stats(),
+        "scheduler": app.state.scheduler.stats(),
+        "limiter": app.state.concurrencyLimiter.stats() if app.state.concurrencyLimiter else None,
+        "cache": app.state.responseCache.stats() if app.state.responseCache else None,
+        "semantic_cache": app.state.semanticCache.stats() if app.state.semanticCache else None,
+        "coalescer": app.state.coalescer.stats(),
+        "sessions": app.state.sessionStore.stats(),
+        "context": app.state.contextBudget.stats(),
+        "warmup": app.state.modelWarmer.stats(),
+        "embeddings": {
+            **app.state.embeddingBatcher.stats(),
+            "cache": app.state.vectorCache.stats() if app.state.vectorCache else None,
+        },
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def prometheus_metrics():
+    # 현재 상태 값(gauge)은 스크레이프 시점에 한 번만 읽어 옴
+    scheduler_stats = app.state.scheduler.stats()
+    for priority, count in scheduler_stats["in_flight_by_priority"].items():
+        metrics.in_flight.set(count, priority)
+    for priority, count in scheduler_stats["queued"].items():
+        metrics.queued.set(count, priority)
+    metrics.concurrency_limit.set(scheduler_stats["limit"])
+    if scheduler_stats["shared"] is not None:
+        metrics.shared_in_flight.set(scheduler_stats["shared"]["in_flight"])
+    for backend in app.state.modelManager.pool.backends:
+        metrics.backend_outstanding.set(backend.outstanding, backend.url)
+        metrics.backend_healthy.set(1 if backend.healthy else 0, backend.url)
+        metrics.backend_circuit_open.set(0 if backend.breaker.state == "closed" else 1, backend.url)
+
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
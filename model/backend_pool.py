@@ -0,0 +1,162 @@
+import asyncio
+import hashlib
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import aiohttp
+
+from core.config import settings
+from core.logging import logging_manager
+from model.resilience import BackendUnavailableError, CircuitBreaker
+
+logger = logging_manager.get_logger(__name__)
+
+
+class Backend:
+    """Ollama 노드 하나의 상태"""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.healthy = True
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.breaker = CircuitBreaker()
+        # 마지막으로 보낸 요청의 모델 (이 노드에 올라와 있을 가능성이 높은 모델)
+        self.last_model: Optional[str] = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "last_model": self.last_model,
+            "circuit": self.breaker.stats(),
+        }
+
+
+class BackendPool:
+    """여러 Ollama 노드에 요청 분배
+
+    - 기본: 진행 중인 요청(outstanding)이 가장 적은 노드 선택
+    - affinity_key(세션 id / 프롬프트 prefix)가 있으면 rendezvous 해싱으로 항상 같은 노드를
+      골라 그 노드의 KV 캐시를 재사용. 단 그 노드가 다른 노드보다 affinity_slack 이상
+      밀려 있으면 least-outstanding으로 넘김
+    - model이 있으면 그 모델을 마지막으로 실행한 노드를 먼저 고려해 노드마다 모델이 바뀌는
+      일(언로드/로드)을 줄임. 역시 affinity_slack 이상 밀려 있으면 다른 노드로 넘김
+    - 주기적인 /api/version 헬스 체크 + 연결 실패 시 즉시 제외 (다음 헬스 체크에서 복구)
+    - 노드별 circuit breaker가 열린 노드는 건너뛰고, 모든 노드가 열려 있으면 BackendUnavailableError
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        get_session: Callable[[], Awaitable[aiohttp.ClientSession]],
+        health_interval: Optional[float] = None,
+        affinity_slack: Optional[int] = None,
+    ):
+        if not urls:
+            raise ValueError("BackendPool needs at least one backend URL")
+        self.backends = [Backend(url) for url in urls]
+        self._get_session = get_session
+        self.health_interval = health_interval if health_interval is not None else settings.backend_health_interval
+        self.affinity_slack = affinity_slack if affinity_slack is not None else settings.backend_affinity_slack
+        self._health_task: Optional[asyncio.Task] = None
+        self._next = 0
+
+    async def start(self) -> None:
+        if len(self.backends) > 1 and self.health_interval > 0:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def close(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+            self._health_task = None
+
+    def select(self, affinity_key: Optional[str] = None, model: Optional[str] = None, avoid: Optional[Backend] = None) -> Backend:
+        """avoid: 방금 실패한 노드 (재시도할 때 다른 노드가 있으면 그 노드로)"""
+        allowed = [backend for backend in self.backends if backend.breaker.allow()]
+        if not allowed:
+            retry_after = min(backend.breaker.retry_after() for backend in self.backends)
+            raise BackendUnavailableError("Ollama backend is unavailable (circuit open)", max(1, round(retry_after)))
+        candidates = [backend for backend in allowed if backend.healthy] or allowed
+        candidates = [backend for backend in candidates if backend is not avoid] or candidates
+        if len(candidates) == 1:
+            return candidates[0]
+
+        least_outstanding = min(backend.outstanding for backend in candidates)
+        if model:
+            loaded = [backend for backend in candidates if backend.last_model == model]
+            if loaded and min(backend.outstanding for backend in loaded) <= least_outstanding + self.affinity_slack:
+                candidates = loaded
+                least_outstanding = min(backend.outstanding for backend in candidates)
+        if affinity_key:
+            preferred = max(candidates, key=lambda backend: self._rendezvous_score(affinity_key, backend.url))
+            if preferred.outstanding <= least_outstanding + self.affinity_slack:
+                return preferred
+
+        # 동률이면 돌아가며 선택
+        idle = [backend for backend in candidates if backend.outstanding == least_outstanding]
+        self._next = (self._next + 1) % len(idle)
+        return idle[self._next]
+
+    @asynccontextmanager
+    async def lease(self, affinity_key: Optional[str] = None, model: Optional[str] = None, avoid: Optional[Backend] = None):
+        """요청 하나 동안 노드를 점유 (outstanding 집계)"""
+        backend = self.select(affinity_key, model, avoid)
+        backend.outstanding += 1
+        backend.requests += 1
+        backend.breaker.on_start()
+        if model:
+            backend.last_model = model
+        try:
+            yield backend
+        finally:
+            backend.outstanding -= 1
+            backend.breaker.on_finish()
+
+    def record_success(self, backend: Backend) -> None:
+        if backend.breaker.state != CircuitBreaker.CLOSED:
+            logger.info(f"Backend {backend.url} circuit closed")
+        backend.breaker.record_success()
+
+    def record_failure(self, backend: Backend, error: Exception) -> None:
+        backend.failures += 1
+        if backend.breaker.record_failure():
+            logger.warning(
+                f"Backend {backend.url} circuit opened after {backend.breaker.failures} failures ({error}); "
+                f"retrying in {backend.breaker.reset_timeout:.0f}s"
+            )
+
+    def mark_unhealthy(self, backend: Backend) -> None:
+        if backend.healthy and len(self.backends) > 1:
+            backend.healthy = False
+            logger.warning(f"Backend {backend.url} marked unhealthy")
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_interval)
+            await asyncio.gather(*(self._check(backend) for backend in self.backends))
+
+    async def _check(self, backend: Backend) -> None:
+        session = await self._get_session()
+        try:
+            async with session.get(f"{backend.url}/api/version", timeout=aiohttp.ClientTimeout(total=5)) as response:
+                healthy = response.status == 200
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            healthy = False
+
+        if healthy != backend.healthy:
+            logger.warning(f"Backend {backend.url} is {'healthy' if healthy else 'unhealthy'}")
+        backend.healthy = healthy
+
+    @staticmethod
+    def _rendezvous_score(key: str, url: str) -> int:
+        digest = hashlib.blake2b(f"{key}|{url}".encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "big")
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [backend.stats() for backend in self.backends]
@@ -0,0 +1,139 @@
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from core import metrics
+from core.config import settings
+from core.logging import logging_manager
+
+logger = logging_manager.get_logger(__name__)
+
+HEADROOM = "headroom"
+LATENCY = "latency"
+OVERLOAD = "overload"
+
+
+class ConcurrencyLimiter:
+    """Ollama로 동시에 보내는 요청 수 상한을 지연 시간으로 자동 조정 (gradient 방식, Netflix concurrency-limits 참고)
+
+    - 지연: 응답 하나의 전체 시간을 작업량(생성 토큰 + 프롬프트 토큰 × prompt_cost)으로 나눈
+      값이라 프롬프트/출력 길이가 달라도 비교할 수 있다. prompt_cost는 Ollama가 알려 준
+      prompt_eval / eval 시간 비율로 계속 보정한다
+    - 기준 지연: 최근 window개 샘플의 최소값 (병렬 슬롯이 남아 있을 때의 지연)
+    - gradient = tolerance × 기준 / 최근 지연 (0.5~1). Ollama 안에서 요청이 줄을 서기 시작해
+      지연이 tolerance배를 넘으면 상한을 그 비율만큼 줄이고, 아니면 한 개씩 늘려 본다
+    - 실제 동시 요청이 상한의 절반도 안 되면 늘리지 않음 (부하가 없을 때 상한이 부풀지 않게)
+    - 429/503/타임아웃(과부하)이면 backoff배로 바로 줄임 (AIMD의 multiplicative decrease)
+    """
+
+    def __init__(
+        self,
+        initial_limit: Optional[int] = None,
+        min_limit: Optional[int] = None,
+        max_limit: Optional[int] = None,
+        tolerance: Optional[float] = None,
+        window: Optional[int] = None,
+        smoothing: float = 0.2,
+        backoff: float = 0.9,
+        warmup: int = 5,
+    ):
+        self.min_limit = max(1, min_limit or settings.limiter_min_limit)
+        self.max_limit = max(self.min_limit, max_limit or settings.scheduler_max_in_flight)
+        initial = initial_limit or settings.limiter_initial_limit
+        self.estimated = float(min(self.max_limit, max(self.min_limit, initial)))
+        self.tolerance = tolerance or settings.limiter_tolerance
+        self.smoothing = smoothing
+        self.backoff = backoff
+        self.warmup = warmup
+
+        self.prompt_cost = 0.05
+        self.short_latency: Optional[float] = None
+        self._recent: Deque[float] = deque(maxlen=window or settings.limiter_window)
+        self._last_backoff = 0.0
+        # 최근 30초 처리량 (완료 시각, 작업량)
+        self._completed: Deque[Tuple[float, float]] = deque()
+        self.samples = 0
+        self.changes: Counter = Counter()
+        self.last_reason = "initial"
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(self.estimated))
+
+    @property
+    def baseline_latency(self) -> Optional[float]:
+        return min(self._recent) if self._recent else None
+
+    def observe(self, seconds: float, data: Dict[str, Any], in_flight: int) -> None:
+        """완료된 generate 응답 하나 (seconds = 요청 전송부터 마지막 청크까지, in_flight = 그 시점 동시 요청 수)"""
+        self._calibrate(data)
+        work = (data.get("eval_count") or 0) + (data.get("prompt_eval_count") or 0) * self.prompt_cost
+        if work <= 0 or seconds <= 0:
+            return
+        now = time.monotonic()
+        self._completed.append((now, work))
+        while now - self._completed[0][0] > 30.0:
+            self._completed.popleft()
+
+        latency = seconds / work
+        self.short_latency = latency if self.short_latency is None else 0.5 * self.short_latency + 0.5 * latency
+        self._recent.append(self.short_latency)
+        self.samples += 1
+        if self.samples < self.warmup:
+            return
+
+        gradient = max(0.5, min(1.0, self.tolerance * self.baseline_latency / self.short_latency))
+        target = self.estimated * gradient + 1.0
+        estimated = self.estimated * (1 - self.smoothing) + target * self.smoothing
+        if estimated > self.estimated and in_flight < self.estimated / 2:
+            return
+        self._set(estimated, LATENCY if gradient < 1.0 else HEADROOM)
+
+    def on_overload(self) -> None:
+        """Ollama가 과부하로 거절하거나 응답하지 못함 (같은 순간에 실패한 요청들로 여러 번 줄지 않게 초당 한 번)"""
+        now = time.monotonic()
+        if now - self._last_backoff < 1.0:
+            return
+        self._last_backoff = now
+        self._set(self.estimated * self.backoff, OVERLOAD)
+
+    def _calibrate(self, data: Dict[str, Any]) -> None:
+        """프롬프트 토큰 하나가 생성 토큰 하나에 비해 얼마나 걸리는지 (Ollama 타이밍 필드, 나노초)"""
+        prompt_count = data.get("prompt_eval_count") or 0
+        prompt_duration = data.get("prompt_eval_duration") or 0
+        eval_count = data.get("eval_count") or 0
+        eval_duration = data.get("eval_duration") or 0
+        if prompt_count and prompt_duration and eval_count and eval_duration:
+            ratio = (prompt_duration / prompt_count) / (eval_duration / eval_count)
+            self.prompt_cost = 0.9 * self.prompt_cost + 0.1 * min(1.0, ratio)
+
+    def _set(self, estimated: float, reason: str) -> None:
+        previous = self.limit
+        self.estimated = min(float(self.max_limit), max(float(self.min_limit), estimated))
+        if self.limit != previous:
+            self.changes[reason] += 1
+            self.last_reason = reason
+            metrics.concurrency_limit_changes.inc(reason)
+            logger.info(f"Concurrency limit {previous} -> {self.limit} ({reason})")
+
+    def throughput(self) -> float:
+        """최근 30초 동안 초당 처리한 작업량 (생성 토큰 환산)"""
+        if not self._completed:
+            return 0.0
+        elapsed = max(1.0, time.monotonic() - self._completed[0][0])
+        return sum(work for _, work in self._completed) / elapsed
+
+    def stats(self) -> Dict[str, Any]:
+        baseline = self.baseline_latency
+        return {
+            "limit": self.limit,
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "last_reason": self.last_reason,
+            "changes": dict(self.changes),
+            "samples": self.samples,
+            "latency_ms_per_token": round(self.short_latency * 1000, 3) if self.short_latency else None,
+            "baseline_ms_per_token": round(baseline * 1000, 3) if baseline else None,
+            "prompt_cost": round(self.prompt_cost, 4),
+            "throughput_tokens_per_second": round(self.throughput(), 1),
+        }
@@ -1,77 +1,415 @@
 import asyncio
-import re
-import ollama
+import contextvars
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
+
 import aiohttp
-from concurrent.futures import ThreadPoolExecutor
+
+from core import fastjson, metrics
+from core.config import settings
+from core.logging import logging_manager
+from model.backend_pool import BackendPool
+from model.limiter import ConcurrencyLimiter
+from model.resilience import RETRYABLE_STATUSES, BackendError, BackendUnavailableError, RetryBudget, backoff_delay
+
+logger = logging_manager.get_logger(__name__)
+
+# close_completed_stream()으로 닫는 동안 True: 스트림이 필요한 출력을 다 낸 정상 종료
+_completed_early: contextvars.ContextVar[bool] = contextvars.ContextVar("completed_early", default=False)
+
+
+async def close_completed_stream(chunks: AsyncIterator[Any]) -> None:
+    """필요한 출력을 다 받아 done 전에 스트림을 닫음 (Ollama 생성은 멈추지만 취소로 세지 않음)
+
+    async generator는 호출한 태스크의 context에서 실행되므로, 감싼 스트림을 거쳐 닫혀도
+    generate_stream이 이 표시를 본다.
+    """
+    token = _completed_early.set(True)
+    try:
+        await chunks.aclose()
+    finally:
+        _completed_early.reset(token)
+
+
+def parse_keep_alive(value: Optional[str]) -> Optional[Any]:
+    """Ollama keep_alive 값: 숫자면 초 단위 정수, 아니면 "30m" 같은 기간 문자열 (빈 값이면 None)"""
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
 
 class ModelManager:
-    def __init__(self):
-          # OpenAI 클라이언트 초기화 (Ollama 서버 가리키도록)
-          self.client = ollama.Client()
-          self.model_name = 'qwen3:14b'
-          # 공유 ClientSession 생성
-          self.session = None
-
-    async def get_session(self):
+    """앱 전체에서 하나만 쓰는 Ollama 백엔드 클라이언트
+
+    lifespan에서 start()/close()로 생명주기를 관리하며, 하나의 keep-alive
+    커넥션 풀(aiohttp.TCPConnector)을 모든 요청이 공유한다. 노드가 여러 개면
+    BackendPool이 요청마다 보낼 노드를 고른다.
+    """
+
+    def __init__(
+        self,
+        backend_urls: Optional[List[str]] = None,
+        model_name: Optional[str] = None,
+        pool_size: Optional[int] = None,
+        keepalive_timeout: Optional[float] = None,
+        keep_alive: Optional[str] = None,
+        max_retries: Optional[int] = None,
+        limiter: Optional[ConcurrencyLimiter] = None,
+    ):
+        self.pool = BackendPool(backend_urls or settings.ollama_backends, self.get_session)
+        self.model_name = model_name or settings.default_model
+        self.pool_size = pool_size or settings.backend_pool_size
+        self.keepalive_timeout = keepalive_timeout or settings.backend_keepalive_timeout
+        # 요청마다 보내는 모델 keep_alive (요청이 올 때마다 언로드 타이머가 연장됨)
+        self.keep_alive = parse_keep_alive(keep_alive if keep_alive is not None else settings.model_keep_alive)
+        self.max_retries = max_retries if max_retries is not None else settings.backend_max_retries
+        self.retry_budget = RetryBudget()
+        # 적응형 동시 실행 상한 (있으면 완료된 생성의 지연과 과부하 응답을 알려 줌)
+        self.limiter = limiter
+        # 공유 ClientSession (start()에서 생성)
+        self.session: Optional[aiohttp.ClientSession] = None
+        # 커넥션 재사용 통계 (벤치마크 스크립트에서 확인)
+        self.connections_opened = 0
+        self.connections_reused = 0
+        self.requests_sent = 0
+        self.cold_starts = 0
+        self.cancelled = 0
+        self.retries = 0
+
+    async def start(self) -> None:
+        await self.get_session()
+        await self.pool.start()
+
+    async def close(self) -> None:
+        await self.pool.close()
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+    async def get_session(self) -> aiohttp.ClientSession:
         """공유 세션 반환 (없으면 생성)"""
         if self.session is None or self.session.closed:
+            trace_config = aiohttp.TraceConfig()
+            trace_config.on_connection_create_end.append(self._on_connection_create)
+            trace_config.on_connection_reuseconn.append(self._on_connection_reuse)
+
             self.session = aiohttp.ClientSession(
-                timeout=aiohttp.ClientTimeout(total=120),
-                connector=aiohttp.TCPConnector(limit=100, limit_per_host=20)
+                timeout=aiohttp.ClientTimeout(
+                    total=settings.backend_request_timeout,
+                    connect=settings.backend_connect_timeout,
+                ),
+                connector=aiohttp.TCPConnector(
+                    limit=self.pool_size * len(self.pool.backends),
+                    limit_per_host=self.pool_size,
+                    keepalive_timeout=self.keepalive_timeout,
+                ),
+                trace_configs=[trace_config],
+                # 요청 본문(긴 프롬프트)도 빠른 직렬화기로
+                json_serialize=fastjson.dumps_str,
             )
         return self.session
 
-    async def generate(self, prompt: str, thinking: bool = False , **kwargs) -> ollama.GenerateResponse:
-        import time
-        start_time = time.time()
-        print(f"🔵 ModelManager.generate() 시작: {start_time:.2f}")
-        
-        # aiohttp로 직접 OLLAMA API 호출 (공유 세션 사용)
+    async def _on_connection_create(self, session, context, params) -> None:
+        self.connections_opened += 1
+
+    async def _on_connection_reuse(self, session, context, params) -> None:
+        self.connections_reused += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backends": self.pool.stats(),
+            "pool_size": self.pool_size,
+            "requests_sent": self.requests_sent,
+            "connections_opened": self.connections_opened,
+            "connections_reused": self.connections_reused,
+            "keep_alive": self.keep_alive,
+            "cold_starts": self.cold_starts,
+            "cancelled": self.cancelled,
+            "retries": self.retries,
+            "retry_budget_exhausted": self.retry_budget.exhausted,
+        }
+
+    @asynccontextmanager
+    async def _post(self, path: str, payload: Dict[str, Any], affinity_key: Optional[str] = None, **kwargs):
+        """노드를 골라 POST
+
+        요청이 노드에 닿지 못한 연결 실패와 Ollama가 일을 받지 않았다는 응답(429/502/503/504)만
+        지터를 준 지수 백오프로 최대 max_retries번 재시도한다 (재시도 예산 안에서, 다른 노드가
+        있으면 그 노드로). stream=False 생성은 전체 생성이 끝난 뒤에야 헤더가 오므로, 요청을 보낸
+        뒤의 타임아웃/연결 끊김은 GPU 작업을 이미 했을 수 있어 재시도하지 않는다. 이런 타임아웃은
+        헤더가 바로 오는 스트림에서만 노드 장애로 circuit breaker에 기록한다 (긴 생성일 수 있으므로).
+        """
+        session = await self.get_session()
+        self.retry_budget.record_request()
+        attempt = 0
+        failed = None
+        while True:
+            # 재시도는 모델/affinity가 같은 노드를 가리켜도 방금 실패한 노드를 피함
+            async with self.pool.lease(affinity_key, payload.get("model"), avoid=failed) as backend:
+                try:
+                    response = await session.post(f"{backend.url}{path}", json=payload, **kwargs)
+                except aiohttp.ClientConnectorError as e:
+                    self.pool.record_failure(backend, e)
+                    self.pool.mark_unhealthy(backend)
+                    error: Exception = BackendUnavailableError(f"Could not connect to Ollama at {backend.url}: {e}")
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                    if payload.get("stream"):
+                        self.pool.record_failure(backend, e)
+                    self._record_overload()
+                    raise BackendUnavailableError(f"Ollama at {backend.url} did not respond: {e!r}") from e
+                else:
+                    self.requests_sent += 1
+                    if response.status in RETRYABLE_STATUSES:
+                        error = BackendError(response.status, await self._error_message(response))
+                        response.release()
+                        self.pool.record_failure(backend, error)
+                        if response.status in (429, 503):
+                            self._record_overload()
+                    else:
+                        self.pool.record_success(backend)
+                        try:
+                            yield response
+                        except aiohttp.ClientConnectionError as e:
+                            self.pool.record_failure(backend, e)
+                            self.pool.mark_unhealthy(backend)
+                            raise
+                        finally:
+                            response.release()
+                        return
+
+            failed = backend
+            if attempt >= self.max_retries:
+                raise error
+            if not self.retry_budget.try_spend():
+                logger.warning(f"Not retrying {path}, retry budget exhausted: {error}")
+                raise error
+            delay = backoff_delay(attempt)
+            attempt += 1
+            self.retries += 1
+            metrics.backend_retries.inc(backend.url, type(error).__name__)
+            logger.warning(f"Retrying {path} ({attempt}/{self.max_retries}) in {delay:.2f}s after: {error}")
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    async def _error_message(response: aiohttp.ClientResponse) -> str:
+        """Ollama 오류 본문 {"error": "..."}의 메시지"""
+        try:
+            body = await response.read()
+            return str(fastjson.loads(body).get("error", ""))
+        except Exception:
+            return ""
+
+    async def list_models(self) -> List[Dict[str, Any]]:
+        """OLLAMA에 설치된 모델 목록 (/api/tags, details.family 등 메타데이터 포함)"""
+        session = await self.get_session()
+        backend = self.pool.select()
+        async with session.get(f"{backend.url}/api/tags") as response:
+            if response.status != 200:
+                raise BackendError(response.status, await self._error_message(response))
+            data = await response.json()
+        return data.get("models", [])
+
+    async def get_context_length(self, model: str) -> Optional[int]:
+        """모델의 학습 컨텍스트 길이 (/api/show의 <arch>.context_length, 모르면 None)"""
+        session = await self.get_session()
+        backend = self.pool.select()
+        try:
+            async with session.post(f"{backend.url}/api/show", json={"model": model}) as response:
+                if response.status != 200:
+                    return None
+                data = await response.json()
+        except aiohttp.ClientError:
+            return None
+        for key, value in (data.get("model_info") or {}).items():
+            if key.endswith(".context_length"):
+                return int(value)
+        return None
+
+    async def generate(
+        self,
+        prompt: str,
+        raw: bool = False,
+        affinity_key: Optional[str] = None,
+        model: Optional[str] = None,
+        format: Optional[Union[str, Dict[str, Any]]] = None,
+        **kwargs,
+    ) -> Dict[str, Any]:
+        # aiohttp로 직접 OLLAMA API 호출 (공유 세션 사용). model이 없으면 DEFAULT_MODEL
         payload = {
-            "model": self.model_name,
+            "model": model or self.model_name,
             "prompt": prompt,
             "stream": False,
             "options": kwargs
         }
-        
+        if raw:
+            # 이미 템플릿이 적용된 프롬프트 (OLLAMA 템플릿을 한 번 더 씌우지 않음)
+            payload["raw"] = True
+        if format is not None:
+            # "json" 또는 JSON schema: OLLAMA가 문법으로 제한해 그 형식으로만 생성
+            payload["format"] = format
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+
+        started = time.monotonic()
+        try:
+            async with self._post("/api/generate", payload, affinity_key) as response:
+                if response.status != 200:
+                    raise BackendError(response.status, await self._error_message(response))
+                # 본문을 한 번만 파싱해 dict 그대로 사용 (스트림의 마지막 청크와 같은 형태)
+                data = fastjson.loads(await response.read())
+                self._record_latency(started, data)
+        except asyncio.CancelledError:
+            self._record_cancel(payload["model"])
+            raise
+        self._record_generation(data)
+        return data
+
+    async def generate_stream(
+        self,
+        prompt: str,
+        raw: bool = False,
+        affinity_key: Optional[str] = None,
+        model: Optional[str] = None,
+        format: Optional[Union[str, Dict[str, Any]]] = None,
+        **kwargs,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """OLLAMA NDJSON 스트림을 청크(dict) 단위로 그대로 전달
+
+        소비자가 다음 청크를 요청할 때만 소켓에서 읽으므로, 느린 클라이언트는
+        aiohttp 수신 버퍼를 거쳐 OLLAMA 쪽까지 backpressure를 건다.
+        마지막 청크(done=True)에 prompt_eval_count / eval_count 등이 들어 있다.
+        """
+        payload = {
+            "model": model or self.model_name,
+            "prompt": prompt,
+            "stream": True,
+            "options": kwargs
+        }
+        if raw:
+            payload["raw"] = True
+        if format is not None:
+            payload["format"] = format
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+
+        finished = False
+        started = time.monotonic()
+        try:
+            # 스트림은 전체 길이 제한 대신 청크 간 간격으로 타임아웃
+            async with self._post(
+                "/api/generate",
+                payload,
+                affinity_key,
+                timeout=aiohttp.ClientTimeout(
+                    total=None,
+                    connect=settings.backend_connect_timeout,
+                    sock_read=settings.backend_request_timeout,
+                ),
+            ) as response:
+                if response.status != 200:
+                    raise BackendError(response.status, await self._error_message(response))
+
+                # readline()은 64KB 제한이 있어 긴 context 배열이 든 마지막 줄에서 실패하므로 직접 분리
+                buffer = bytearray()
+                async for data in response.content.iter_any():
+                    buffer += data
+                    start = 0
+                    while True:
+                        end = buffer.find(b"\n", start)
+                        if end < 0:
+                            break
+                        line = bytes(buffer[start:end]).strip()
+                        start = end + 1
+                        if line:
+                            chunk = fastjson.loads(line)
+                            if chunk.get("done"):
+                                finished = True
+                                self._record_generation(chunk)
+                                self._record_latency(started, chunk)
+                            yield chunk
+                    del buffer[:start]
+
+                if buffer.strip():
+                    yield fastjson.loads(bytes(buffer))
+        except (asyncio.CancelledError, GeneratorExit):
+            # 소비자가 끝까지 읽지 않고 닫음 (클라이언트 끊김 / deadline). 출력이 끝나 일찍 닫은 건 제외
+            if not finished and not _completed_early.get():
+                self._record_cancel(payload["model"])
+            raise
+
+    async def embed(
+        self,
+        texts: List[str],
+        model: Optional[str] = None,
+        dimensions: Optional[int] = None,
+        affinity_key: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """/api/embed 한 번으로 여러 입력의 임베딩 (embeddings는 입력 순서, prompt_eval_count는 전체 합)"""
+        payload: Dict[str, Any] = {"model": model or self.model_name, "input": texts}
+        if dimensions:
+            payload["dimensions"] = dimensions
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+
+        try:
+            async with self._post("/api/embed", payload, affinity_key) as response:
+                if response.status != 200:
+                    raise BackendError(response.status, await self._error_message(response))
+                return fastjson.loads(await response.read())
+        except asyncio.CancelledError:
+            self._record_cancel(payload["model"])
+            raise
+
+    def _record_generation(self, data: Dict[str, Any]) -> None:
+        """타이밍 지표 기록 + 요청이 모델 로드를 기다렸으면(콜드 스타트) 경고"""
+        model = data.get("model", self.model_name)
+        metrics.record_generation(model, data)
+        load_seconds = (data.get("load_duration") or 0) / 1e9
+        if load_seconds >= settings.cold_start_warn_seconds:
+            self.cold_starts += 1
+            metrics.cold_starts.inc(model)
+            logger.warning(
+                f"Model {model} was loaded on demand ({load_seconds:.1f}s load_duration); "
+                "raise MODEL_KEEP_ALIVE or add a WARM_SCHEDULE entry before this workload"
+            )
+
+    def _record_latency(self, started: float, data: Dict[str, Any]) -> None:
+        """요청 전송부터 완료까지 걸린 시간을 limiter에 (노드를 점유한 채로 불러 in_flight에 자기 자신 포함)"""
+        if self.limiter is not None:
+            in_flight = sum(backend.outstanding for backend in self.pool.backends)
+            self.limiter.observe(time.monotonic() - started, data, in_flight)
+
+    def _record_overload(self) -> None:
+        if self.limiter is not None:
+            self.limiter.on_overload()
+
+    def _record_cancel(self, model: str) -> None:
+        """생성 도중 취소된 요청: 읽지 않은 응답의 연결은 풀로 돌아가지 않고 닫히므로 Ollama가 생성을 멈추고 슬롯을 비운다"""
+        self.cancelled += 1
+        metrics.upstream_cancelled.inc(model)
+
+    async def preload(self, backend_url: str, model: str) -> Dict[str, Any]:
+        """빈 프롬프트로 generate를 보내 모델을 메모리에 올림 (이미 올라와 있으면 keep_alive만 연장)
+
+        라우팅을 거치지 않고 지정한 노드로 보낸다 (노드마다 따로 예열해야 하므로).
+        """
         session = await self.get_session()
-        print(f"🟡 OLLAMA 요청 전송: {time.time():.2f}")
-        async with session.post(
-            "http://localhost:11434/api/generate",
-            json=payload
-        ) as response:
-            if response.status == 200:
-                data = await response.json()
-                
-                # ollama.GenerateResponse와 호환되는 객체 생성
-                result = ollama.GenerateResponse(
-                    model=data.get('model', self.model_name),
-                    created_at=data.get('created_at', ''),
-                    response=data.get('response', ''),
-                    done=data.get('done', True),
-                    context=data.get('context', []),
-                    total_duration=data.get('total_duration', 0),
-                    load_duration=data.get('load_duration', 0),
-                    prompt_eval_count=data.get('prompt_eval_count', 0),
-                    prompt_eval_duration=data.get('prompt_eval_duration', 0),
-                    eval_count=data.get('eval_count', 0),
-                    eval_duration=data.get('eval_duration', 0)
-                )
-                
-                # thinking 태그 제거 임시 비활성화 (테스트용)
-                if not thinking:
-                    result.response = self._clean_thinking_tags(result.response)
-                
-                end_time = time.time()
-                print(f"🟢 ModelManager.generate() 완료: {end_time:.2f} (소요시간: {end_time - start_time:.2f}초)")
-                return result
-            else:
-                raise Exception(f"OLLAMA API error: {response.status}")
-
-
-    def _clean_thinking_tags(self, response: str) -> str:
-      """빈 thinking 태그 제거"""
-      # <think>\n\n</think>\n\n 패턴 제거
-      cleaned = re.sub(r'<think>\s*</think>\s*', '', response, flags=re.DOTALL)
-      # 추가 공백 정리
-      return cleaned.strip()
\ No newline at end of file
+        payload: Dict[str, Any] = {"model": model, "prompt": "", "stream": False}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        async with session.post(f"{backend_url}/api/generate", json=payload) as response:
+            if response.status != 200:
+                raise BackendError(response.status, await self._error_message(response))
+            return fastjson.loads(await response.read())
+
+    async def running_models(self, backend_url: str) -> List[Dict[str, Any]]:
+        """노드에 현재 올라와 있는 모델 (/api/ps, expires_at / size_vram 포함)"""
+        session = await self.get_session()
+        async with session.get(f"{backend_url}/api/ps") as response:
+            response.raise_for_status()
+            data = fastjson.loads(await response.read())
+        return data.get("models") or []
@@ -0,0 +1,121 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from core.config import settings
+from core.logging import logging_manager
+from model.model_manager import ModelManager
+from templates.service import set_model_families
+
+logger = logging_manager.get_logger(__name__)
+
+
+class ModelNotFoundError(Exception):
+    """요청한 model이 Ollama에 설치되어 있지 않음 (HTTP 404)"""
+
+
+class ModelRegistry:
+    """Ollama에 설치된 모델 목록(/api/tags)을 TTL 동안 캐시
+
+    - /v1/models 응답과 요청 model 검증에 같은 목록을 쓴다
+    - 목록에 없는 이름이 오면 (방금 pull한 모델일 수 있으므로) 한 번 새로 읽은 뒤 판단
+    - 목록을 읽을 수 없으면 검증하지 않고 통과 (Ollama가 판단)
+    - 읽을 때마다 모델 계열(details.family)을 템플릿 선택에 반영
+    """
+
+    def __init__(self, model_manager: ModelManager, ttl: Optional[float] = None, validate: Optional[bool] = None):
+        self.model_manager = model_manager
+        self.ttl = ttl if ttl is not None else settings.model_list_ttl
+        self.validate = validate if validate is not None else settings.model_validation
+        self._models: Optional[List[Dict[str, Any]]] = None
+        self._names: Dict[str, str] = {}
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+        self.refreshes = 0
+        self.rejected = 0
+
+    async def refresh(self) -> List[Dict[str, Any]]:
+        fetched_at = self._fetched_at
+        async with self._lock:
+            # 기다리는 동안 다른 요청이 이미 새로 읽었으면 그 결과 사용
+            if self._models is not None and self._fetched_at != fetched_at:
+                return self._models
+            try:
+                models = await self.model_manager.list_models()
+            except Exception as e:
+                logger.warning(f"Could not list models: {e}")
+                # 실패해도 같은 요청마다 다시 시도하지 않도록 시각은 갱신
+                self._fetched_at = time.monotonic()
+                return self._models or []
+            self._models = models
+            self._names = {}
+            for model in models:
+                name = model["name"]
+                self._names[name] = name
+                # "llama3"는 "llama3:latest"와 같은 모델
+                if name.endswith(":latest"):
+                    self._names.setdefault(name[: -len(":latest")], name)
+            self._fetched_at = time.monotonic()
+            self.refreshes += 1
+            set_model_families({model["name"]: (model.get("details") or {}).get("family", "") for model in models})
+            return models
+
+    async def models(self) -> List[Dict[str, Any]]:
+        if self._models is None or time.monotonic() - self._fetched_at >= self.ttl:
+            return await self.refresh()
+        return self._models
+
+    async def resolve(self, name: str) -> str:
+        """요청의 model 이름을 설치된 모델 이름으로 (없으면 ModelNotFoundError)"""
+        if not self.validate:
+            return name
+        await self.models()
+        if name in self._names:
+            return self._names[name]
+        # 캐시가 오래됐을 수 있으므로 한 번 새로 읽음 (최소 1초 간격)
+        if time.monotonic() - self._fetched_at >= 1.0:
+            await self.refresh()
+        if name in self._names:
+            return self._names[name]
+        if self._models is None:
+            # 목록을 한 번도 읽지 못함: Ollama가 판단하게 그대로 보냄
+            return name
+        self.rejected += 1
+        raise ModelNotFoundError(f"The model '{name}' does not exist; see GET /v1/models")
+
+    async def openai_models(self) -> Dict[str, Any]:
+        """OpenAI /v1/models 형식"""
+        data = []
+        for model in await self.models():
+            data.append({
+                "id": model["name"],
+                "object": "model",
+                "created": _parse_created(model.get("modified_at")),
+                "owned_by": "ollama",
+            })
+        return {"object": "list", "data": data}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "models": sorted(model["name"] for model in self._models or []),
+            "ttl": self.ttl,
+            "validate": self.validate,
+            "refreshes": self.refreshes,
+            "rejected": self.rejected,
+        }
+
+
+def _parse_created(modified_at: Optional[str]) -> int:
+    """Ollama modified_at(RFC 3339, 나노초) → Unix 초 (모르면 0)"""
+    if not modified_at:
+        return 0
+    value = modified_at.replace("Z", "+00:00")
+    if "." in value:
+        # 소수점 이하는 버림 (fromisoformat은 나노초 자릿수를 못 읽음)
+        head, _, rest = value.partition(".")
+        value = head + rest.lstrip("0123456789")
+    try:
+        return int(datetime.fromisoformat(value).timestamp())
+    except ValueError:
+        return 0
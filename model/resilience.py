@@ -0,0 +1,138 @@
+import random
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from core.config import settings
+
+# 잠깐 기다리면 성공할 수 있는 Ollama 응답 (큐 가득 참, 러너 재시작 중 등).
+# 500은 대개 요청/모델 자체의 실패(생성까지 마친 뒤일 수도 있음)라 재시도하지 않고 노드 장애로도 세지 않음
+RETRYABLE_STATUSES = frozenset({429, 502, 503, 504})
+
+
+class BackendError(Exception):
+    """Ollama가 200이 아닌 상태로 응답 (4xx는 그대로, 나머지는 502로 전달)"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"OLLAMA API error: {status} {message}".rstrip())
+        self.status = status
+
+    @property
+    def http_status(self) -> int:
+        return self.status if 400 <= self.status < 500 else 502
+
+
+class BackendUnavailableError(Exception):
+    """쓸 수 있는 노드가 없음: 모든 회로가 열렸거나 재시도해도 연결 실패 (HTTP 503)"""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """노드 하나의 circuit breaker
+
+    - closed: 정상. 연속 실패가 failure_threshold에 닿으면 open
+    - open: reset_timeout 동안 요청을 보내지 않고 바로 실패 (Ollama 재시작 중 요청이 쌓이지 않게)
+    - half_open: reset_timeout이 지나면 요청 하나만 시험으로 보내 성공하면 closed, 실패하면 다시 open
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: Optional[int] = None, reset_timeout: Optional[float] = None):
+        self.failure_threshold = failure_threshold if failure_threshold is not None else settings.circuit_failure_threshold
+        self.reset_timeout = reset_timeout if reset_timeout is not None else settings.circuit_reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self._probing = False
+
+    def allow(self) -> bool:
+        """지금 이 노드로 요청을 보내도 되는지"""
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self._probing = False
+        if self.state == self.HALF_OPEN:
+            return not self._probing
+        return True
+
+    def on_start(self) -> None:
+        if self.state == self.HALF_OPEN:
+            self._probing = True
+
+    def on_finish(self) -> None:
+        # 시험 요청이 성공/실패를 남기지 못하고 끝난 경우(취소 등) 다음 요청이 다시 시험하게 함
+        self._probing = False
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self) -> bool:
+        """실패 기록. 이번 실패로 회로가 열렸으면 True"""
+        self.failures += 1
+        if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self.opens += 1
+            return True
+        return False
+
+    def retry_after(self) -> float:
+        """회로가 half_open으로 넘어갈 때까지 남은 초"""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"state": self.state, "failures": self.failures, "opens": self.opens}
+
+
+class RetryBudget:
+    """최근 window초 동안의 재시도 수를 요청 수의 ratio배(최소 min_retries)로 제한
+
+    Ollama가 과부하로 실패할 때 모든 요청이 재시도하면 부하가 몇 배로 늘어나므로,
+    재시도는 일부 요청에만 허용한다.
+    """
+
+    def __init__(self, ratio: Optional[float] = None, min_retries: int = 3, window: float = 10.0):
+        self.ratio = ratio if ratio is not None else settings.backend_retry_budget
+        self.min_retries = min_retries
+        self.window = window
+        self._requests: Deque[float] = deque()
+        self._retries: Deque[float] = deque()
+        self.exhausted = 0
+
+    def _trim(self, now: float) -> None:
+        for events in (self._requests, self._retries):
+            while events and now - events[0] > self.window:
+                events.popleft()
+
+    def record_request(self) -> None:
+        # 재시도가 없어도 기록이 window 밖으로 쌓이지 않게 여기서도 정리
+        now = time.monotonic()
+        self._trim(now)
+        self._requests.append(now)
+
+    def try_spend(self) -> bool:
+        """재시도 하나를 허용하면 기록하고 True"""
+        now = time.monotonic()
+        self._trim(now)
+        if len(self._retries) >= max(self.min_retries, self.ratio * len(self._requests)):
+            self.exhausted += 1
+            return False
+        self._retries.append(now)
+        return True
+
+
+def backoff_delay(attempt: int, base: Optional[float] = None, cap: Optional[float] = None) -> float:
+    """지수 백오프 + full jitter: [0, min(cap, base * 2^attempt)) 사이 무작위 (동시에 실패한 요청들이 한꺼번에 재시도하지 않게)"""
+    base = base if base is not None else settings.backend_retry_base_delay
+    cap = cap if cap is not None else settings.backend_retry_max_delay
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
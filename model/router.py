@@ -0,0 +1,26 @@
+from typing import Any, Dict
+
+from fastapi import APIRouter, HTTPException, Request
+
+from model.registry import ModelRegistry
+
+router = APIRouter(
+    prefix="/v1",
+    tags=["models"],
+)
+
+
+@router.get("/models")
+async def list_models(request: Request) -> Dict[str, Any]:
+    """Ollama에 설치된 모델 목록 (OpenAI 형식, MODEL_LIST_TTL 동안 캐시)"""
+    modelRegistry: ModelRegistry = request.app.state.modelRegistry
+    return await modelRegistry.openai_models()
+
+
+@router.get("/models/{model:path}")
+async def get_model(request: Request, model: str) -> Dict[str, Any]:
+    modelRegistry: ModelRegistry = request.app.state.modelRegistry
+    for entry in (await modelRegistry.openai_models())["data"]:
+        if entry["id"] == model or entry["id"] == f"{model}:latest":
+            return entry
+    raise HTTPException(status_code=404, detail=f"The model '{model}' does not exist")
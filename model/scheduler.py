@@ -0,0 +1,326 @@
+import asyncio
+import math
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+
+from core import metrics
+from core.config import settings
+from model.limiter import ConcurrencyLimiter
+from model.shared_slots import SharedSlots
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+PRIORITIES = (INTERACTIVE, BULK)
+
+
+class SchedulerRejectedError(Exception):
+    """대기열이 가득 찼거나 대기 시간이 초과되어 요청을 받지 않음 (HTTP 429)"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("future", "model", "queued_at")
+
+    def __init__(self, future: asyncio.Future, model: Optional[str]):
+        self.future = future
+        self.model = model
+        self.queued_at = time.monotonic()
+
+
+class AdmissionScheduler:
+    """Ollama 앞단의 입장 제어 스케줄러
+
+    - 동시 실행 수(in-flight)를 백엔드 병렬 슬롯(OLLAMA_NUM_PARALLEL)에 맞춰 제한
+    - interactive / bulk 두 개의 대기열, 슬롯이 비면 interactive 먼저 배정
+    - bulk는 reserved_interactive 만큼의 슬롯을 남겨두고만 실행되므로
+      배치 작업이 돌고 있어도 interactive 요청은 바로 들어갈 수 있다
+    - 대기열이 가득 차면 기다리지 않고 즉시 거절 (Retry-After 포함)
+    - 모델별 동시 실행 상한, 그리고 동시에 실행하는 모델 종류를 max_loaded_models
+      (OLLAMA_MAX_LOADED_MODELS)로 제한. 슬롯이 비면 이미 실행 중인 모델의 요청을 먼저
+      배정해 같은 모델 요청끼리 몰아서 처리하고(모델 교체 최소화), 다른 모델 요청이
+      model_switch_wait 이상 기다리면 현재 모델의 새 요청을 멈춰 교체한다
+    - limiter가 있으면 동시 실행 수는 max_in_flight와 limiter가 지연 시간으로 정한 상한 중 작은 값
+    - shared_slots가 있으면 여러 워커 프로세스가 실행 슬롯을 공유하므로, 이 워커의 상한 안이라도
+      공유 슬롯을 얻어야 시작한다 (워커를 늘려도 Ollama로 가는 동시 요청 수는 그대로)
+    """
+
+    def __init__(
+        self,
+        max_in_flight: Optional[int] = None,
+        max_queue_interactive: Optional[int] = None,
+        max_queue_bulk: Optional[int] = None,
+        reserved_interactive: Optional[int] = None,
+        queue_timeout: Optional[float] = None,
+        max_loaded_models: Optional[int] = None,
+        model_switch_wait: Optional[float] = None,
+        model_max_in_flight: Optional[Dict[str, int]] = None,
+        limiter: Optional[ConcurrencyLimiter] = None,
+        shared_slots: Optional[SharedSlots] = None,
+    ):
+        self.max_in_flight = max_in_flight or settings.scheduler_max_in_flight
+        self.max_queue = {
+            INTERACTIVE: max_queue_interactive if max_queue_interactive is not None else settings.scheduler_max_queue_interactive,
+            BULK: max_queue_bulk if max_queue_bulk is not None else settings.scheduler_max_queue_bulk,
+        }
+        reserved = reserved_interactive if reserved_interactive is not None else settings.scheduler_reserved_interactive
+        # 슬롯이 1개뿐이면 bulk가 영영 못 도는 일이 없도록 최소 1개는 bulk에 허용
+        self.reserved_interactive = min(reserved, self.max_in_flight - 1)
+        self.queue_timeout = queue_timeout if queue_timeout is not None else settings.scheduler_queue_timeout
+        self.max_loaded_models = max_loaded_models if max_loaded_models is not None else settings.scheduler_max_loaded_models
+        self.model_switch_wait = model_switch_wait if model_switch_wait is not None else settings.scheduler_model_switch_wait
+        self.model_max_in_flight = model_max_in_flight if model_max_in_flight is not None else settings.model_max_in_flight
+        self.limiter = limiter
+        self.shared_slots = shared_slots
+        # 우선순위별로 잡고 있는 공유 슬롯 번호 (반납할 때 같은 우선순위의 것을 놓음)
+        self._shared_held: Dict[str, List[int]] = {priority: [] for priority in PRIORITIES}
+        self._shared_poll: Optional[asyncio.TimerHandle] = None
+        # 이번 배정에서 공유 슬롯을 못 얻은 가장 오래된 요청의 대기 시작 시각 (다른 워커에 공개)
+        self._shared_blocked: Dict[str, float] = {}
+
+        self.in_flight = 0
+        self.in_flight_by_priority = {priority: 0 for priority in PRIORITIES}
+        self.in_flight_by_model: Counter = Counter()
+        self._queues: Dict[str, Deque[_Waiter]] = {priority: deque() for priority in PRIORITIES}
+        # 오래 기다린 다른 모델로 교체 중이면 그 모델 (그 모델 요청만 시작)
+        self._switching_to: Optional[str] = None
+        self.model_switches = 0
+        self._last_model: Optional[str] = None
+
+        # Retry-After 추정용 평균 처리 시간 (EMA, 초)
+        self._avg_service_time = 5.0
+        self.rejected = {priority: 0 for priority in PRIORITIES}
+
+    def _capacity(self) -> int:
+        """지금 허용하는 동시 실행 수"""
+        if self.limiter is None:
+            return self.max_in_flight
+        return min(self.max_in_flight, self.limiter.limit)
+
+    def _can_start(self, priority: str, model: Optional[str] = None) -> bool:
+        capacity = self._capacity()
+        if priority == BULK:
+            if self.in_flight >= capacity - min(self.reserved_interactive, capacity - 1):
+                return False
+        elif self.in_flight >= capacity:
+            return False
+        return model is None or self._model_fits(model)
+
+    def _claim_shared(self, priority: str, queued_at: float) -> bool:
+        """공유 슬롯 하나를 얻음
+
+        다른 워커가 모두 쓰고 있거나 다른 워커에 더 먼저 온 요청이 기다리고 있으면 False.
+        그 경우 잠시 후 _dispatch를 다시 시도한다.
+        """
+        if self.shared_slots is None:
+            return True
+        capacity = self._capacity()
+        # 다른 워커와 비교하므로 프로세스마다 기준이 다른 monotonic 대신 벽시계 시각으로
+        since = time.time() - (time.monotonic() - queued_at)
+        slot = None
+        if not self.shared_slots.waiting_before(since, bulk=priority == BULK):
+            if priority == BULK:
+                slot = self.shared_slots.try_acquire(capacity - min(self.reserved_interactive, capacity - 1))
+            else:
+                slot = self.shared_slots.try_acquire(capacity, from_top=True)
+        if slot is None:
+            self._shared_blocked[priority] = min(since, self._shared_blocked.get(priority, since))
+            if self._shared_poll is None:
+                self._shared_poll = asyncio.get_running_loop().call_later(settings.shared_slot_poll_interval, self._poll_shared)
+            return False
+        self._shared_held[priority].append(slot)
+        return True
+
+    def _poll_shared(self) -> None:
+        self._shared_poll = None
+        self._dispatch()
+
+    def _model_fits(self, model: str) -> bool:
+        if self._switching_to is not None and model != self._switching_to:
+            return False
+        limit = self.model_max_in_flight.get(model)
+        if limit is not None and self.in_flight_by_model[model] >= limit:
+            return False
+        return not self._needs_swap(model)
+
+    def _needs_swap(self, model: str) -> bool:
+        """이 모델을 시작하려면 실행 중인 다른 모델이 먼저 끝나야 하는지"""
+        if self.max_loaded_models <= 0 or self.in_flight_by_model[model] > 0:
+            return False
+        return len(self.in_flight_by_model) >= self.max_loaded_models
+
+    def _retry_after(self, priority: str) -> int:
+        waiting = sum(len(queue) for queue in self._queues.values()) if priority == BULK else len(self._queues[INTERACTIVE])
+        return max(1, math.ceil((waiting + 1) * self._avg_service_time / self._capacity()))
+
+    async def acquire(self, priority: str = INTERACTIVE, model: Optional[str] = None) -> None:
+        """실행 슬롯 하나를 얻을 때까지 대기 (대기열이 꽉 차면 즉시 SchedulerRejectedError)"""
+        if priority not in PRIORITIES:
+            priority = INTERACTIVE
+
+        queue = self._queues[priority]
+        if not queue and self._can_start(priority, model) and self._claim_shared(priority, time.monotonic()):
+            self._start(priority, model)
+            metrics.queue_wait.observe(0.0, priority)
+            return
+
+        if len(queue) >= self.max_queue[priority]:
+            self.rejected[priority] += 1
+            raise SchedulerRejectedError(f"Server is busy ({priority} queue is full)", self._retry_after(priority))
+
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), model)
+        queue.append(waiter)
+        # 앞에 다른 모델 요청만 있으면 같은 모델인 이 요청은 바로 시작할 수 있음
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=self.queue_timeout or None)
+            metrics.queue_wait.observe(time.monotonic() - waiter.queued_at, priority)
+        except asyncio.TimeoutError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # 타임아웃 직전에 슬롯을 받은 경우 그대로 진행
+                metrics.queue_wait.observe(time.monotonic() - waiter.queued_at, priority)
+                return
+            self._abandon(waiter, queue)
+            self.rejected[priority] += 1
+            raise SchedulerRejectedError(f"Server is busy (waited {self.queue_timeout:.0f}s in {priority} queue)", self._retry_after(priority))
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # 슬롯을 받은 직후 취소된 경우 반납
+                self.release(priority, model=model)
+            else:
+                self._abandon(waiter, queue)
+            raise
+
+    def _abandon(self, waiter: _Waiter, queue: Deque[_Waiter]) -> None:
+        waiter.future.cancel()
+        try:
+            queue.remove(waiter)
+        except ValueError:
+            pass
+        if self._switching_to is not None and not self._is_waiting(self._switching_to):
+            self._switching_to = None
+            self._dispatch()
+
+    def _is_waiting(self, model: str) -> bool:
+        return any(waiter.model == model for queue in self._queues.values() for waiter in queue)
+
+    def _start(self, priority: str, model: Optional[str] = None) -> None:
+        self.in_flight += 1
+        self.in_flight_by_priority[priority] += 1
+        if model is not None:
+            self.in_flight_by_model[model] += 1
+            if model != self._last_model:
+                if self._last_model is not None:
+                    self.model_switches += 1
+                self._last_model = model
+            if model == self._switching_to:
+                self._switching_to = None
+
+    def release(self, priority: str = INTERACTIVE, service_time: Optional[float] = None, model: Optional[str] = None) -> None:
+        if priority not in PRIORITIES:
+            priority = INTERACTIVE
+        self.in_flight -= 1
+        self.in_flight_by_priority[priority] -= 1
+        if self.shared_slots is not None:
+            self.shared_slots.release(self._shared_held[priority].pop())
+        if model is not None:
+            self.in_flight_by_model[model] -= 1
+            if self.in_flight_by_model[model] <= 0:
+                del self.in_flight_by_model[model]
+        if service_time is not None:
+            self._avg_service_time = 0.9 * self._avg_service_time + 0.1 * service_time
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """빈 슬롯을 interactive → bulk 순서로 배정
+
+        대기열 맨 앞 요청이 모델 교체 때문에 시작하지 못하면, 그 뒤의 실행 중인 모델 요청을
+        먼저 시작한다(같은 모델끼리 묶어 처리). 맨 앞 요청이 model_switch_wait 넘게 기다렸으면
+        그 모델로 교체를 예약해, 실행 중인 요청이 끝나는 대로 그 모델이 시작되게 한다.
+        """
+        now = time.monotonic()
+        self._shared_blocked = {}
+        for priority in PRIORITIES:
+            if self._shared_blocked:
+                # 공유 슬롯이 없으면 bulk도 못 얻음 (bulk 범위가 더 좁고, 기다리는 interactive가 우선)
+                break
+            queue = self._queues[priority]
+            while queue and queue[0].future.done():
+                queue.popleft()
+            if not queue:
+                continue
+
+            head = queue[0]
+            if (
+                self._switching_to is None
+                and head.model is not None
+                and self._needs_swap(head.model)
+                and now - head.queued_at >= self.model_switch_wait
+                and (priority == INTERACTIVE or not self._queues[INTERACTIVE])
+            ):
+                self._switching_to = head.model
+
+            for waiter in list(queue):
+                if not self._can_start(priority):
+                    break
+                if waiter.future.done():
+                    queue.remove(waiter)
+                    continue
+                if waiter.model is not None and not self._model_fits(waiter.model):
+                    continue
+                if not self._claim_shared(priority, waiter.queued_at):
+                    # 다른 워커 차례 (대기열 뒤의 요청은 더 늦게 왔으므로 이어서 시도하지 않음)
+                    break
+                queue.remove(waiter)
+                self._start(priority, waiter.model)
+                waiter.future.set_result(priority)
+
+        if self.shared_slots is not None:
+            self.shared_slots.publish_waiting(self._shared_blocked.get(INTERACTIVE, 0.0), self._shared_blocked.get(BULK, 0.0))
+
+    @asynccontextmanager
+    async def slot(self, priority: str = INTERACTIVE, model: Optional[str] = None):
+        """async with scheduler.slot(priority, model): ... 블록 동안 슬롯 하나를 점유"""
+        await self.acquire(priority, model)
+        start_time = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(priority, time.monotonic() - start_time, model)
+
+    async def hold(self, priority: str, chunks: AsyncIterator[Any], model: Optional[str] = None) -> AsyncIterator[Any]:
+        """첫 청크를 요청받을 때 슬롯을 얻어 스트림이 끝날 때까지 유지하고 끝나면 반납
+
+        얻기와 반납이 이 제너레이터 안에서 짝을 이루므로, 첫 청크 전에 deadline/취소로
+        스트림이 버려져도 슬롯이 남지 않는다 (시작되지 않은 제너레이터는 슬롯을 잡지 않음).
+        """
+        try:
+            await self.acquire(priority, model)
+        except BaseException:
+            await chunks.aclose()
+            raise
+        start_time = time.monotonic()
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await chunks.aclose()
+            self.release(priority, time.monotonic() - start_time, model)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "limit": self._capacity(),
+            "in_flight": self.in_flight,
+            "in_flight_by_priority": dict(self.in_flight_by_priority),
+            "queued": {priority: len(queue) for priority, queue in self._queues.items()},
+            "rejected": dict(self.rejected),
+            "in_flight_by_model": dict(self.in_flight_by_model),
+            "max_loaded_models": self.max_loaded_models,
+            "model_switches": self.model_switches,
+            "shared": self.shared_slots.stats() if self.shared_slots else None,
+        }
@@ -0,0 +1,179 @@
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from core.config import settings
+from core.logging import logging_manager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+logger = logging_manager.get_logger(__name__)
+
+# 락 파일에서 워커 번호용 바이트가 시작하는 위치 (슬롯 바이트와 겹치지 않게 멀리 둠)
+WORKER_LOCK_BASE = 1 << 20
+MAX_WORKERS = 64
+# 워커마다 (interactive, bulk) 가장 오래 기다린 요청의 대기 시작 시각 (time.time(), 0 = 없음)
+_CELL = struct.Struct("<dd")
+
+
+class SharedSlots:
+    """uvicorn --workers N의 워커 프로세스들이 함께 쓰는 Ollama 실행 슬롯
+
+    락 파일 하나의 바이트 i가 슬롯 i이고, 슬롯을 얻는다는 것은 그 바이트에 배타 락을 거는 것이다.
+    락은 OS가 관리하므로 외부 서비스가 필요 없고, 워커가 죽으면 그 워커의 슬롯도 바로 풀린다.
+    - 요청은 [0, limit) 범위의 슬롯만 쓴다 (limit = 그 워커 스케줄러의 현재 동시 실행 상한)
+    - bulk는 아래쪽 슬롯만 쓰고 interactive는 위쪽부터 찾으므로 예약 슬롯이 워커 전체에서 유지된다
+    - 슬롯을 못 얻은 워커는 가장 오래 기다린 요청의 시각을 공유 메모리(mmap)에 적어 둔다.
+      다른 워커는 그보다 늦게 온 요청으로 슬롯을 가져가지 않으므로, 슬롯을 놓은 워커가 자기
+      대기열에만 계속 슬롯을 넘기지 않고 워커 전체에서 먼저 온 순서대로 배정된다
+    """
+
+    def __init__(self, directory: Path, size: Optional[int] = None):
+        directory.mkdir(parents=True, exist_ok=True)
+        self.path = directory / "slots.lock"
+        self.size = size or settings.scheduler_max_in_flight
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        # 이 프로세스가 잡고 있는 슬롯 (POSIX 락은 같은 프로세스 안에서는 충돌하지 않으므로 직접 제외)
+        self._held: set = set()
+        self.acquired = 0
+        self.contended = 0
+        self.deferred = 0
+
+        # 워커 번호: 빈 번호 바이트에 락을 걸어 종료할 때까지 유지 (락이 풀린 번호 = 죽은 워커)
+        self.worker_id: Optional[int] = next((i for i in range(MAX_WORKERS) if self._lock(WORKER_LOCK_BASE + i)), None)
+        if self.worker_id is None:
+            logger.warning(f"More than {MAX_WORKERS} workers share {directory}; this worker does not publish its queue")
+
+        waiting_path = directory / "waiting.bin"
+        with open(waiting_path, "a+b") as file:
+            if os.path.getsize(waiting_path) < _CELL.size * MAX_WORKERS:
+                file.truncate(_CELL.size * MAX_WORKERS)
+        self._waiting_file = open(waiting_path, "r+b")
+        self._waiting = mmap.mmap(self._waiting_file.fileno(), _CELL.size * MAX_WORKERS)
+        self.publish_waiting(0.0, 0.0)
+
+    def try_acquire(self, limit: int, from_top: bool = False) -> Optional[int]:
+        """[0, limit) 중 빈 슬롯 하나를 잡아 번호를 반환 (모두 차 있으면 None, 기다리지 않음)"""
+        slots = range(min(limit, self.size))
+        for slot in reversed(slots) if from_top else slots:
+            if slot not in self._held and self._lock(slot):
+                self._held.add(slot)
+                self.acquired += 1
+                return slot
+        self.contended += 1
+        return None
+
+    def release(self, slot: int) -> None:
+        if slot in self._held:
+            self._held.discard(slot)
+            self._unlock(slot)
+
+    def publish_waiting(self, interactive_since: float, bulk_since: float) -> None:
+        """이 워커에서 공유 슬롯을 기다리는 가장 오래된 요청의 대기 시작 시각 (없으면 0)"""
+        if self.worker_id is not None:
+            _CELL.pack_into(self._waiting, self.worker_id * _CELL.size, interactive_since, bulk_since)
+
+    def waiting_before(self, since: float, bulk: bool = False) -> bool:
+        """다른 워커에 since보다 먼저 온(bulk면 interactive 전부 포함) 요청이 슬롯을 기다리는지"""
+        for worker in range(MAX_WORKERS):
+            if worker == self.worker_id:
+                continue
+            interactive, bulk_since = _CELL.unpack_from(self._waiting, worker * _CELL.size)
+            if bulk:
+                ahead = interactive > 0 or 0 < bulk_since < since
+            else:
+                ahead = 0 < interactive < since
+            if ahead and self._alive(worker):
+                self.deferred += 1
+                return True
+        return False
+
+    def _alive(self, worker: int) -> bool:
+        # 번호 락을 걸 수 있으면 그 워커는 죽었으므로 남은 기록을 지움
+        if not self._lock(WORKER_LOCK_BASE + worker):
+            return True
+        _CELL.pack_into(self._waiting, worker * _CELL.size, 0.0, 0.0)
+        self._unlock(WORKER_LOCK_BASE + worker)
+        return False
+
+    def in_flight(self) -> int:
+        """모든 워커가 잡고 있는 슬롯 수 (남의 슬롯은 잠깐 락을 걸어 보고 실패하면 사용 중으로 셈)"""
+        busy = len(self._held)
+        for slot in range(self.size):
+            if slot in self._held:
+                continue
+            if self._lock(slot):
+                self._unlock(slot)
+            else:
+                busy += 1
+        return busy
+
+    def workers(self) -> int:
+        """살아 있는 워커 수 (번호 락이 걸린 번호)"""
+        count = 0
+        for worker in range(MAX_WORKERS):
+            if worker == self.worker_id:
+                count += 1
+            elif self._lock(WORKER_LOCK_BASE + worker):
+                self._unlock(WORKER_LOCK_BASE + worker)
+            else:
+                count += 1
+        return count
+
+    def _lock(self, offset: int) -> bool:
+        try:
+            if fcntl is not None:
+                fcntl.lockf(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, offset, os.SEEK_SET)
+            else:
+                os.lseek(self._fd, offset, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            return False
+        return True
+
+    def _unlock(self, offset: int) -> None:
+        if fcntl is not None:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, offset, os.SEEK_SET)
+        else:
+            os.lseek(self._fd, offset, os.SEEK_SET)
+            msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+
+    def close(self) -> None:
+        self.publish_waiting(0.0, 0.0)
+        self._waiting.close()
+        self._waiting_file.close()
+        # 닫으면 이 프로세스의 락(슬롯, 워커 번호)이 모두 풀림
+        os.close(self._fd)
+        self._held.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": str(self.path),
+            "slots": self.size,
+            "workers": self.workers(),
+            "worker_id": self.worker_id,
+            "in_flight": self.in_flight(),
+            "held_by_this_worker": len(self._held),
+            "acquired": self.acquired,
+            "contended": self.contended,
+            "deferred": self.deferred,
+        }
+
+
+def create_shared_slots() -> Optional[SharedSlots]:
+    """SHARED_STATE_DIR이 설정됐을 때만 만듦 (워커 하나면 필요 없음)"""
+    if not settings.shared_state_dir:
+        return None
+    if fcntl is None and msvcrt is None:
+        logger.warning("SHARED_STATE_DIR is set but file locking is not available on this platform; concurrency limits are per worker")
+        return None
+    return SharedSlots(Path(settings.shared_state_dir))
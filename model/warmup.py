@@ -0,0 +1,127 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from core.config import settings
+from core.logging import logging_manager
+from model.model_manager import ModelManager
+
+logger = logging_manager.get_logger(__name__)
+
+
+class ModelWarmer:
+    """모델을 미리 메모리에 올려 두어 요청이 모델 로드(load_duration)를 기다리지 않게 함
+
+    - 시작할 때 설정한 모델을 모든 노드에 올림
+    - warm_interval마다, 그리고 warm_schedule의 각 시각 warm_lead초 전에 다시 핑을 보내
+      keep_alive 타이머를 연장 (주기적인 배치 직전에 모델이 내려가 있지 않게)
+    - 핑마다 /api/ps로 노드별로 올라와 있는 모델을 확인해 stats에 남김
+    """
+
+    def __init__(
+        self,
+        model_manager: ModelManager,
+        models: Optional[List[str]] = None,
+        on_startup: Optional[bool] = None,
+        interval: Optional[float] = None,
+        schedule: Optional[List[str]] = None,
+        lead: Optional[float] = None,
+    ):
+        self.model_manager = model_manager
+        self.models = models if models is not None else settings.warm_models
+        self.on_startup = on_startup if on_startup is not None else settings.warm_on_startup
+        self.interval = interval if interval is not None else settings.warm_interval
+        self.schedule = [self._parse_time(entry) for entry in (schedule if schedule is not None else settings.warm_schedule)]
+        self.lead = lead if lead is not None else settings.warm_lead
+        self._task: Optional[asyncio.Task] = None
+
+        self.runs = 0
+        self.failures = 0
+        self.last_run: Optional[float] = None
+        self.loaded: Dict[str, List[str]] = {}
+
+    @staticmethod
+    def _parse_time(entry: str):
+        try:
+            return datetime.strptime(entry, "%H:%M").time()
+        except ValueError:
+            raise ValueError(f"WARM_SCHEDULE entry must be HH:MM, got {entry!r}") from None
+
+    async def start(self) -> None:
+        if self.models and (self.on_startup or self.interval > 0 or self.schedule):
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        if self.on_startup:
+            await self.warm("startup")
+        while True:
+            delay = self.next_delay(datetime.now())
+            if delay is None:
+                return
+            await asyncio.sleep(delay)
+            await self.warm("scheduled")
+
+    def next_delay(self, now: datetime) -> Optional[float]:
+        """다음 예열까지 남은 초 (예약된 것이 없으면 None)"""
+        delays = []
+        if self.interval > 0:
+            delays.append(self.interval)
+        for at in self.schedule:
+            target = datetime.combine(now.date(), at) - timedelta(seconds=self.lead)
+            # 여유를 두어 방금 실행한 예열 시각이 다시 잡히지 않게 함
+            while target <= now + timedelta(seconds=1):
+                target += timedelta(days=1)
+            delays.append((target - now).total_seconds())
+        return min(delays) if delays else None
+
+    async def warm(self, reason: str = "manual") -> Dict[str, Dict[str, float]]:
+        """건강한 모든 노드에 모델을 올리고 {노드: {모델: load 초}} 반환"""
+        backends = [backend for backend in self.model_manager.pool.backends if backend.healthy]
+        results = await asyncio.gather(*(self._warm_backend(backend.url, reason) for backend in backends))
+        self.runs += 1
+        self.last_run = time.time()
+        return {backend.url: result for backend, result in zip(backends, results)}
+
+    async def _warm_backend(self, url: str, reason: str) -> Dict[str, float]:
+        loaded = await self._check_loaded(url)
+        load_seconds = {}
+        for model in self.models:
+            try:
+                data = await self.model_manager.preload(url, model)
+            except Exception as e:
+                self.failures += 1
+                logger.warning(f"Could not warm {model} on {url}: {e}")
+                continue
+            load_seconds[model] = (data.get("load_duration") or 0) / 1e9
+            if model not in loaded:
+                logger.info(f"Loaded {model} on {url} ({reason}, {load_seconds[model]:.1f}s)")
+        await self._check_loaded(url)
+        return load_seconds
+
+    async def _check_loaded(self, url: str) -> List[str]:
+        try:
+            models = await self.model_manager.running_models(url)
+        except Exception as e:
+            logger.warning(f"Could not list running models on {url}: {e}")
+            return self.loaded.get(url, [])
+        self.loaded[url] = [model.get("name") or model.get("model") for model in models]
+        return self.loaded[url]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "models": self.models,
+            "keep_alive": self.model_manager.keep_alive,
+            "interval": self.interval,
+            "schedule": [at.strftime("%H:%M") for at in self.schedule],
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_run": self.last_run,
+            "loaded": self.loaded,
+        }
@@ -29,6 +29,7 @@ class PerformanceTest:
         self.base_url = base_url
         self.results = []
         self.warmup_result = None
+        self.backend_stats = None
         
     async def send_request(self, session: aiohttp.ClientSession, prompt: str, request_id: int):
         """단일 요청 전송 및 성능 측정"""
@@ -80,6 +81,15 @@ class PerformanceTest:
                 'error': str(e)
             }
 
+    async def fetch_backend_stats(self, session: aiohttp.ClientSession):
+        """서버의 백엔드 커넥션 풀 통계 조회 (GET /)"""
+        try:
+            async with session.get(self.base_url) as response:
+                data = await response.json()
+                return data.get('backend')
+        except Exception:
+            return None
+
     async def warmup_request(self, session: aiohttp.ClientSession):
         """KV 캐시 워밍업을 위한 단일 요청"""
         print("🔥 Warming up KV cache with single request...")
@@ -126,6 +136,7 @@ class PerformanceTest:
             
             # 3. 병렬 테스트 시작 (워밍업 제외)
             print("🚀 Starting parallel performance test...")
+            stats_before = await self.fetch_backend_stats(session)
             start_time = time.time()
             
             tasks = [
@@ -142,8 +153,15 @@ class PerformanceTest:
                 
                 if completed % 10 == 0:
                     print(f"Completed: {completed}/{num_requests}")
-        
-        total_time = time.time() - start_time
+
+            total_time = time.time() - start_time
+            stats_after = await self.fetch_backend_stats(session)
+
+        if stats_before and stats_after:
+            self.backend_stats = {
+                key: stats_after[key] - stats_before[key]
+                for key in ('requests_sent', 'connections_opened', 'connections_reused')
+            }
         
         # 결과 분석 및 출력
         self.analyze_results(total_time)
@@ -174,6 +192,12 @@ class PerformanceTest:
         print(f"Success rate: {len(successful)/len(self.results)*100:.1f}%")
         print(f"Total test time: {total_time:.2f} seconds")
         print(f"Requests per second: {len(self.results)/total_time:.2f}")
+
+        if self.backend_stats:
+            print(f"\nBackend Connection Pool (server -> Ollama):")
+            print(f"  Upstream requests: {self.backend_stats['requests_sent']}")
+            print(f"  Connections opened: {self.backend_stats['connections_opened']}")
+            print(f"  Connections reused: {self.backend_stats['connections_reused']}")
         
         if successful:
             durations = [r['duration'] for r in successful]
@@ -210,6 +234,7 @@ class PerformanceTest:
             'failed': len(failed),
             'total_time': total_time,
             'requests_per_second': len(self.results)/total_time,
+            'backend_stats': self.backend_stats,
             'results': self.results
         }
         
@@ -0,0 +1,36 @@
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field
+
+from chat.models import Usage
+
+#   요청 (POST /v1/summarize)
+#   {"model": "qwen3:14b", "document": "...긴 기사 본문...", "instruction": "3문장으로 요약"}
+#
+#   응답
+#   {"id": "summary-...", "object": "summary", "model": "qwen3:14b", "summary": "...",
+#    "chunks": 6, "rounds": 2, "usage": {...모든 map/reduce 호출 합계...}}
+
+
+class SummarizeRequest(BaseModel):
+    model: str
+    document: str
+    instruction: Optional[str] = None  # 최종 요약 지시 (없으면 기본 요약)
+    chunk_tokens: Optional[int] = Field(default=None, gt=0)  # 조각 하나의 최대 토큰 수 (없으면 서버 설정)
+    overlap_tokens: Optional[int] = Field(default=None, ge=0)  # 이웃 조각과 겹치는 토큰 수 (chunk_tokens 미만)
+    max_concurrency: Optional[int] = Field(default=None, gt=0)  # 동시에 요약할 조각 수
+    num_predict: Optional[int] = 300  # 조각 요약 / 최종 요약 각각의 최대 생성 토큰
+    temperature: Optional[float] = 0.0
+    thinking: Optional[bool] = False
+    priority: Optional[Literal["interactive", "bulk"]] = "interactive"
+
+
+class SummarizeResponse(BaseModel):
+    id: str
+    object: str = "summary"
+    created: int
+    model: str
+    summary: str
+    chunks: int  # map 단계에서 나눈 조각 수
+    rounds: int  # reduce 단계 수 (부분 요약이 길면 여러 번 합침)
+    usage: Usage
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, HTTPException, Request
+
+from core.cancellation import ClientDisconnectedError, cancel_on_disconnect
+from model.registry import ModelNotFoundError, ModelRegistry
+from summarize.models import SummarizeRequest, SummarizeResponse
+from summarize.service import DocumentSummarizer, SummarizeValidationError
+
+router = APIRouter(
+    prefix="/v1",
+    tags=["summarize"],
+)
+
+
+@router.post("/summarize")
+async def summarize(request: Request, summarizeRequest: SummarizeRequest) -> SummarizeResponse:
+    """긴 문서를 조각으로 나눠 동시에 요약한 뒤 하나로 합침"""
+    modelRegistry: ModelRegistry = request.app.state.modelRegistry
+    try:
+        summarizeRequest.model = await modelRegistry.resolve(summarizeRequest.model)
+    except ModelNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    summarizer = DocumentSummarizer(
+        model_manager=request.app.state.modelManager,
+        scheduler=request.app.state.scheduler,
+        response_cache=request.app.state.responseCache,
+        coalescer=request.app.state.coalescer,
+        context_budget=request.app.state.contextBudget,
+    )
+    try:
+        # 클라이언트가 끊으면 남은 조각 요약을 모두 취소
+        return await cancel_on_disconnect(request, summarizer.summarize(summarizeRequest))
+    except SummarizeValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ClientDisconnectedError as e:
+        raise HTTPException(status_code=499, detail=str(e))
@@ -0,0 +1,240 @@
+import asyncio
+import re
+import time
+import uuid
+from typing import Any, Awaitable, Dict, List, Optional, TypeVar
+
+from cache.response_cache import ResponseCache
+from chat.budget import ContextBudget, TokenCounter
+from chat.coalescer import RequestCoalescer
+from chat.models import ChatCompletionRequest, Message, Usage
+from chat.service import process_chat_completion
+from core.config import settings
+from model.model_manager import ModelManager
+from model.scheduler import AdmissionScheduler
+from summarize.models import SummarizeRequest, SummarizeResponse
+
+MAP_PROMPT = (
+    "You are summarizing one part of a longer document. Write a concise summary of this part "
+    "that keeps every key fact, name, number and date. Do not add information that is not in the text. "
+    "Respond in the same language as the text."
+)
+REDUCE_PROMPT = (
+    "Below are summaries of consecutive parts of one document. Merge them into a single coherent summary "
+    "without repeating facts. Respond in the same language as the summaries."
+)
+
+T = TypeVar("T")
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?。？！])\s+")
+
+
+class SummarizeValidationError(Exception):
+    """문서가 비었거나 조각 수 제한을 넘음 (HTTP 400)"""
+
+
+async def gather_or_cancel(*awaitables: Awaitable[T]) -> List[T]:
+    """asyncio.gather처럼 결과를 순서대로 반환하되, 하나가 실패하거나 호출자가 취소되면 나머지를 취소
+
+    gather는 첫 예외를 올린 뒤에도 나머지 요청을 계속 실행하므로, 이미 오류를 받은 요청의
+    조각들이 GPU를 계속 쓰게 된다 (Python 3.10이라 TaskGroup 대신).
+    """
+    tasks = [asyncio.ensure_future(awaitable) for awaitable in awaitables]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        failed = next((task for task in tasks if task in done and not task.cancelled() and task.exception() is not None), None)
+        if failed is not None:
+            raise failed.exception()
+        return [task.result() for task in tasks]
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def split_document(
+    document: str,
+    counter: TokenCounter,
+    chunk_tokens: int,
+    overlap_tokens: int = 0,
+    model: Optional[str] = None,
+) -> List[str]:
+    """문단 → 문장 → 글자 순으로 경계를 골라 chunk_tokens 이하 조각으로 나눔
+
+    다음 조각은 이전 조각 끝의 문단/문장을 overlap_tokens 만큼 다시 포함해,
+    경계에 걸친 내용이 양쪽 요약에서 모두 문맥을 갖게 한다.
+    """
+    segments = []
+    for paragraph in _PARAGRAPH_BREAK.split(document.strip()):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if counter.count(paragraph, model) <= chunk_tokens:
+            segments.append(paragraph)
+            continue
+        for sentence in _SENTENCE_BREAK.split(paragraph):
+            segments.extend(_split_long_text(sentence, counter, chunk_tokens, model))
+
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    costs = [counter.count(segment, model) for segment in segments]
+    for segment, cost in zip(segments, costs):
+        if current and current_tokens + cost > chunk_tokens:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = _overlap_tail(current, counter, overlap_tokens, chunk_tokens - cost, model)
+        current.append(segment)
+        current_tokens += cost
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def _split_long_text(text: str, counter: TokenCounter, chunk_tokens: int, model: Optional[str]) -> List[str]:
+    """문장 하나가 조각보다 길면 글자 수 비율로 자름"""
+    tokens = counter.count(text, model)
+    if tokens <= chunk_tokens:
+        return [text]
+    chars = max(1, int(len(text) * chunk_tokens / tokens * 0.95))
+    return [text[start:start + chars] for start in range(0, len(text), chars)]
+
+
+def _overlap_tail(segments: List[str], counter: TokenCounter, overlap_tokens: int, room: int, model: Optional[str]):
+    """이전 조각 끝에서 overlap_tokens(그리고 다음 세그먼트가 들어갈 자리) 안에 드는 세그먼트들"""
+    tail: List[str] = []
+    tokens = 0
+    limit = min(overlap_tokens, room)
+    for segment in reversed(segments):
+        cost = counter.count(segment, model)
+        if tokens + cost > limit:
+            # 문단이 통째로 안 들어가면 끝부분 문장만
+            sentences = []
+            for sentence in reversed(_SENTENCE_BREAK.split(segment)):
+                cost = counter.count(sentence, model)
+                if tokens + cost > limit:
+                    break
+                sentences.insert(0, sentence)
+                tokens += cost
+            if sentences:
+                tail.insert(0, " ".join(sentences))
+            break
+        tail.insert(0, segment)
+        tokens += cost
+    return tail, tokens
+
+
+class DocumentSummarizer:
+    """긴 문서 map-reduce 요약
+
+    조각 요약(map)을 동시에 실행해 백엔드 병렬 슬롯을 모두 쓰고, 부분 요약을 합치는
+    reduce 단계는 합친 길이가 조각 크기를 넘으면 여러 단계로 나눠 실행한다.
+    모든 호출은 일반 요청과 같은 process_chat_completion 경로(스케줄러, 캐시, coalescing)를 탄다.
+    """
+
+    def __init__(
+        self,
+        model_manager: ModelManager,
+        scheduler: Optional[AdmissionScheduler] = None,
+        response_cache: Optional[ResponseCache] = None,
+        coalescer: Optional[RequestCoalescer] = None,
+        context_budget: Optional[ContextBudget] = None,
+    ):
+        self.model_manager = model_manager
+        self.scheduler = scheduler
+        self.response_cache = response_cache
+        self.coalescer = coalescer
+        self.context_budget = context_budget
+        self.counter = context_budget.counter if context_budget else TokenCounter()
+
+    async def summarize(self, request: SummarizeRequest) -> SummarizeResponse:
+        chunk_tokens = request.chunk_tokens or settings.summarize_chunk_tokens
+        if request.overlap_tokens is not None and request.overlap_tokens >= chunk_tokens:
+            raise SummarizeValidationError(f"overlap_tokens ({request.overlap_tokens}) must be less than chunk_tokens ({chunk_tokens})")
+        overlap_tokens = min(request.overlap_tokens if request.overlap_tokens is not None else settings.summarize_overlap_tokens, chunk_tokens // 2)
+        max_concurrency = min(request.max_concurrency or settings.summarize_max_concurrency, settings.summarize_max_concurrency)
+
+        chunks = split_document(request.document, self.counter, chunk_tokens, overlap_tokens, request.model)
+        if not chunks:
+            raise SummarizeValidationError("document is empty")
+        if len(chunks) > settings.summarize_max_chunks:
+            raise SummarizeValidationError(f"document splits into {len(chunks)} chunks (max {settings.summarize_max_chunks}); raise chunk_tokens")
+
+        usage = {"prompt_tokens": 0, "completion_tokens": 0}
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def complete(system_prompt: str, content: str) -> str:
+            async with semaphore:
+                response = await process_chat_completion(
+                    model_manager=self.model_manager,
+                    chat_completion_request=ChatCompletionRequest(
+                        model=request.model,
+                        messages=[Message(role="system", content=system_prompt), Message(role="user", content=content)],
+                        num_predict=request.num_predict,
+                        temperature=request.temperature,
+                        thinking=request.thinking,
+                        priority=request.priority,
+                    ),
+                    scheduler=self.scheduler,
+                    response_cache=self.response_cache,
+                    coalescer=self.coalescer,
+                    context_budget=self.context_budget,
+                )
+            usage["prompt_tokens"] += response["usage"]["prompt_tokens"]
+            usage["completion_tokens"] += response["usage"]["completion_tokens"]
+            return response["choices"][0]["message"]["content"].strip()
+
+        # 조각이 하나면 바로 최종 요약
+        if len(chunks) == 1:
+            summary = await complete(self._final_prompt(MAP_PROMPT, request.instruction), chunks[0])
+            return self._response(request, summary, 1, 0, usage)
+
+        # map: 모든 조각을 동시에 요약
+        summaries = await gather_or_cancel(*(complete(MAP_PROMPT, chunk) for chunk in chunks))
+
+        # reduce: 합친 부분 요약이 조각 크기를 넘으면 묶음 단위로 먼저 합침
+        rounds = 0
+        while True:
+            rounds += 1
+            groups = self._group(summaries, chunk_tokens, request.model)
+            if len(groups) == 1:
+                summary = await complete(self._final_prompt(REDUCE_PROMPT, request.instruction), self._join(groups[0]))
+                return self._response(request, summary, len(chunks), rounds, usage)
+            summaries = await gather_or_cancel(*(complete(REDUCE_PROMPT, self._join(group)) for group in groups))
+
+    def _group(self, summaries: List[str], chunk_tokens: int, model: str) -> List[List[str]]:
+        groups: List[List[str]] = [[]]
+        tokens = 0
+        for summary in summaries:
+            cost = self.counter.count(summary, model)
+            # 묶음마다 최소 2개는 넣어야 단계가 진행됨
+            if len(groups[-1]) >= 2 and tokens + cost > chunk_tokens:
+                groups.append([])
+                tokens = 0
+            groups[-1].append(summary)
+            tokens += cost
+        return groups
+
+    @staticmethod
+    def _join(summaries: List[str]) -> str:
+        return "\n\n".join(f"[Part {index}]\n{summary}" for index, summary in enumerate(summaries, start=1))
+
+    @staticmethod
+    def _final_prompt(system_prompt: str, instruction: Optional[str]) -> str:
+        return f"{system_prompt}\n\n{instruction}" if instruction else system_prompt
+
+    @staticmethod
+    def _response(request: SummarizeRequest, summary: str, chunks: int, rounds: int, usage: Dict[str, Any]) -> SummarizeResponse:
+        return SummarizeResponse(
+            id=f"summary-{uuid.uuid4().hex[:10]}",
+            created=int(time.time()),
+            model=request.model,
+            summary=summary,
+            chunks=chunks,
+            rounds=rounds,
+            usage=Usage(
+                prompt_tokens=usage["prompt_tokens"],
+                completion_tokens=usage["completion_tokens"],
+                total_tokens=usage["prompt_tokens"] + usage["completion_tokens"],
+            ),
+        )
@@ -1,10 +1,68 @@
 from abc import ABC, abstractmethod
-from typing import List
+from collections import OrderedDict
+from typing import List, Tuple
 
 from chat.models import Message
 
 
 class ChatTemplate(ABC):
+    """모델 계열별 채팅 프롬프트 템플릿
+
+    렌더링한 프롬프트는 raw 모드로 보내므로 OLLAMA 쪽 템플릿이 한 번 더 씌워지지 않는다.
+    인스턴스는 계열마다 하나만 만들어 재사용하고(templates.service), 여러 요청이
+    공유하는 system 프롬프트 블록은 렌더링 결과를 기억해 둔다.
+    """
+
+    # 생성된 assistant 응답 뒤에 붙는 턴 종료 토큰 (OLLAMA는 stop 토큰을 응답에 포함하지 않음)
+    end_of_turn: str = ""
+    # 마지막에 붙여 모델이 assistant 턴을 시작하게 하는 문자열
+    generation_prompt: str = ""
+    # 추론 블록 태그 (추론 모델 템플릿만). thinking=False면 빈 블록을 미리 채워 추론을 건너뛰게 한다
+    think_open: str = ""
+    think_close: str = ""
+    max_cached_prefixes: int = 256
+
+    def __init__(self) -> None:
+        self._prefix_cache: "OrderedDict[str, str]" = OrderedDict()
+
     @abstractmethod
-    def convert_messages(self, messages: List[Message]) -> str:
-        pass
+    def format_message(self, role: str, content: str) -> str:
+        """메시지 하나를 턴 구분 토큰까지 포함해 렌더링"""
+
+    def convert_messages(self, messages: List[Message], thinking: bool = True) -> str:
+        # 조각을 모아 한 번에 join (반복 += 로 인한 O(n^2) 복사 방지)
+        parts = [self.render_message(role, content) for role, content in self.arrange_messages(messages)]
+        parts.append(self.generation_prompt)
+        if not thinking:
+            parts.append(self.empty_reasoning)
+        return "".join(parts)
+
+    def arrange_messages(self, messages: List[Message]) -> List[Tuple[str, str]]:
+        """렌더링할 (역할, 내용) 목록. system 역할이 없는 모델은 override해 system을 user 메시지에 합침"""
+        return [(message.role, message.content) for message in messages]
+
+    @property
+    def supports_thinking(self) -> bool:
+        return bool(self.think_open)
+
+    @property
+    def empty_reasoning(self) -> str:
+        """raw 모드에서는 OLLAMA의 think 옵션이 적용되지 않으므로, 빈 추론 블록을 직접 붙여 바로 답하게 함"""
+        return self.format_reasoning("") if self.think_open else ""
+
+    def format_reasoning(self, reasoning: str) -> str:
+        """추론 텍스트를 모델이 생성하는 것과 같은 블록 형태로"""
+        return f"{self.think_open}{reasoning}{self.think_close}"
+
+    def render_message(self, role: str, content: str) -> str:
+        if role != "system":
+            return self.format_message(role, content)
+
+        rendered = self._prefix_cache.get(content)
+        if rendered is None:
+            rendered = self._prefix_cache[content] = self.format_message(role, content)
+            if len(self._prefix_cache) > self.max_cached_prefixes:
+                self._prefix_cache.popitem(last=False)
+        else:
+            self._prefix_cache.move_to_end(content)
+        return rendered
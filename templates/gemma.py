@@ -0,0 +1,27 @@
+from typing import List, Tuple
+
+from chat.models import Message
+from templates.base import ChatTemplate
+
+
+class GemmaTemplate(ChatTemplate):
+    # gemma2 / gemma3: system 역할이 없어 첫 user 메시지 앞에 붙이고, assistant는 model로 표기
+    end_of_turn = "<end_of_turn>\n"
+    generation_prompt = "<start_of_turn>model\n"
+
+    def format_message(self, role: str, content: str) -> str:
+        role = "model" if role == "assistant" else role
+        return f"<start_of_turn>{role}\n{content}<end_of_turn>\n"
+
+    def arrange_messages(self, messages: List[Message]) -> List[Tuple[str, str]]:
+        system = "\n\n".join(message.content for message in messages if message.role == "system")
+        arranged = []
+        for message in messages:
+            if message.role == "system":
+                continue
+            content = message.content
+            if system and message.role == "user":
+                content = f"{system}\n\n{content}"
+                system = ""
+            arranged.append((message.role, content))
+        return arranged
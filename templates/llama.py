@@ -0,0 +1,10 @@
+from templates.base import ChatTemplate
+
+
+class Llama3Template(ChatTemplate):
+    # llama3 / llama3.1 / llama3.2 (<|begin_of_text|>는 토크나이저가 붙임)
+    end_of_turn = "<|eot_id|>"
+    generation_prompt = "<|start_header_id|>assistant<|end_header_id|>\n\n"
+
+    def format_message(self, role: str, content: str) -> str:
+        return f"<|start_header_id|>{role}<|end_header_id|>\n\n{content}<|eot_id|>"
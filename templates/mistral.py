@@ -0,0 +1,27 @@
+from typing import List, Tuple
+
+from chat.models import Message
+from templates.base import ChatTemplate
+
+
+class MistralTemplate(ChatTemplate):
+    # mistral / mixtral ([INST] 형식, system은 마지막 user 메시지 앞에 붙음 - OLLAMA 기본 템플릿과 동일)
+    end_of_turn = "</s>"
+
+    def format_message(self, role: str, content: str) -> str:
+        if role == "assistant":
+            return f" {content}</s>"
+        return f"[INST] {content}[/INST]"
+
+    def arrange_messages(self, messages: List[Message]) -> List[Tuple[str, str]]:
+        system = "\n\n".join(message.content for message in messages if message.role == "system")
+        turns = [message for message in messages if message.role != "system"]
+        last_user = max((index for index, message in enumerate(turns) if message.role == "user"), default=-1)
+
+        arranged = []
+        for index, message in enumerate(turns):
+            content = message.content
+            if system and index == last_user:
+                content = f"{system}\n\n{content}"
+            arranged.append((message.role, content))
+        return arranged
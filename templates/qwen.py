@@ -1,14 +1,16 @@
-from typing import List
-
-from chat.models import Message
 from templates.base import ChatTemplate
 
 
 class QwenTemplate(ChatTemplate):
-    # qwen3 14b
-    def convert_messages(self, messages: List[Message]) -> str:
-        prompt = ""
-        for message in messages:
-            prompt += f"<|im_start|>{message.role}\n{message.content}<|im_end|>\n"
-        prompt += "<|im_start|>assistant\n"
-        return prompt
+    # qwen2.5 등 ChatML
+    end_of_turn = "<|im_end|>\n"
+    generation_prompt = "<|im_start|>assistant\n"
+
+    def format_message(self, role: str, content: str) -> str:
+        return f"<|im_start|>{role}\n{content}<|im_end|>\n"
+
+
+class Qwen3Template(QwenTemplate):
+    # qwen3 14b: ChatML + <think> 추론 블록 (enable_thinking=False면 빈 블록을 미리 채움)
+    think_open = "<think>\n"
+    think_close = "\n</think>\n\n"
@@ -1,9 +1,60 @@
+from typing import Dict, Optional, Type
+
 from templates.base import ChatTemplate
-from templates.qwen import QwenTemplate
+from templates.gemma import GemmaTemplate
+from templates.llama import Llama3Template
+from templates.mistral import MistralTemplate
+from templates.qwen import Qwen3Template, QwenTemplate
+
+# 계열 이름 -> 템플릿 클래스 (OLLAMA /api/tags의 details.family 값 기준)
+TEMPLATE_REGISTRY: Dict[str, Type[ChatTemplate]] = {
+    "qwen": QwenTemplate,
+    "qwen2": QwenTemplate,
+    "qwen3": Qwen3Template,
+    "chatml": QwenTemplate,
+    "llama": Llama3Template,
+    "gemma": GemmaTemplate,
+    "gemma2": GemmaTemplate,
+    "gemma3": GemmaTemplate,
+    "mistral": MistralTemplate,
+    "mixtral": MistralTemplate,
+}
+DEFAULT_FAMILY = "qwen"
+
+# 모델 이름에 들어 있으면 메타데이터보다 우선하는 계열 (mistral도 details.family가 llama로 나옴)
+_NAME_PREFIXES = ("qwen3", "qwen", "llama", "gemma", "mistral", "mixtral")
+
+# 모델 이름 -> 계열 (시작할 때 OLLAMA에서 읽어 옴)
+_model_families: Dict[str, str] = {}
+# 계열 -> 템플릿 인스턴스 (요청마다 새로 만들지 않음)
+_instances: Dict[str, ChatTemplate] = {}
+
+
+def register_template(family: str, template_class: Type[ChatTemplate]) -> None:
+    TEMPLATE_REGISTRY[family.lower()] = template_class
+    _instances.pop(family.lower(), None)
+
+
+def set_model_families(model_families: Dict[str, str]) -> None:
+    """OLLAMA 모델 메타데이터(모델 이름 -> details.family) 등록"""
+    _model_families.update({name.lower(): family.lower() for name, family in model_families.items() if family})
+
+
+def resolve_family(model_name: str) -> str:
+    name = model_name.lower()
+    for prefix in _NAME_PREFIXES:
+        if name.startswith(prefix):
+            return prefix
+
+    family = _model_families.get(name) or _model_families.get(f"{name}:latest")
+    if family in TEMPLATE_REGISTRY:
+        return family
+    return DEFAULT_FAMILY
 
 
-def get_chat_template(model_name: str) -> ChatTemplate:
-    if str.startswith(model_name.lower(), "qwen"):
-        return QwenTemplate()
-    else:
-        return QwenTemplate()
+def get_chat_template(model_name: str, family: Optional[str] = None) -> ChatTemplate:
+    family = (family or resolve_family(model_name)).lower()
+    template = _instances.get(family)
+    if template is None:
+        template = _instances[family] = TEMPLATE_REGISTRY.get(family, TEMPLATE_REGISTRY[DEFAULT_FAMILY])()
+    return template
@@ -147,16 +147,16 @@ class ConcurrencyTester:
         total_start_time = time.time()
         all_results = []
 
-        # 8개씩 배치로 처리
+        # 8개씩 배치로 처리 (배치 간 keep-alive 커넥션 재사용을 위해 세션 하나 공유)
         batch_size = 8
-        for batch_start in range(0, min(24, len(self.articles)), batch_size):
-            batch_articles = self.articles[batch_start : batch_start + batch_size]
+        async with aiohttp.ClientSession() as session:
+            for batch_start in range(0, min(24, len(self.articles)), batch_size):
+                batch_articles = self.articles[batch_start : batch_start + batch_size]
 
-            print(
-                f"배치 {batch_start // batch_size + 1} 처리 중... ({len(batch_articles)}개 요청)"
-            )
+                print(
+                    f"배치 {batch_start // batch_size + 1} 처리 중... ({len(batch_articles)}개 요청)"
+                )
 
-            async with aiohttp.ClientSession() as session:
                 tasks = [
                     self.test_api_request(session, url, article, model_name)
                     for article in batch_articles
@@ -165,7 +165,7 @@ class ConcurrencyTester:
                 batch_results = await asyncio.gather(*tasks)
                 all_results.extend(batch_results)
 
-            print(f"배치 {batch_start // batch_size + 1} 완료")
+                print(f"배치 {batch_start // batch_size + 1} 완료")
 
         results = all_results
 
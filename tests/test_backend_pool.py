@@ -0,0 +1,209 @@
+import asyncio
+import socket
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from core.config import settings
+from model.model_manager import ModelManager
+from model.resilience import BackendError, BackendUnavailableError, CircuitBreaker, RetryBudget
+
+
+class FakeOllama:
+    """/api/generate에 status로 응답하는 Ollama 대역 (받은 요청 수를 셈)"""
+
+    def __init__(self, status: int = 200):
+        self.status = status
+        self.hits = 0
+        app = web.Application()
+        app.router.add_post("/api/generate", self.generate)
+        app.router.add_get("/api/version", self.version)
+        self.server = TestServer(app)
+
+    async def generate(self, request: web.Request) -> web.Response:
+        self.hits += 1
+        if self.status != 200:
+            return web.json_response({"error": "busy"}, status=self.status)
+        payload = await request.json()
+        return web.json_response({"model": payload["model"], "response": "ok", "done": True, "done_reason": "stop"})
+
+    async def version(self, request: web.Request) -> web.Response:
+        return web.json_response({"version": "test"})
+
+    @property
+    def url(self) -> str:
+        return str(self.server.make_url("")).rstrip("/")
+
+
+@pytest.fixture
+async def make_backend():
+    servers = []
+
+    async def start(status: int = 200) -> FakeOllama:
+        fake = FakeOllama(status)
+        await fake.server.start_server()
+        servers.append(fake)
+        return fake
+
+    yield start
+    for fake in servers:
+        await fake.server.close()
+
+
+@pytest.fixture
+async def make_manager(monkeypatch):
+    monkeypatch.setattr(settings, "backend_retry_base_delay", 0.001)
+    managers = []
+
+    async def start(urls, **kwargs) -> ModelManager:
+        manager = ModelManager(backend_urls=urls, model_name="test", **kwargs)
+        await manager.start()
+        managers.append(manager)
+        return manager
+
+    yield start
+    for manager in managers:
+        await manager.close()
+
+
+def closed_port_url() -> str:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+def pick_first(manager: ModelManager) -> None:
+    # 동률이면 돌아가며 고르므로 다음 선택이 backends[0]이 되게 맞춤
+    manager.pool._next = len(manager.pool.backends) - 1
+
+
+async def test_retryable_status_fails_over_to_other_backend(make_backend, make_manager):
+    busy, healthy = await make_backend(503), await make_backend()
+    manager = await make_manager([busy.url, healthy.url], max_retries=2)
+    pick_first(manager)
+
+    data = await manager.generate("hi")
+
+    assert data["response"] == "ok"
+    assert (busy.hits, healthy.hits) == (1, 1)
+    assert manager.retries == 1
+    assert manager.pool.backends[0].breaker.failures == 1
+
+
+async def test_connection_failure_marks_backend_unhealthy(make_backend, make_manager):
+    healthy = await make_backend()
+    manager = await make_manager([closed_port_url(), healthy.url], max_retries=2)
+    pick_first(manager)
+
+    data = await manager.generate("hi")
+
+    assert data["response"] == "ok"
+    dead = manager.pool.backends[0]
+    assert not dead.healthy
+    assert dead.failures == 1
+    # 다음 요청은 건강한 노드로만 감
+    await manager.generate("hi")
+    assert healthy.hits == 2
+
+
+async def test_non_retryable_status_is_not_retried(make_backend, make_manager):
+    failing = await make_backend(500)
+    manager = await make_manager([failing.url], max_retries=2)
+
+    with pytest.raises(BackendError) as error:
+        await manager.generate("hi")
+
+    assert error.value.status == 500
+    assert failing.hits == 1
+    assert manager.retries == 0
+
+
+async def test_breaker_opens_then_recovers_through_half_open(make_backend, make_manager):
+    backend = await make_backend(503)
+    manager = await make_manager([backend.url], max_retries=0)
+    breaker = manager.pool.backends[0].breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.1)
+
+    for _ in range(2):
+        with pytest.raises(BackendError):
+            await manager.generate("hi")
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # 열린 동안은 노드로 보내지 않고 바로 거절
+    with pytest.raises(BackendUnavailableError) as unavailable:
+        await manager.generate("hi")
+    assert unavailable.value.retry_after >= 1
+    assert backend.hits == 2
+
+    backend.status = 200
+    await asyncio.sleep(0.15)
+    data = await manager.generate("hi")
+    assert data["response"] == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0
+
+
+async def test_health_check_restores_backend(make_backend, make_manager):
+    healthy = await make_backend()
+    manager = await make_manager([healthy.url, closed_port_url()])
+    backend = manager.pool.backends[0]
+    backend.healthy = False
+
+    await manager.pool._check(backend)
+    await manager.pool._check(manager.pool.backends[1])
+
+    assert backend.healthy
+    assert not manager.pool.backends[1].healthy
+
+
+def test_half_open_allows_a_single_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    assert breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.on_start()
+    assert not breaker.allow()
+
+    # 시험 요청이 실패하면 다시 열림
+    assert breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_cancelled_probe_lets_next_request_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.on_start()
+    breaker.on_finish()
+    assert breaker.allow()
+
+
+def test_closed_breaker_opens_at_threshold():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10)
+    assert not breaker.record_failure()
+    assert not breaker.record_failure()
+    breaker.record_success()
+    assert not breaker.record_failure()
+    assert not breaker.record_failure()
+    assert breaker.record_failure()
+    assert not breaker.allow()
+    assert 0 < breaker.retry_after() <= 10
+
+
+def test_retry_budget_forgets_old_requests(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("model.resilience.time.monotonic", lambda: now[0])
+    budget = RetryBudget(ratio=0.5, min_retries=0, window=10)
+
+    for _ in range(100):
+        budget.record_request()
+    now[0] = 20.0
+    budget.record_request()
+
+    assert len(budget._requests) == 1
+    # 남은 요청 1개의 0.5배: 재시도 하나만 허용
+    assert budget.try_spend()
+    assert not budget.try_spend()
@@ -0,0 +1,19 @@
+from chat.budget import ContextBudget
+
+
+def test_failed_context_lookup_is_retried_later(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("chat.budget.time.monotonic", lambda: now[0])
+    budget = ContextBudget(buckets=[4096, 8192], lookup_retry=30)
+
+    assert not budget.has_model_context("qwen3:8b")
+    budget.set_model_context("qwen3:8b", None)
+    assert budget.has_model_context("qwen3:8b")
+    assert budget.limit("qwen3:8b") == 8192
+
+    now[0] += 31
+    assert not budget.has_model_context("qwen3:8b")
+    budget.set_model_context("qwen3:8b", 4096)
+    now[0] += 3600
+    assert budget.has_model_context("qwen3:8b")
+    assert budget.limit("qwen3:8b") == 4096
@@ -0,0 +1,122 @@
+import asyncio
+import time
+
+import pytest
+
+from chat.coalescer import IdempotencyConflictError, RequestCoalescer
+
+
+async def test_identical_requests_share_one_generation():
+    coalescer = RequestCoalescer()
+    calls = 0
+
+    async def generate():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"text": "ok"}
+
+    results = await asyncio.gather(*(coalescer.run("key", generate) for _ in range(3)))
+    assert results == [{"text": "ok"}] * 3
+    assert calls == 1
+    assert coalescer.coalesced == 2
+
+
+async def test_generation_without_waiters_is_cancelled():
+    coalescer = RequestCoalescer()
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def generate():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    waiter = asyncio.create_task(coalescer.run("key", generate))
+    await started.wait()
+    waiter.cancel()
+    await asyncio.wait_for(cancelled.wait(), 1)
+
+
+async def test_idempotent_generation_survives_disconnect_for_retry():
+    coalescer = RequestCoalescer()
+    calls = 0
+    release = asyncio.Event()
+
+    async def generate():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return {"text": "ok"}
+
+    first = asyncio.create_task(coalescer.run("key", generate, "retry-1"))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.gather(first, return_exceptions=True)
+
+    # 재시도는 계속 돌고 있는 생성에 합류
+    retry = asyncio.create_task(coalescer.run("key", generate, "retry-1"))
+    await asyncio.sleep(0)
+    release.set()
+    assert await retry == {"text": "ok"}
+    # 끝난 뒤의 재시도는 보관된 결과를 받음
+    assert await coalescer.run("key", generate, "retry-1") == {"text": "ok"}
+    assert calls == 1
+
+
+async def test_detached_generation_stops_at_deadline():
+    coalescer = RequestCoalescer()
+    cancelled = asyncio.Event()
+
+    async def generate():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    waiter = asyncio.create_task(coalescer.run("key", generate, "retry-1", time.monotonic() + 0.05))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+    assert not cancelled.is_set()
+    await asyncio.wait_for(cancelled.wait(), 1)
+
+
+async def test_idempotency_key_with_different_body_conflicts():
+    coalescer = RequestCoalescer()
+
+    async def generate():
+        return {"text": "ok"}
+
+    await coalescer.run("key", generate, "retry-1")
+    with pytest.raises(IdempotencyConflictError):
+        await coalescer.run("other", generate, "retry-1")
+
+
+async def test_idempotent_stream_survives_disconnect():
+    coalescer = RequestCoalescer()
+    release = asyncio.Event()
+    opened = 0
+
+    async def open_stream():
+        nonlocal opened
+        opened += 1
+
+        async def chunks():
+            yield {"response": "a"}
+            await release.wait()
+            yield {"response": "b", "done": True}
+        return chunks()
+
+    first = coalescer.subscribe("key", open_stream, "retry-1")
+    assert await first.__anext__() == {"response": "a"}
+    await first.aclose()
+
+    retry = coalescer.subscribe("key", open_stream, "retry-1")
+    release.set()
+    assert [chunk async for chunk in retry] == [{"response": "a"}, {"response": "b", "done": True}]
+    assert opened == 1
@@ -0,0 +1,78 @@
+import time
+
+import pytest
+
+from cache.response_cache import ResponseCache, _DiskTier
+from chat.models import ChatCompletionRequest
+from chat.service import build_generate_options, get_cache_key, is_deterministic
+
+
+def make_request(**kwargs) -> ChatCompletionRequest:
+    return ChatCompletionRequest(model="qwen3:8b", messages=[{"role": "user", "content": "hi"}], **kwargs)
+
+
+@pytest.mark.parametrize(
+    "kwargs, deterministic",
+    [
+        ({}, True),
+        ({"temperature": 0}, True),
+        ({"temperature": 0.7}, False),
+        ({"temperature": None}, False),
+        ({"temperature": 0.7, "seed": 42}, True),
+        ({"temperature": None, "seed": 0}, True),
+    ],
+)
+def test_only_deterministic_requests_are_cached(kwargs, deterministic):
+    request = make_request(**kwargs)
+    assert is_deterministic(request) is deterministic
+    key = get_cache_key(request, "prompt", build_generate_options(request))
+    assert (key is not None) is deterministic
+
+
+def test_bypass_has_no_cache_key():
+    request = make_request(cache="bypass")
+    assert get_cache_key(request, "prompt", build_generate_options(request)) is None
+
+
+def test_seed_is_part_of_the_key():
+    first, second = make_request(temperature=0.7, seed=1), make_request(temperature=0.7, seed=2)
+    assert get_cache_key(first, "prompt", build_generate_options(first)) != get_cache_key(second, "prompt", build_generate_options(second))
+
+
+def count_rows(tier: _DiskTier) -> int:
+    return tier._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+def test_disk_tier_purges_expired_rows_on_write(tmp_path):
+    tier = _DiskTier(tmp_path / "cache.sqlite", max_entries=100)
+    now = time.time()
+    tier.set("old", {"text": "old"}, now - 1)
+    tier.set("new", {"text": "new"}, now + 60)
+
+    assert count_rows(tier) == 1
+    assert tier.get("new")[0] == {"text": "new"}
+    tier.close()
+
+
+def test_disk_tier_caps_rows(tmp_path):
+    tier = _DiskTier(tmp_path / "cache.sqlite", max_entries=5, prune_every=4)
+    now = time.time()
+    for index in range(12):
+        tier.set(f"key-{index}", {"index": index}, now + 60 + index)
+
+    assert count_rows(tier) == 5
+    # 만료가 가장 늦은(최근에 저장한) 행이 남음
+    assert tier.get("key-11") is not None
+    assert tier.get("key-6") is None
+    tier.close()
+
+
+async def test_disk_tier_survives_restart(tmp_path):
+    cache = ResponseCache(max_entries=2, ttl=60, disk_path=str(tmp_path / "cache.sqlite"))
+    await cache.set("key", {"text": "ok"})
+    cache.close()
+
+    reopened = ResponseCache(max_entries=2, ttl=60, disk_path=str(tmp_path / "cache.sqlite"))
+    assert await reopened.get("key") == {"text": "ok"}
+    assert reopened.disk_hits == 1
+    reopened.close()
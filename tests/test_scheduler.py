@@ -0,0 +1,166 @@
+import asyncio
+import time
+
+import pytest
+
+from core.cancellation import DeadlineExceededError, with_deadline
+from model.scheduler import BULK, INTERACTIVE, AdmissionScheduler, SchedulerRejectedError
+
+
+def make_scheduler(**kwargs) -> AdmissionScheduler:
+    options = dict(max_in_flight=2, max_queue_interactive=4, max_queue_bulk=4, reserved_interactive=0, queue_timeout=0, max_loaded_models=0, model_max_in_flight={})
+    options.update(kwargs)
+    return AdmissionScheduler(**options)
+
+
+async def settle() -> None:
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+async def test_acquire_and_release():
+    scheduler = make_scheduler()
+    await scheduler.acquire()
+    await scheduler.acquire()
+    assert scheduler.in_flight == 2
+
+    waiting = asyncio.create_task(scheduler.acquire())
+    await settle()
+    assert not waiting.done()
+    assert scheduler.stats()["queued"][INTERACTIVE] == 1
+
+    scheduler.release()
+    await waiting
+    assert scheduler.in_flight == 2
+    assert scheduler.stats()["queued"][INTERACTIVE] == 0
+
+
+async def test_interactive_goes_before_bulk():
+    scheduler = make_scheduler(max_in_flight=1)
+    await scheduler.acquire()
+    order = []
+
+    async def wait(priority):
+        await scheduler.acquire(priority)
+        order.append(priority)
+
+    bulk = asyncio.create_task(wait(BULK))
+    await settle()
+    interactive = asyncio.create_task(wait(INTERACTIVE))
+    await settle()
+
+    scheduler.release()
+    await interactive
+    assert order == [INTERACTIVE]
+    scheduler.release(INTERACTIVE)
+    await bulk
+    assert order == [INTERACTIVE, BULK]
+
+
+async def test_bulk_leaves_reserved_slots():
+    scheduler = make_scheduler(max_in_flight=3, reserved_interactive=1)
+    await scheduler.acquire(BULK)
+    await scheduler.acquire(BULK)
+    blocked = asyncio.create_task(scheduler.acquire(BULK))
+    await settle()
+    assert not blocked.done()
+
+    # 예약 슬롯은 interactive가 바로 씀
+    await asyncio.wait_for(scheduler.acquire(INTERACTIVE), 1)
+    assert scheduler.in_flight_by_priority == {INTERACTIVE: 1, BULK: 2}
+    blocked.cancel()
+    await asyncio.gather(blocked, return_exceptions=True)
+
+
+async def test_full_queue_rejects_immediately():
+    scheduler = make_scheduler(max_in_flight=1, max_queue_interactive=1)
+    await scheduler.acquire()
+    queued = asyncio.create_task(scheduler.acquire())
+    await settle()
+
+    with pytest.raises(SchedulerRejectedError) as rejected:
+        await scheduler.acquire()
+    assert rejected.value.retry_after >= 1
+    assert scheduler.rejected[INTERACTIVE] == 1
+    queued.cancel()
+    await asyncio.gather(queued, return_exceptions=True)
+
+
+async def test_queue_timeout_rejects():
+    scheduler = make_scheduler(max_in_flight=1, queue_timeout=0.05)
+    await scheduler.acquire()
+    with pytest.raises(SchedulerRejectedError):
+        await scheduler.acquire()
+    assert scheduler.stats()["queued"][INTERACTIVE] == 0
+    assert scheduler.in_flight == 1
+
+
+async def test_cancelled_waiter_is_abandoned():
+    scheduler = make_scheduler(max_in_flight=1)
+    await scheduler.acquire()
+    waiting = asyncio.create_task(scheduler.acquire())
+    await settle()
+
+    waiting.cancel()
+    await asyncio.gather(waiting, return_exceptions=True)
+    assert scheduler.stats()["queued"][INTERACTIVE] == 0
+
+    # 버려진 요청에 슬롯이 배정되지 않음
+    scheduler.release()
+    assert scheduler.in_flight == 0
+
+
+async def test_deadline_while_queued_frees_the_queue():
+    scheduler = make_scheduler(max_in_flight=1)
+    await scheduler.acquire()
+
+    with pytest.raises(DeadlineExceededError):
+        await with_deadline(scheduler.acquire(), time.monotonic() + 0.05)
+    assert scheduler.stats()["queued"][INTERACTIVE] == 0
+
+    scheduler.release()
+    assert scheduler.in_flight == 0
+
+
+async def test_stream_deadline_before_first_chunk_does_not_leak_slot():
+    scheduler = make_scheduler(max_in_flight=1)
+
+    async def chunks():
+        yield {"response": "hello"}
+
+    await scheduler.acquire()
+    stream = scheduler.hold(INTERACTIVE, chunks())
+    with pytest.raises(DeadlineExceededError):
+        await with_deadline(stream.__anext__(), time.monotonic() + 0.05)
+    await stream.aclose()
+
+    scheduler.release()
+    assert scheduler.in_flight == 0
+    assert scheduler.stats()["queued"][INTERACTIVE] == 0
+
+
+async def test_hold_releases_after_stream_ends():
+    scheduler = make_scheduler(max_in_flight=1)
+
+    async def chunks():
+        yield 1
+        yield 2
+
+    received = [chunk async for chunk in scheduler.hold(INTERACTIVE, chunks())]
+    assert received == [1, 2]
+    assert scheduler.in_flight == 0
+
+
+async def test_model_limit_lets_other_models_start():
+    scheduler = make_scheduler(max_in_flight=2, model_max_in_flight={"a": 1})
+    await scheduler.acquire(model="a")
+    blocked = asyncio.create_task(scheduler.acquire(model="a"))
+    await settle()
+    # 앞에 다른 모델 요청이 막혀 있어도 이 모델은 바로 시작
+    await asyncio.wait_for(scheduler.acquire(model="b"), 1)
+    assert not blocked.done()
+
+    scheduler.release(model="a")
+    scheduler.release(model="b")
+    await asyncio.wait_for(blocked, 1)
+    assert scheduler.in_flight_by_model == {"a": 1}
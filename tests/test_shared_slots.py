@@ -0,0 +1,97 @@
+import multiprocessing
+import time
+from pathlib import Path
+
+import pytest
+
+from model.shared_slots import SharedSlots, fcntl
+
+pytestmark = pytest.mark.skipif(fcntl is None, reason="needs POSIX file locks")
+
+SLOTS = 4
+
+
+def hold_slots(directory: str, count: int, waiting_since: float, ready, done) -> None:
+    """다른 워커 프로세스: 아래쪽 슬롯 count개를 잡고 대기 시각을 공개한 채로 done까지 기다림"""
+    slots = SharedSlots(Path(directory), SLOTS)
+    for _ in range(count):
+        slots.try_acquire(SLOTS)
+    slots.publish_waiting(waiting_since, 0.0)
+    ready.set()
+    done.wait(10)
+    slots.close()
+
+
+@pytest.fixture
+def worker(tmp_path):
+    context = multiprocessing.get_context("spawn")
+    started = []
+
+    def start(count: int, waiting_since: float = 0.0):
+        ready, done = context.Event(), context.Event()
+        process = context.Process(target=hold_slots, args=(str(tmp_path), count, waiting_since, ready, done))
+        process.start()
+        assert ready.wait(10)
+        started.append(process)
+        return process, done
+
+    yield start
+    for process in started:
+        process.kill()
+        process.join()
+
+
+@pytest.fixture
+def slots(tmp_path):
+    slots = SharedSlots(tmp_path, SLOTS)
+    yield slots
+    slots.close()
+
+
+def test_slots_are_exclusive_across_processes(slots, worker):
+    process, done = worker(2)
+
+    assert slots.workers() == 2
+    assert slots.in_flight() == 2
+    # 다른 워커가 아래쪽 두 슬롯을 잡고 있음
+    assert slots.try_acquire(2) is None
+    assert slots.try_acquire(SLOTS, from_top=True) == 3
+    assert slots.in_flight() == 3
+
+    done.set()
+    process.join(10)
+    assert slots.in_flight() == 1
+    assert slots.try_acquire(2) == 0
+    assert slots.workers() == 1
+
+
+def test_released_slot_is_reusable(slots):
+    slot = slots.try_acquire(1)
+    assert slot == 0
+    assert slots.try_acquire(1) is None
+    slots.release(slot)
+    assert slots.try_acquire(1) == 0
+
+
+def test_waiting_requests_of_other_workers_go_first(slots, worker):
+    since = time.time()
+    worker(0, waiting_since=since)
+
+    assert slots.waiting_before(since + 1)
+    assert not slots.waiting_before(since - 1)
+    # bulk는 다른 워커의 interactive가 기다리면 항상 양보
+    assert slots.waiting_before(since - 1, bulk=True)
+
+
+def test_dead_worker_frees_slots_and_queue(slots, worker):
+    since = time.time()
+    process, _ = worker(SLOTS, waiting_since=since)
+    assert slots.try_acquire(SLOTS) is None
+
+    process.kill()
+    process.join(10)
+
+    # OS가 죽은 프로세스의 락을 풀고, 남은 대기 기록은 살아 있는 워커가 지움
+    assert slots.try_acquire(SLOTS) == 0
+    assert not slots.waiting_before(since + 1)
+    assert slots.workers() == 1
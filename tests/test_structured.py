@@ -0,0 +1,190 @@
+import asyncio
+import json
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from chat.structured import (
+    JSONEndScanner,
+    ResponseFormatError,
+    StructuredOutput,
+    _check_object,
+    _SchemaCompiler,
+    get_validator,
+    stream_structured_output,
+)
+from model.model_manager import ModelManager
+
+
+def compile_schema(schema):
+    return _SchemaCompiler(schema).compile(schema)
+
+
+PERSON = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string", "minLength": 1},
+        "age": {"type": "integer", "minimum": 0},
+        "tags": {"type": "array", "items": {"type": "string"}, "maxItems": 2},
+        "role": {"enum": ["admin", "user"]},
+    },
+    "required": ["name", "age"],
+    "additionalProperties": False,
+}
+
+
+@pytest.mark.parametrize(
+    "value, error",
+    [
+        ({"name": "kim", "age": 3}, None),
+        ({"name": "kim", "age": 3.0, "tags": ["a"], "role": "user"}, None),
+        ({"name": "kim"}, "$: missing required property 'age'"),
+        ({"name": "", "age": 3}, "$.name: shorter than 1 characters"),
+        ({"name": "kim", "age": -1}, "$.age: less than minimum 0"),
+        ({"name": "kim", "age": True}, "$.age: expected integer"),
+        ({"name": "kim", "age": 3, "tags": ["a", 1]}, "$.tags[1]: expected string"),
+        ({"name": "kim", "age": 3, "tags": ["a", "b", "c"]}, "$.tags: expected at most 2 items"),
+        ({"name": "kim", "age": 3, "role": "root"}, "$.role: must be one of ['admin', 'user']"),
+        ({"name": "kim", "age": 3, "extra": 1}, "$: unexpected property 'extra'"),
+        ([], "$: expected object"),
+    ],
+)
+def test_object_schema(value, error):
+    assert compile_schema(PERSON)(value, "$") == error
+
+
+def test_recursive_ref():
+    schema = {
+        "$defs": {"node": {"type": "object", "properties": {"children": {"type": "array", "items": {"$ref": "#/$defs/node"}}}, "required": ["children"]}},
+        "$ref": "#/$defs/node",
+    }
+    check = compile_schema(schema)
+    assert check({"children": [{"children": []}]}, "$") is None
+    assert check({"children": [{}]}, "$") == "$.children[0]: missing required property 'children'"
+
+
+def test_combinations():
+    any_of = compile_schema({"anyOf": [{"type": "string"}, {"type": "null"}]})
+    assert any_of(None, "$") is None
+    assert any_of(1, "$").startswith("$: does not match any schema in anyOf")
+
+    one_of = compile_schema({"oneOf": [{"type": "number"}, {"type": "integer"}]})
+    assert one_of(1.5, "$") is None
+    assert one_of(1, "$") == "$: matches more than one schema in oneOf"
+
+    all_of = compile_schema({"allOf": [{"type": "string"}, {"pattern": "^a"}]})
+    assert all_of("abc", "$") is None
+    assert all_of("b", "$") == "$: does not match pattern '^a'"
+
+
+def test_boolean_and_unknown_keywords():
+    assert compile_schema(True)(1, "$") is None
+    assert compile_schema({"description": "anything"})([1], "$") is None
+    assert compile_schema({"properties": {"x": False}})({"x": 1}, "$") == "$.x: no value is allowed here"
+
+
+@pytest.mark.parametrize(
+    "schema",
+    [
+        {"type": "date"},
+        {"$ref": "http://example.com/schema.json"},
+        {"$ref": "#/$defs/missing"},
+        {"type": "string", "pattern": "("},
+        {"properties": {"x": 1}},
+    ],
+)
+def test_invalid_schema(schema):
+    with pytest.raises(ResponseFormatError):
+        compile_schema(schema)
+
+
+def test_validator_is_cached_per_schema():
+    assert get_validator({"type": "string", "minLength": 1}) is get_validator({"minLength": 1, "type": "string"})
+
+
+def feed_all(pieces):
+    scanner = JSONEndScanner()
+    for index, piece in enumerate(pieces):
+        end = scanner.feed(piece)
+        if end >= 0:
+            return index, end
+    return None
+
+
+def test_scanner_finds_end_of_object():
+    assert feed_all(['{"a": [1, {"b": 2}]}  \n\n']) == (0, 20)
+    assert feed_all(['{"a":', ' [1, 2]', '}', " "]) == (2, 1)
+    assert feed_all(['{"a": [1, 2]']) is None
+
+
+def test_scanner_ignores_brackets_in_strings():
+    text = '{"a": "}]{["}x'
+    assert feed_all([text]) == (0, len(text) - 1)
+    text = '{"a": "say \\"}\\" ok"}'
+    assert feed_all([text]) == (0, len(text))
+
+
+def test_scanner_escape_split_across_chunks():
+    # 백슬래시가 조각 끝에 오면 다음 조각의 따옴표는 문자열을 닫지 않음
+    assert feed_all(['{"a": "x\\', '"}', '"}']) == (2, 2)
+    assert feed_all(['{"a": "x\\\\', '"}']) == (1, 2)
+
+
+def test_scanner_top_level_array_and_scalar():
+    assert feed_all(["[[1], [2]]"]) == (0, 10)
+    assert feed_all(['"just a string"', " 42"]) is None
+
+
+def test_scanner_after_done_returns_zero():
+    scanner = JSONEndScanner()
+    assert scanner.feed("{}") == 2
+    assert scanner.done
+    assert scanner.feed(" more") == 0
+
+
+class StreamingOllama:
+    """JSON 본문을 닫은 뒤에도 공백을 계속 생성하는 /api/generate 스트림"""
+
+    def __init__(self):
+        app = web.Application()
+        app.router.add_post("/api/generate", self.generate)
+        self.server = TestServer(app)
+
+    async def generate(self, request: web.Request) -> web.StreamResponse:
+        response = web.StreamResponse()
+        await response.prepare(request)
+        for text in ['{"a"', ": 1}"]:
+            await response.write(json.dumps({"model": "test", "response": text, "done": False}).encode() + b"\n")
+        for _ in range(100):
+            await response.write(json.dumps({"model": "test", "response": " ", "done": False}).encode() + b"\n")
+            await asyncio.sleep(0.01)
+        return response
+
+
+@pytest.fixture
+async def streaming_manager():
+    fake = StreamingOllama()
+    await fake.server.start_server()
+    manager = ModelManager(backend_urls=[str(fake.server.make_url("")).rstrip("/")], model_name="test")
+    await manager.start()
+    yield manager
+    await manager.close()
+    await fake.server.close()
+
+
+async def test_early_stop_is_not_counted_as_cancel(streaming_manager):
+    structured_output = StructuredOutput("json", _check_object)
+    chunks = [chunk async for chunk in stream_structured_output(streaming_manager.generate_stream("prompt"), structured_output)]
+
+    assert chunks[-1]["done"]
+    assert chunks[-1]["eval_count"] == 2
+    assert streaming_manager.cancelled == 0
+
+
+async def test_abandoned_stream_is_counted_as_cancel(streaming_manager):
+    stream = stream_structured_output(streaming_manager.generate_stream("prompt"), StructuredOutput("json", _check_object))
+    await stream.__anext__()
+    await stream.aclose()
+
+    assert streaming_manager.cancelled == 1
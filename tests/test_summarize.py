@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from summarize.service import gather_or_cancel
+
+
+async def test_results_keep_input_order():
+    async def value(delay, result):
+        await asyncio.sleep(delay)
+        return result
+
+    assert await gather_or_cancel(value(0.02, "a"), value(0, "b"), value(0.01, "c")) == ["a", "b", "c"]
+
+
+async def test_first_failure_cancels_the_rest():
+    cancelled = []
+
+    async def slow(name):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(name)
+            raise
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("chunk failed")
+
+    with pytest.raises(RuntimeError, match="chunk failed"):
+        await asyncio.wait_for(gather_or_cancel(slow("a"), fail(), slow("b")), 1)
+    assert sorted(cancelled) == ["a", "b"]
+
+
+async def test_caller_cancellation_cancels_children():
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    task = asyncio.create_task(gather_or_cancel(slow(), slow()))
+    await asyncio.sleep(0.01)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    assert cancelled == [True, True]
@@ -0,0 +1,53 @@
+import pytest
+
+from chat.models import Message
+from templates.base import ChatTemplate
+from templates.gemma import GemmaTemplate
+from templates.mistral import MistralTemplate
+from templates.qwen import Qwen3Template
+
+MESSAGES = [
+    Message(role="system", content="Be brief."),
+    Message(role="user", content="Hi"),
+    Message(role="assistant", content="Hello"),
+    Message(role="user", content="Bye"),
+]
+
+
+def test_gemma_folds_system_into_first_user_turn():
+    assert GemmaTemplate().convert_messages(MESSAGES) == (
+        "<start_of_turn>user\nBe brief.\n\nHi<end_of_turn>\n"
+        "<start_of_turn>model\nHello<end_of_turn>\n"
+        "<start_of_turn>user\nBye<end_of_turn>\n"
+        "<start_of_turn>model\n"
+    )
+
+
+def test_mistral_folds_system_into_last_user_turn():
+    assert MistralTemplate().convert_messages(MESSAGES) == "[INST] Hi[/INST] Hello</s>[INST] Be brief.\n\nBye[/INST]"
+
+
+@pytest.mark.parametrize("template_class", [GemmaTemplate, MistralTemplate])
+def test_model_templates_use_base_rendering(template_class):
+    # 모델별 배치만 바꾸고 렌더링(thinking, prefix 캐시)은 기본 구현을 씀
+    assert "convert_messages" not in template_class.__dict__
+
+    class ThinkingTemplate(template_class):
+        think_open = "<think>"
+        think_close = "</think>"
+
+    template = ThinkingTemplate()
+    assert template.convert_messages(MESSAGES, thinking=False).endswith("<think></think>")
+    assert not template.convert_messages(MESSAGES, thinking=True).endswith("</think>")
+
+
+def test_system_prompt_rendering_is_cached():
+    template = Qwen3Template()
+    first = template.convert_messages(MESSAGES, thinking=False)
+    assert list(template._prefix_cache) == ["Be brief."]
+    assert template.convert_messages(MESSAGES, thinking=False) == first
+    assert first.endswith(template.generation_prompt + "<think>\n\n</think>\n\n")
+
+
+def test_base_arrangement_keeps_messages():
+    assert ChatTemplate.arrange_messages(Qwen3Template(), MESSAGES[:2]) == [("system", "Be brief."), ("user", "Hi")]
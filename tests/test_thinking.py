@@ -0,0 +1,61 @@
+import pytest
+
+from chat.thinking import ThinkingFilter, stream_with_thinking_budget
+from model.resilience import BackendError
+from templates.service import get_chat_template
+
+
+class FakeModelManager:
+    """generate_stream 호출마다 정해 둔 청크 목록(또는 예외)을 내보냄"""
+
+    def __init__(self, *phases):
+        self.phases = list(phases)
+        self.calls = 0
+
+    async def generate_stream(self, prompt, **kwargs):
+        self.calls += 1
+        phase = self.phases.pop(0)
+        if isinstance(phase, Exception):
+            raise phase
+        for chunk in phase:
+            yield chunk
+
+
+@pytest.fixture
+def template():
+    return get_chat_template("qwen3:8b")
+
+
+async def test_budget_stream_sends_open_tag_with_first_upstream_chunk(template):
+    manager = FakeModelManager(
+        [{"response": "plan"}, {"response": " more"}, {"done": True, "prompt_eval_count": 5, "eval_count": 2}],
+        [{"response": "answer"}, {"done": True, "prompt_eval_count": 9, "eval_count": 1}],
+    )
+    stream = stream_with_thinking_budget(manager, template, "prompt", 16)
+
+    first = await stream.__anext__()
+    assert first["response"] == template.think_open + "plan"
+    assert manager.calls == 1
+
+    rest = [chunk async for chunk in stream]
+    assert rest[-1]["prompt_eval_count"] == 5
+    assert rest[-1]["eval_count"] == 3
+
+    thinking_filter = ThinkingFilter()
+    text = "".join(chunk.get("response", "") for chunk in [first, *rest])
+    assert thinking_filter.feed(text) == ("answer", "plan more")
+
+
+async def test_budget_stream_backend_error_surfaces_on_first_chunk(template):
+    stream = stream_with_thinking_budget(FakeModelManager(BackendError(404, "model not found")), template, "prompt", 16)
+
+    with pytest.raises(BackendError):
+        await stream.__anext__()
+
+
+async def test_budget_stream_with_empty_reasoning(template):
+    manager = FakeModelManager([{"done": True}], [{"response": "answer"}, {"done": True}])
+    chunks = [chunk async for chunk in stream_with_thinking_budget(manager, template, "prompt", 16)]
+
+    assert chunks[0]["response"] == template.think_open + template.think_close
+    assert chunks[1]["response"] == "answer"